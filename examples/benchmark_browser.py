@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+"""
+BrowserUseTool 单次调用延迟基准测试
+
+在本地启动一个小型测试网站，用 BrowserUseTool 依次浏览其中的页面。
+比较两种方式的单次调用延迟：
+- 冷启动（旧实现）：每次调用都启动 Chromium、创建上下文，用完即关闭；
+- 共享浏览器池：Chromium 只启动一次，同一会话线程复用预热的上下文。
+
+用法: python examples/benchmark_browser.py [调用次数]
+"""
+
+import asyncio
+import statistics
+import sys
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from react_agent.tool.browser_pool import BrowserPool
+from react_agent.tool.browser_use_tool import BrowserUseTool
+
+CALLS = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+PAGES = 5
+
+
+def make_site(root: Path):
+    for i in range(PAGES):
+        links = "".join(f'<a href="/page{j}.html">page {j}</a> ' for j in range(PAGES))
+        paragraphs = "".join(f"<p>Paragraph {k} of page {i}.</p>" for k in range(20))
+        (root / f"page{i}.html").write_text(
+            f"<html><head><title>Page {i}</title></head><body>{paragraphs}{links}"
+            f'<form><input type="search" name="q"><button type="submit">Go</button></form>'
+            f"</body></html>"
+        )
+
+
+def serve(root: Path) -> ThreadingHTTPServer:
+    handler = partial(SimpleHTTPRequestHandler, directory=str(root))
+    handler.log_message = lambda *args: None
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def cold_call(url: str) -> float:
+    # 每次调用都用一个新的浏览器池，上下文用一次即关闭，等同于旧实现
+    pool = BrowserPool(max_uses=1)
+    start = time.perf_counter()
+    try:
+        result = await BrowserUseTool(pool=pool).execute(url=url, task="读取页面")
+    finally:
+        await pool.close()
+    assert "Page" in result, result
+    return time.perf_counter() - start
+
+
+async def pooled_call(tool: BrowserUseTool, url: str) -> float:
+    start = time.perf_counter()
+    result = await tool.execute(url=url, task="读取页面")
+    assert "Page" in result, result
+    return time.perf_counter() - start
+
+
+def report(name: str, latencies: list):
+    print(
+        f"{name:<14} mean {statistics.mean(latencies) * 1000:8.1f} ms  "
+        f"median {statistics.median(latencies) * 1000:8.1f} ms  "
+        f"max {max(latencies) * 1000:8.1f} ms"
+    )
+
+
+async def main():
+    with TemporaryDirectory() as root:
+        make_site(Path(root))
+        server = serve(Path(root))
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        urls = [f"{base}/page{i % PAGES}.html" for i in range(CALLS)]
+        print(f"{CALLS} calls against {base}\n")
+
+        cold = [await cold_call(url) for url in urls]
+        report("cold start", cold)
+
+        pool = BrowserPool()
+        tool = BrowserUseTool(pool=pool)
+        try:
+            first = await pooled_call(tool, urls[0])  # launches Chromium
+            pooled = [await pooled_call(tool, url) for url in urls]
+        finally:
+            await pool.close()
+        print(f"{'pool (launch)':<14} {first * 1000:8.1f} ms")
+        report("pool (warm)", pooled)
+        print(f"\nspeedup (median): {statistics.median(cold) / statistics.median(pooled):.1f}x")
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
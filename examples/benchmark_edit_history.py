@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+"""
+StrReplaceEditor 撤销历史内存基准测试
+
+对一个10MB的文件连续执行1000次编辑，比较逆向补丁历史与
+“每次编辑前保存整个文件副本”方式的内存占用。
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from react_agent.tool.edit_history import EditHistory
+from react_agent.tool.str_replace_editor import StrReplaceEditor
+
+FILE_SIZE = 10 * 1024**2  # bytes
+EDITS = 1000
+
+
+def rss() -> int:
+    """当前进程的常驻内存（字节，仅Linux）。"""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "data.txt"
+        lines = [f"line {i:08d} value={i % 97}" for i in range(FILE_SIZE // 24)]
+        path.write_text("\n".join(lines))
+        size = path.stat().st_size
+        del lines
+
+        editor = StrReplaceEditor(history=EditHistory())
+        baseline = rss()
+        start = time.perf_counter()
+        for i in range(EDITS):
+            await editor.execute(
+                command="str_replace",
+                path=str(path),
+                old_str=f"line {i * 300:08d} value=",
+                new_str=f"line {i * 300:08d} edited value=",
+            )
+        elapsed = time.perf_counter() - start
+        retained = rss() - baseline
+        history_size = editor.history.size
+
+        start = time.perf_counter()
+        for _ in range(EDITS):
+            await editor.execute(command="undo_edit", path=str(path))
+        undo_elapsed = time.perf_counter() - start
+
+    print(f"file size:                 {size / 1024**2:10.1f} MB")
+    print(f"edits:                     {EDITS:10d}")
+    print(f"history size (accounted):  {history_size / 1024:10.1f} KB")
+    print(f"RSS growth:                {retained / 1024**2:10.1f} MB")
+    print(f"full-copy history would be:{size * EDITS / 1024**3:10.1f} GB")
+    print(f"edit time:                 {elapsed / EDITS * 1000:10.2f} ms per edit")
+    print(f"undo time:                 {undo_elapsed / EDITS * 1000:10.2f} ms per undo")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
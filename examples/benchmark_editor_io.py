@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""
+StrReplaceEditor 事件循环延迟基准测试
+
+多个并发任务同时编辑各自的大文件，另一个任务每毫秒醒来一次并记录
+事件循环的调度延迟。比较在事件循环上直接执行阻塞编辑（旧实现）与
+通过 `execute` 在I/O线程池中执行编辑的延迟。
+"""
+
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from react_agent.tool.edit_history import EditHistory
+from react_agent.tool.str_replace_editor import StrReplaceEditor
+
+FILES = 8
+FILE_SIZE = 10 * 1024**2  # bytes
+EDITS = 5  # per file
+TICK = 0.001  # seconds
+
+
+async def measure_lag(stop: asyncio.Event, lags: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - start - TICK)
+
+
+async def run(editor: StrReplaceEditor, paths, blocking: bool):
+    async def edit(path: Path):
+        for i in range(EDITS):
+            old_str, new_str = f"line {i * 1000:08d} ", f"line {i * 1000:08d} edited "
+            if blocking:
+                # what `execute` used to do: the whole edit on the event loop
+                editor.str_replace(path, old_str, new_str)
+                await asyncio.sleep(0)
+            else:
+                await editor.execute(
+                    command="str_replace", path=str(path), old_str=old_str, new_str=new_str
+                )
+            await editor.execute(command="undo_edit", path=str(path))
+
+    stop, lags = asyncio.Event(), []
+    ticker = asyncio.create_task(measure_lag(stop, lags))
+    start = time.perf_counter()
+    await asyncio.gather(*(edit(path) for path in paths))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await ticker
+    return elapsed, lags
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as directory:
+        text = "\n".join(f"line {i:08d} value={i % 97}" for i in range(FILE_SIZE // 24))
+        paths = [Path(directory) / f"data{i}.txt" for i in range(FILES)]
+        for path in paths:
+            path.write_text(text)
+
+        for label, blocking in (("on the event loop", True), ("on the I/O pool", False)):
+            editor = StrReplaceEditor(history=EditHistory())
+            elapsed, lags = await run(editor, paths, blocking)
+            lags.sort()
+            print(
+                f"{label:18} total {elapsed:6.2f} s | loop lag p50 {statistics.median(lags) * 1000:7.2f} ms"
+                f" p99 {lags[int(len(lags) * 0.99)] * 1000:7.2f} ms max {lags[-1] * 1000:7.2f} ms"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
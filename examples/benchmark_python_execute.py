@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+"""
+PythonExecute 基准测试
+
+比较线程后端与预派生进程池后端的冷启动延迟和稳态延迟。
+"""
+
+import asyncio
+import statistics
+import time
+
+from react_agent.tool.python_execute import PythonExecute
+
+SNIPPETS = {
+    "print": "print('hello')",
+    "numpy": "import numpy as np\nprint(np.arange(1000).sum())",
+}
+ITERATIONS = 50
+
+
+async def measure(backend: str, code: str) -> tuple[float, list[float]]:
+    """返回第一次调用的延迟和之后每次调用的延迟（秒）。"""
+    tool = PythonExecute(backend=backend)
+    latencies = []
+    for _ in range(ITERATIONS + 1):
+        start = time.perf_counter()
+        await tool.execute(code=code, timeout=30)
+        latencies.append(time.perf_counter() - start)
+    return latencies[0], latencies[1:]
+
+
+async def main():
+    print(f"{'backend':<8} {'snippet':<8} {'cold (ms)':>10} {'p50 (ms)':>10} {'p95 (ms)':>10}")
+    for name, code in SNIPPETS.items():
+        for backend in ("thread", "process"):
+            cold, steady = await measure(backend, code)
+            steady.sort()
+            p50 = statistics.median(steady)
+            p95 = steady[int(len(steady) * 0.95) - 1]
+            print(
+                f"{backend:<8} {name:<8} {cold * 1000:>10.2f} {p50 * 1000:>10.2f} {p95 * 1000:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""
+StrReplaceEditor 工作区搜索基准测试
+
+生成一个包含大量小文件的工作区（默认100000个，可通过命令行参数指定），
+比较 `search` 命令（三元组索引）与 `grep -rn` 子进程的查询耗时。
+智能体的两次调用之间通常隔着数秒，因此也测量间隔超过刷新周期后的查询耗时
+（此时整棵树的重新扫描在后台进行）。
+"""
+
+import asyncio
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from react_agent.tool.search_index import DEFAULT_REFRESH_INTERVAL, TrigramIndex
+from react_agent.tool.str_replace_editor import StrReplaceEditor
+
+QUERIES = ["needle_0042", "def handler_7", "import os"]
+
+
+def make_tree(root: Path, files: int):
+    (root / ".git").mkdir()
+    for i in range(files):
+        directory = root / f"pkg{i // 1000:03d}"
+        directory.mkdir(exist_ok=True)
+        body = "".join(
+            f"def handler_{j}(x):\n    return x * {i + j}\n" for j in range(20)
+        )
+        if i % 5000 == 42:
+            body += f"# needle_{i:04d}\n"
+        (directory / f"module{i % 1000:03d}.py").write_text("import os\n" + body)
+
+
+async def main():
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as directory:
+        root = Path(directory) / "workspace"
+        root.mkdir()
+        start = time.perf_counter()
+        make_tree(root, files)
+        print(f"files:            {files:10d} (generated in {time.perf_counter() - start:.1f} s)")
+
+        start = time.perf_counter()
+        TrigramIndex(root, index_dir=Path(directory) / "index").refresh()
+        print(f"initial indexing: {time.perf_counter() - start:10.2f} s (standalone index)")
+
+        editor = StrReplaceEditor()
+        await editor.execute(command="search", path=str(root), query="warm up")
+        for query in QUERIES:
+            start = time.perf_counter()
+            result = await editor.execute(command="search", path=str(root), query=query)
+            indexed = time.perf_counter() - start
+            start = time.perf_counter()
+            grep = subprocess.run(
+                ["grep", "-rnI", "--exclude-dir=.git", "-F", query, str(root)],
+                capture_output=True,
+                text=True,
+            )
+            grepped = time.perf_counter() - start
+            print(
+                f"{query!r:18} search {indexed * 1000:8.1f} ms | grep {grepped * 1000:8.1f} ms"
+                f" | {result.splitlines()[0]}; grep found {len(grep.stdout.splitlines())}"
+            )
+
+        # 如同智能体的两次调用之间，等待超过刷新周期
+        for query in QUERIES:
+            await asyncio.sleep(DEFAULT_REFRESH_INTERVAL + 0.5)
+            start = time.perf_counter()
+            await editor.execute(command="search", path=str(root), query=query)
+            print(f"{query!r:18} search {(time.perf_counter() - start) * 1000:8.1f} ms after an idle interval")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
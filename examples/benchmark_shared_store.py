@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+"""
+共享内存对象存储基准测试
+
+在执行工作进程中比较两种获取同一张数值表的方式：每次从CSV重新读取，
+或按名称从共享内存存储中附加（零拷贝）。
+
+用法: python examples/benchmark_shared_store.py [表大小(MB)，默认1024]
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from react_agent.tool.python_pool import PythonWorkerPool
+from react_agent.tool.shared_store import get_shared_store
+
+COLUMNS = 8
+ITERATIONS = 3
+
+
+def timed(pool: PythonWorkerPool, code: str) -> float:
+    start = time.perf_counter()
+    result = pool.execute(code, timeout=3600)
+    elapsed = time.perf_counter() - start
+    if result.get("success") is False:
+        raise RuntimeError(result["observation"])
+    return elapsed
+
+
+async def main():
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 1024
+    rows = size_mb * 1024**2 // (COLUMNS * 8)
+    frame = pd.DataFrame(
+        {f"sensor_{i}": np.random.default_rng(i).random(rows) for i in range(COLUMNS)}
+    )
+    print(f"table: {rows} rows x {COLUMNS} float64 columns ({size_mb} MB)")
+
+    store = get_shared_store()
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "table.csv"
+        start = time.perf_counter()
+        frame.to_csv(path, index=False)
+        print(f"write csv:        {time.perf_counter() - start:8.2f} s")
+        start = time.perf_counter()
+        store.publish("benchmark_table", frame)
+        print(f"publish:          {time.perf_counter() - start:8.2f} s")
+        del frame
+
+        pool = PythonWorkerPool(size=1, memory_limit=None)
+        try:
+            pool.start()
+            reload = [
+                timed(pool, f"import pandas as pd\nprint(pd.read_csv({str(path)!r}).shape)")
+                for _ in range(ITERATIONS)
+            ]
+            attach = [
+                timed(pool, "print(shared.attach('benchmark_table').shape)")
+                for _ in range(ITERATIONS)
+            ]
+        finally:
+            pool.shutdown()
+            store.delete("benchmark_table")
+
+    print(f"reload from csv:  {min(reload):8.3f} s (best of {ITERATIONS})")
+    print(f"attach by name:   {min(attach):8.3f} s (best of {ITERATIONS})")
+    print(f"speedup:          {min(reload) / min(attach):8.0f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
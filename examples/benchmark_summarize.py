@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+"""
+ScholarSearch 总结耗时基准测试
+
+使用带注入延迟的伪聊天完成后端总结20篇论文，比较逐块串行总结后
+一次合并（旧实现）、并发映射加树形归约，以及命中总结缓存时的耗时。
+"""
+
+import asyncio
+import time
+
+from react_agent.tool.scholar_search import ScholarSearch
+from react_agent.tool.summarize import REDUCE_PROMPT, SummaryCache
+
+PAPERS = 20
+LATENCY = 0.5  # seconds per completion
+
+
+class FakeCompletion:
+    def __init__(self):
+        self.calls = 0
+
+    async def execute(self, prompt: str) -> str:
+        self.calls += 1
+        await asyncio.sleep(LATENCY)
+        return f"summary of {len(prompt)} characters"
+
+
+def papers():
+    return [
+        {
+            "title": f"Paper {i}",
+            "authors": "A. Author, B. Author",
+            "year": 2020 + i % 5,
+            "abstract": f"We study problem {i} and find that method {i % 3} works. " * 40,
+            "citations": i * 7,
+            "url": f"https://example.org/paper/{i}",
+        }
+        for i in range(PAPERS)
+    ]
+
+
+async def serial(completion: FakeCompletion):
+    """旧实现：逐块串行总结，再一次合并。"""
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    text = "以下是搜索到的学术文献：\n\n" + "".join(
+        f"{i}. 标题: {p['title']}\n   作者: {p['authors']}\n   年份: {p['year']}\n"
+        f"   摘要: {p['abstract']}\n   引用数: {p['citations']}\n   链接: {p['url']}\n\n"
+        for i, p in enumerate(papers(), 1)
+    )
+    chunks = RecursiveCharacterTextSplitter(chunk_size=4000, chunk_overlap=200).split_text(text)
+    summaries = [await completion.execute(chunk) for chunk in chunks]
+    await completion.execute(REDUCE_PROMPT.format(text="\n\n".join(summaries)))
+
+
+async def main():
+    completion = FakeCompletion()
+    start = time.perf_counter()
+    await serial(completion)
+    print(f"serial:            {time.perf_counter() - start:6.2f} s, {completion.calls} completions")
+
+    completion = FakeCompletion()
+    tool = ScholarSearch(summarizer=completion, summary_cache=SummaryCache())
+    start = time.perf_counter()
+    await tool._summarize_results(papers())
+    print(f"map-reduce:        {time.perf_counter() - start:6.2f} s, {completion.calls} completions")
+
+    calls = completion.calls
+    start = time.perf_counter()
+    await tool._summarize_results(papers())
+    print(f"map-reduce cached: {time.perf_counter() - start:6.2f} s, {completion.calls - calls} completions")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -22,15 +22,15 @@ async def test_browser_initialization():
     browser_tool = BrowserUseTool()
     
     # 测试浏览器初始化
-    context = await browser_tool._ensure_browser_initialized()
-    if context:
+    browser = await browser_tool._ensure_browser_initialized()
+    if browser:
         logger.info("✅ 浏览器初始化成功")
     else:
         logger.error("❌ 浏览器初始化失败")
     
     # 清理资源
     await browser_tool.cleanup()
-    return context is not None
+    return browser is not None
 
 async def test_browser_navigation(url="https://www.baidu.com"):
     """测试浏览器导航功能"""
@@ -147,6 +147,8 @@ async def bash_execute(command: str) -> str:
 async def python_code_execute(code: str, timeout: int = 5) -> str:
     """
     执行Python代码并返回结果。
+
+    代码在当前对话线程的长期会话中执行，变量在多次调用之间保留。
     
     参数:
         code: 要执行的Python代码
@@ -155,7 +157,7 @@ async def python_code_execute(code: str, timeout: int = 5) -> str:
     返回:
         str: 代码执行结果
     """
-    python_tool = PythonExecute()
+    python_tool = PythonExecute(stateful=True)
     result = await python_tool.execute(code=code, timeout=timeout)
     return str(result)
 
@@ -3,6 +3,7 @@
 与支持工具调用的聊天模型一起工作。
 """
 
+import asyncio
 from datetime import datetime, timezone
 from typing import Dict, List, Literal, cast, Any
 
@@ -14,6 +15,7 @@ from langgraph.prebuilt import ToolNode
 from react_agent.all_tools import TOOLS
 from react_agent.configuration import Configuration
 from react_agent.state import InputState, State
+from react_agent.tool.write_behind import get_write_behind_buffer
 from react_agent.utils import load_chat_model
 
 # 定义调用模型的函数
@@ -75,6 +77,19 @@ async def call_model(
     return {"messages": [response]}
 
 
+async def flush_writes(state: State) -> Dict[str, Any]:
+    """在运行结束前写出文件保存工具缓冲的追加内容。
+
+    参数:
+        state (State): 对话的当前状态。
+
+    返回:
+        dict: 空字典，不修改状态。
+    """
+    await asyncio.to_thread(get_write_behind_buffer().flush)
+    return {}
+
+
 # 定义路由函数
 def should_continue(state: State) -> Literal["tools", "__end__"]:
     """确定是否应该继续执行工具。
@@ -107,6 +122,7 @@ builder = StateGraph(State, input=InputState, config_schema=Configuration)
 # 添加节点
 builder.add_node("call_model", call_model)
 builder.add_node("tools", ToolNode(TOOLS))
+builder.add_node("flush_writes", flush_writes)
 
 # 设置入口点
 builder.add_edge("__start__", "call_model")
@@ -117,10 +133,13 @@ builder.add_conditional_edges(
     should_continue,
     {
         "tools": "tools",
-        "__end__": "__end__",
+        "__end__": "flush_writes",
     },
 )
 
+# 结束前写出缓冲的文件内容
+builder.add_edge("flush_writes", "__end__")
+
 # 从工具节点返回到模型节点
 builder.add_edge("tools", "call_model")
 
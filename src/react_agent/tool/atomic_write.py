@@ -0,0 +1,89 @@
+"""Atomic replacement of files.
+
+A new version of a file is written to a temp file in the same directory,
+which is then renamed over it, so readers see either the old or the new
+contents and a crash midway leaves the file untouched.
+
+Symlinks are followed: the file they point to is replaced, and the link
+is left alone. The temp file gets the mode of the file it replaces, and
+its owner and group where the process may set them; a new file gets the
+mode a plain open() would give it. Other hard links to the file keep
+pointing to the old contents, as with any rename-based write.
+"""
+
+import os
+import secrets
+from typing import Tuple
+
+_TEMP_ATTEMPTS: int = 100
+
+
+def open_temp_file(path: str) -> Tuple[int, str]:
+    """Create the temp file that will replace `path`, next to the file it resolves to.
+
+    Returns its descriptor, open for writing, and its path.
+    """
+    target = os.path.realpath(path)
+    directory, name = os.path.split(target)
+    # a replacement starts private and is given the mode of the file it
+    # replaces on commit; a new file is created like open() would, so the
+    # umask applies without having to read it
+    mode = 0o600 if os.path.exists(target) else 0o666
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_CLOEXEC", 0)
+    for _ in range(_TEMP_ATTEMPTS):
+        tmp = os.path.join(directory, f".{name}.{secrets.token_hex(4)}.tmp")
+        try:
+            return os.open(tmp, flags, mode), tmp
+        except FileExistsError:
+            continue
+    raise FileExistsError(f"No free temp file name next to {target}")
+
+
+def commit_temp_file(tmp: str, path: str, fsync: bool):
+    """Rename the written (and, if `fsync`, already fsynced) `tmp` over `path`.
+
+    If `fsync`, the directory is fsynced after the rename.
+    """
+    target = os.path.realpath(path)
+    try:
+        try:
+            st = os.stat(target)
+        except FileNotFoundError:
+            pass
+        else:
+            os.chmod(tmp, st.st_mode & 0o7777)
+            tmp_st = os.stat(tmp)
+            if (tmp_st.st_uid, tmp_st.st_gid) != (st.st_uid, st.st_gid):
+                try:
+                    os.chown(tmp, st.st_uid, st.st_gid)
+                except PermissionError:
+                    pass  # only root may give a file away
+                else:
+                    # chown clears the setuid and setgid bits
+                    os.chmod(tmp, st.st_mode & 0o7777)
+        os.replace(tmp, target)
+    except BaseException:
+        discard_temp_file(tmp)
+        raise
+    if fsync:
+        fsync_directory(os.path.dirname(target))
+
+
+def discard_temp_file(tmp: str):
+    """Remove `tmp`, if it still exists."""
+    try:
+        os.unlink(tmp)
+    except FileNotFoundError:
+        pass
+
+
+def fsync_directory(directory: str):
+    """Fsync `directory`, so renames in it survive a crash; best effort."""
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
@@ -1,9 +1,16 @@
 from abc import ABC, abstractmethod
 from typing import Any, Dict, Optional
 
+from langchain_core.runnables import ensure_config
 from pydantic import BaseModel, Field
 
 
+def current_thread_id(default: str = "default") -> str:
+    """Return the conversation thread id of the runnable config in context."""
+    configurable = ensure_config().get("configurable") or {}
+    return str(configurable.get("thread_id") or default)
+
+
 class BaseTool(ABC, BaseModel):
     name: str = Field(..., description="工具的名称")
     description: str = Field(..., description="工具的描述")
@@ -73,6 +80,10 @@ class ToolResult(BaseModel):
 class CLIResult(ToolResult):
     """A ToolResult that can be rendered as a CLI output."""
 
+    cpu_time: Optional[float] = Field(default=None, description="CPU time in seconds")
+    peak_rss: Optional[int] = Field(default=None, description="Peak RSS in bytes")
+    wall_time: Optional[float] = Field(default=None, description="Wall time in seconds")
+
 
 class ToolFailure(ToolResult):
     """A ToolResult that represents a failure."""
@@ -1,9 +1,19 @@
 import asyncio
-import os
+import time
 from typing import Optional
 
+from pydantic import Field
+
 from react_agent.exceptions import ToolError
 from react_agent.tool.base import BaseTool, CLIResult, ToolResult
+from react_agent.tool.output_capture import OutputCapture
+from react_agent.tool.resource_limits import (
+    PeakRssSampler,
+    ResourceLimits,
+    ResourceUsage,
+    accounting,
+    children_cpu_time,
+)
 
 
 _BASH_DESCRIPTION = """在终端中执行Bash命令。
@@ -19,13 +29,16 @@ class _BashSession:
     _process: asyncio.subprocess.Process
 
     command: str = "/bin/bash"
-    _output_delay: float = 0.2  # seconds
+    _chunk_size: int = 65536  # bytes
+    _head_limit: int = 8000  # bytes of output kept from the start
+    _tail_limit: int = 8000  # bytes of output kept from the end
     _timeout: float = 120.0  # seconds
     _sentinel: str = "<<exit>>"
 
-    def __init__(self):
+    def __init__(self, limits: Optional[ResourceLimits] = None):
         self._started = False
         self._timed_out = False
+        self._limits = limits or ResourceLimits.from_env()
 
     async def start(self):
         if self._started:
@@ -33,7 +46,7 @@ class _BashSession:
 
         self._process = await asyncio.create_subprocess_shell(
             self.command,
-            preexec_fn=os.setsid,
+            preexec_fn=self._limits.preexec_fn(new_session=True),
             shell=True,
             bufsize=0,
             stdin=asyncio.subprocess.PIPE,
@@ -51,6 +64,27 @@ class _BashSession:
             return
         self._process.terminate()
 
+    async def _read_until_sentinel(
+        self, stream: asyncio.StreamReader, capture: OutputCapture
+    ):
+        """Stream `stream` into `capture` up to (excluding) the sentinel line."""
+        sentinel = f"{self._sentinel}\n".encode()
+        pending = b""
+        while True:
+            chunk = await stream.read(self._chunk_size)
+            if not chunk:
+                capture.write(pending)
+                return
+            window = pending + chunk
+            index = window.find(sentinel)
+            if index != -1:
+                capture.write(window[:index])
+                return
+            # keep enough bytes to recognise a sentinel split across chunks
+            keep = len(sentinel) - 1
+            capture.write(window[:-keep])
+            pending = window[-keep:]
+
     async def run(self, command: str):
         """Execute a command in the bash shell."""
         if not self._started:
@@ -70,46 +104,71 @@ class _BashSession:
         assert self._process.stdout
         assert self._process.stderr
 
-        # send command to the process
+        # the shell reaps the processes it spawns, so their peak RSS is
+        # sampled from /proc while the command runs
+        sampler = PeakRssSampler(self._process.pid)
+
+        # send command to the process; the sentinel is echoed on both streams
+        # so that each of them can be read up to the end of this command
         self._process.stdin.write(
-            command.encode() + f"; echo '{self._sentinel}'\n".encode()
+            command.encode()
+            + f"; echo '{self._sentinel}'; echo '{self._sentinel}' >&2\n".encode()
         )
         await self._process.stdin.drain()
+        sampling = asyncio.create_task(sampler.run())
+        started = time.monotonic()
+        cpu_before = children_cpu_time(self._process.pid)
+
+        stdout = OutputCapture(self._head_limit, self._tail_limit, prefix="bash-stdout")
+        stderr = OutputCapture(self._head_limit, self._tail_limit, prefix="bash-stderr")
 
-        # read output from the process, until the sentinel is found
+        # stream output from the process into bounded captures, until the
+        # sentinel is found on both streams
         try:
             async with asyncio.timeout(self._timeout):
-                while True:
-                    await asyncio.sleep(self._output_delay)
-                    # if we read directly from stdout/stderr, it will wait forever for
-                    # EOF. use the StreamReader buffer directly instead.
-                    output = (
-                        self._process.stdout._buffer.decode()
-                    )  # pyright: ignore[reportAttributeAccessIssue]
-                    if self._sentinel in output:
-                        # strip the sentinel and break
-                        output = output[: output.index(self._sentinel)]
-                        break
+                await asyncio.gather(
+                    self._read_until_sentinel(self._process.stdout, stdout),
+                    self._read_until_sentinel(self._process.stderr, stderr),
+                )
         except asyncio.TimeoutError:
             self._timed_out = True
             raise ToolError(
                 f"timed out: bash has not returned in {self._timeout} seconds and must be restarted",
             ) from None
+        finally:
+            sampling.cancel()
+            stdout.close()
+            stderr.close()
 
+        output = stdout.getvalue()
         if output.endswith("\n"):
             output = output[:-1]
 
-        error = (
-            self._process.stderr._buffer.decode()
-        )  # pyright: ignore[reportAttributeAccessIssue]
+        error = stderr.getvalue()
         if error.endswith("\n"):
             error = error[:-1]
 
-        # clear the buffers so that the next output can be read correctly
-        self._process.stdout._buffer.clear()  # pyright: ignore[reportAttributeAccessIssue]
-        self._process.stderr._buffer.clear()  # pyright: ignore[reportAttributeAccessIssue]
-
-        return CLIResult(output=output, error=error)
+        # commands run inside the long-lived shell, so CPU time is the growth
+        # of the shell's reaped-children rusage
+        cpu_after = children_cpu_time(self._process.pid)
+        usage = ResourceUsage(
+            cpu_time=(
+                cpu_after - cpu_before
+                if cpu_before is not None and cpu_after is not None
+                else None
+            ),
+            peak_rss=sampler.peak_rss,
+            wall_time=time.monotonic() - started,
+        )
+        accounting.record(usage)
+
+        return CLIResult(
+            output=output,
+            error=error,
+            cpu_time=usage.cpu_time,
+            peak_rss=usage.peak_rss,
+            wall_time=usage.wall_time,
+        )
 
 
 class Bash(BaseTool):
@@ -128,6 +187,8 @@ class Bash(BaseTool):
         "required": ["command"],
     }
 
+    limits: ResourceLimits = Field(default_factory=ResourceLimits.from_env, exclude=True)
+
     _session: Optional[_BashSession] = None
 
     async def execute(
@@ -136,13 +197,13 @@ class Bash(BaseTool):
         if restart:
             if self._session:
                 self._session.stop()
-            self._session = _BashSession()
+            self._session = _BashSession(self.limits)
             await self._session.start()
 
             return ToolResult(system="tool has been restarted.")
 
         if self._session is None:
-            self._session = _BashSession()
+            self._session = _BashSession(self.limits)
             await self._session.start()
 
         if command is not None:
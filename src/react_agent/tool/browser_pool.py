@@ -0,0 +1,297 @@
+"""A shared Chromium with a pool of reusable browser contexts.
+
+Chromium is launched once per event loop, on first use, and kept running.
+Browser contexts are leased per conversation thread: a thread gets back
+its own warm context, with its cookies and open page, and two threads
+never share one. At most `max_contexts` exist; when all are taken, a new
+thread takes over the least recently used idle one, or waits until one is
+returned. A context is closed and replaced after `max_uses` leases, or
+when the JavaScript heap of its page exceeds `memory_limit` bytes, so
+long conversations do not accumulate leaks.
+
+A browser that has crashed or disconnected is closed and launched again,
+and the contexts it had are replaced. The pool of an event loop is closed,
+Chromium included, when that loop shuts down (as at the end of
+`asyncio.run`).
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONTEXTS: int = int(os.environ.get("REACT_AGENT_BROWSER_CONTEXTS", 4))
+DEFAULT_MAX_USES: int = int(os.environ.get("REACT_AGENT_BROWSER_CONTEXT_MAX_USES", 50))
+DEFAULT_MEMORY_LIMIT: int = (
+    int(os.environ.get("REACT_AGENT_BROWSER_CONTEXT_MEMORY_MB", 512)) * 1024**2
+)  # bytes
+
+# 依次尝试的浏览器配置
+BROWSER_CONFIGS: List[Dict[str, Any]] = [
+    {"headless": True},
+    {"headless": True, "extra_chromium_args": ["--disable-gpu"]},
+]
+
+_HEAP_SIZE_JS = "() => (performance.memory ? performance.memory.usedJSHeapSize : 0)"
+
+_playwright_checked = False
+_playwright_lock = threading.Lock()
+
+
+async def _ensure_playwright_installed():
+    """Install the Playwright Chromium if needed, once per process."""
+    global _playwright_checked
+    with _playwright_lock:
+        if _playwright_checked:
+            return
+        _playwright_checked = True  # even on failure, so it is not retried on every launch
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "playwright", "install", "chromium",
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        _, stderr = await proc.communicate()
+        if proc.returncode != 0:
+            logger.warning(f"Playwright浏览器安装可能有问题: {stderr.decode()}")
+    except Exception as e:
+        logger.error(f"检查Playwright安装时出错: {str(e)}")
+
+
+async def launch_browser():
+    """Launch Chromium with the first of `BROWSER_CONFIGS` that works."""
+    from browser_use import Browser, BrowserConfig
+
+    await _ensure_playwright_installed()
+    last_error: Optional[Exception] = None
+    for config in BROWSER_CONFIGS:
+        browser = Browser(BrowserConfig(**config))
+        try:
+            await browser.get_playwright_browser()  # browser_use launches lazily
+        except Exception as e:
+            last_error = e
+            logger.warning(f"浏览器初始化失败，配置 {config}: {str(e)}")
+            await _close_quietly(browser)
+            continue
+        logger.info(f"成功初始化浏览器，配置: {config}")
+        return browser
+    raise RuntimeError(f"所有浏览器配置都失败: {last_error}")
+
+
+async def _close_quietly(closable):
+    try:
+        await closable.close()
+    except Exception as e:
+        logger.debug(f"关闭浏览器资源失败: {str(e)}")
+
+
+def _connected(browser) -> bool:
+    """Whether `browser` is still connected to its Chromium, as far as can be told."""
+    playwright_browser = getattr(browser, "playwright_browser", None)
+    if playwright_browser is None:
+        return True  # not launched yet; creating a context will tell
+    try:
+        return playwright_browser.is_connected()
+    except Exception:
+        return False
+
+
+@dataclass
+class _PooledContext:
+    thread_id: str
+    context: Any = None  # a browser_use BrowserContext, created on first lease
+    browser: Any = None  # the browser `context` belongs to
+    uses: int = 0
+    leased: bool = False
+    retire: bool = False  # close it when it is returned
+    last_used: float = 0.0
+
+
+class BrowserPool:
+    """Leases warm browser contexts of one shared browser, by conversation thread."""
+
+    def __init__(
+        self,
+        launch: Callable[[], Awaitable[Any]] = launch_browser,
+        max_contexts: int = DEFAULT_MAX_CONTEXTS,
+        max_uses: int = DEFAULT_MAX_USES,
+        memory_limit: int = DEFAULT_MEMORY_LIMIT,
+    ):
+        self._launch = launch
+        self.max_contexts = max_contexts
+        self.max_uses = max_uses
+        self.memory_limit = memory_limit
+        self.launches = 0
+        self.contexts_created = 0
+        self.contexts_recycled = 0
+        self._browser = None
+        self._launch_lock = asyncio.Lock()
+        self._contexts: Dict[str, _PooledContext] = {}
+        self._changed = asyncio.Condition()
+        self._closing = set()  # tasks closing contexts taken over by another thread
+
+    async def browser(self):
+        """The shared browser, launched on first use and again if it disconnected."""
+        async with self._launch_lock:
+            if self._browser is not None and not _connected(self._browser):
+                logger.warning("浏览器已断开连接，重新启动")
+                browser, self._browser = self._browser, None
+                await _close_quietly(browser)
+            if self._browser is None:
+                self._browser = await self._launch()
+                self.launches += 1
+            return self._browser
+
+    async def _relaunch(self, failed):
+        """Replace `failed`, the browser that could not create a context."""
+        async with self._launch_lock:
+            if self._browser is failed:
+                logger.warning("浏览器无法创建上下文，重新启动")
+                self._browser = None
+                await _close_quietly(failed)
+        return await self.browser()
+
+    @asynccontextmanager
+    async def lease(self, thread_id: str = "default") -> AsyncIterator[Any]:
+        """A browser context for `thread_id`, to itself until the block exits."""
+        entry = await self._acquire(thread_id)
+        try:
+            yield entry.context
+        finally:
+            await self._release(entry)
+
+    async def _acquire(self, thread_id: str) -> _PooledContext:
+        async with self._changed:
+            while True:
+                entry = self._contexts.get(thread_id)
+                if entry is not None:
+                    if not entry.leased:
+                        break
+                elif len(self._contexts) < self.max_contexts:
+                    entry = self._contexts[thread_id] = _PooledContext(thread_id)
+                    break
+                else:
+                    idle = [e for e in self._contexts.values() if not e.leased]
+                    if idle:
+                        # take over the slot of the least recently used thread
+                        victim = min(idle, key=lambda e: e.last_used)
+                        del self._contexts[victim.thread_id]
+                        if victim.context is not None:
+                            task = asyncio.create_task(_close_quietly(victim.context))
+                            self._closing.add(task)
+                            task.add_done_callback(self._closing.discard)
+                        continue
+                await self._changed.wait()
+            entry.leased = True
+        try:
+            browser = await self.browser()
+            if entry.context is not None and entry.browser is not browser:
+                # left over from a browser that was relaunched
+                await _close_quietly(entry.context)
+                entry.context, entry.uses = None, 0
+            if entry.context is None:
+                try:
+                    entry.context = await browser.new_context()
+                except Exception as e:
+                    # the browser may have crashed; relaunch it once
+                    logger.warning(f"创建浏览器上下文失败: {str(e)}")
+                    browser = await self._relaunch(browser)
+                    entry.context = await browser.new_context()
+                entry.browser = browser
+                self.contexts_created += 1
+        except BaseException:
+            async with self._changed:
+                self._contexts.pop(thread_id, None)
+                self._changed.notify_all()
+            raise
+        entry.uses += 1
+        return entry
+
+    async def _heap_size(self, context) -> int:
+        try:
+            page = await context.get_current_page()
+            return int(await page.evaluate(_HEAP_SIZE_JS) or 0)
+        except Exception:
+            return 0
+
+    async def _release(self, entry: _PooledContext):
+        if (
+            entry.retire
+            or entry.uses >= self.max_uses
+            or await self._heap_size(entry.context) > self.memory_limit
+        ):
+            logger.info(f"回收浏览器上下文 (线程 {entry.thread_id}，已使用 {entry.uses} 次)")
+            await _close_quietly(entry.context)
+            entry.context, entry.browser, entry.uses, entry.retire = None, None, 0, False
+            self.contexts_recycled += 1
+        async with self._changed:
+            entry.leased = False
+            entry.last_used = time.monotonic()
+            self._changed.notify_all()
+
+    async def discard(self, thread_id: str = "default"):
+        """Replace the context of `thread_id` with a fresh one on its next lease."""
+        async with self._changed:
+            entry = self._contexts.get(thread_id)
+            if entry is None:
+                return
+            if entry.leased:
+                entry.retire = True
+                return
+            del self._contexts[thread_id]
+            self._changed.notify_all()
+        if entry.context is not None:
+            await _close_quietly(entry.context)
+
+    async def close(self):
+        """Close every context and the browser."""
+        async with self._changed:
+            entries, self._contexts = list(self._contexts.values()), {}
+            self._changed.notify_all()
+        for entry in entries:
+            if entry.context is not None:
+                await _close_quietly(entry.context)
+        async with self._launch_lock:
+            browser, self._browser = self._browser, None
+        if browser is not None:
+            await _close_quietly(browser)
+
+
+# Playwright objects belong to the event loop that created them.
+_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, BrowserPool]" = (
+    weakref.WeakKeyDictionary()
+)
+_pools_lock = threading.Lock()
+
+
+def get_browser_pool() -> BrowserPool:
+    """Return the browser pool of the running event loop, creating it on first use.
+
+    The pool is closed when the loop shuts down its async generators, as
+    `asyncio.run` does before closing the loop.
+    """
+    loop = asyncio.get_running_loop()
+    with _pools_lock:
+        pool = _pools.get(loop)
+        if pool is None:
+            pool = _pools[loop] = BrowserPool()
+            # the loop only holds its async generators weakly
+            pool._shutdown_hook = _close_on_shutdown(pool)
+            loop.create_task(pool._shutdown_hook.__anext__())
+        return pool
+
+
+async def _close_on_shutdown(pool: BrowserPool):
+    """An async generator that closes `pool` when its loop finalizes it."""
+    try:
+        yield
+    finally:
+        await pool.close()
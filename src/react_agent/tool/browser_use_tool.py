@@ -1,18 +1,15 @@
 import asyncio
-import json
 import logging
 import os
-import sys
 from typing import Optional, Dict, Any, List, Union
 
 from browser_use import Browser as BrowserUseBrowser
-from browser_use import BrowserConfig
 from browser_use.browser.context import BrowserContext
-from browser_use.dom.service import DomService
 from pydantic import Field, field_validator
 from pydantic_core.core_schema import ValidationInfo
 
-from react_agent.tool.base import BaseTool, ToolResult
+from react_agent.tool.base import BaseTool, ToolResult, current_thread_id
+from react_agent.tool.browser_pool import BrowserPool, get_browser_pool
 
 # 配置日志记录
 logging.basicConfig(level=logging.INFO, 
@@ -72,47 +69,12 @@ class BrowserUseTool(BaseTool):
             },
             **data
         )
-        # 不在初始化时调用异步方法，而是在第一次使用时检查
-        self.playwright_checked = False
-    
-    lock: asyncio.Lock = Field(default_factory=asyncio.Lock)
-    browser: Optional[BrowserUseBrowser] = Field(default=None, exclude=True)
-    context: Optional[BrowserContext] = Field(default=None, exclude=True)
-    dom_service: Optional[DomService] = Field(default=None, exclude=True)
-    browser_initialized: bool = Field(default=False, exclude=True)
-    initialization_error: Optional[str] = Field(default=None, exclude=True)
-    initialization_attempts: int = Field(default=0, exclude=True)
-    max_initialization_attempts: int = Field(default=3, exclude=True)
-    playwright_checked: bool = Field(default=False, exclude=True)
 
-    async def _ensure_playwright_installed_async(self):
-        """异步方式确保Playwright已安装并下载浏览器。"""
-        if self.playwright_checked:
-            return
-            
-        try:
-            # 使用子进程运行playwright install命令
-            import subprocess
-            import sys
-            
-            logger.info("检查Playwright浏览器是否已安装...")
-            # 使用异步子进程运行命令
-            proc = await asyncio.create_subprocess_exec(
-                sys.executable, "-m", "playwright", "install", "chromium",
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            stdout, stderr = await proc.communicate()
-            
-            if proc.returncode == 0:
-                logger.info("Playwright浏览器已安装并可用")
-            else:
-                logger.warning(f"Playwright浏览器安装可能有问题: {stderr.decode()}")
-            
-            self.playwright_checked = True
-        except Exception as e:
-            logger.error(f"检查Playwright安装时出错: {str(e)}")
-            self.playwright_checked = True  # 即使出错也标记为已检查，避免重复检查
+    # 为 None 时使用当前事件循环共享的浏览器池
+    pool: Optional[BrowserPool] = Field(default=None, exclude=True)
+
+    def _browser_pool(self) -> BrowserPool:
+        return self.pool if self.pool is not None else get_browser_pool()
 
     @field_validator("parameters", mode="before")
     def validate_parameters(cls, v: dict, info: ValidationInfo) -> dict:
@@ -120,62 +82,13 @@ class BrowserUseTool(BaseTool):
             raise ValueError("Parameters cannot be empty")
         return v
 
-    async def _ensure_browser_initialized(self) -> Optional[BrowserContext]:
-        """确保浏览器和上下文已初始化。"""
-        # 首先确保Playwright已安装
-        await self._ensure_playwright_installed_async()
-        
-        if self.initialization_error and self.initialization_attempts >= self.max_initialization_attempts:
-            logger.error(f"浏览器初始化失败次数过多: {self.initialization_error}")
+    async def _ensure_browser_initialized(self) -> Optional[BrowserUseBrowser]:
+        """确保共享浏览器已启动。"""
+        try:
+            return await self._browser_pool().browser()
+        except Exception as e:
+            logger.error(f"浏览器初始化失败: {str(e)}")
             return None
-            
-        if not self.browser_initialized:
-            self.initialization_attempts += 1
-            try:
-                logger.info(f"正在初始化浏览器 (尝试 {self.initialization_attempts}/{self.max_initialization_attempts})...")
-                
-                # 尝试不同的浏览器配置
-                browser_configs = [
-                    # 首先尝试无头模式
-                    {"headless": True},
-                    # 然后尝试有头模式
-                    {"headless": False},
-                    # 最后尝试无头模式但禁用GPU
-                    {"headless": True, "args": ["--disable-gpu"]}
-                ]
-                
-                last_error = None
-                for config_dict in browser_configs:
-                    try:
-                        logger.info(f"尝试使用配置初始化浏览器: {config_dict}")
-                        config = BrowserConfig(**config_dict)
-                        self.browser = BrowserUseBrowser(config)
-                        logger.info(f"成功初始化浏览器，配置: {config_dict}")
-                        break
-                    except Exception as e:
-                        last_error = e
-                        logger.warning(f"浏览器初始化失败，配置 {config_dict}: {str(e)}")
-                        # 继续尝试下一个配置
-                
-                if not self.browser:
-                    if last_error:
-                        raise last_error
-                    else:
-                        raise Exception("所有浏览器配置都失败，但没有具体错误")
-                
-                # 创建上下文
-                self.context = await self.browser.new_context()
-                self.dom_service = DomService(await self.context.get_current_page())
-                self.browser_initialized = True
-                self.initialization_error = None
-                logger.info("浏览器上下文初始化成功")
-            except Exception as e:
-                error_msg = f"浏览器初始化失败: {str(e)}"
-                logger.error(error_msg)
-                self.initialization_error = error_msg
-                return None
-        
-        return self.context
 
     async def _find_search_input(self, context: BrowserContext) -> Optional[Dict[str, Any]]:
         """查找页面上的搜索输入框。"""
@@ -457,11 +370,18 @@ class BrowserUseTool(BaseTool):
             url = 'https://' + url
             logger.info(f"URL已修正为: {url}")
         
-        # 初始化浏览器上下文
-        context = await self._ensure_browser_initialized()
-        if not context:
+        # 租用本会话线程在共享浏览器中的上下文，用完归还而不关闭
+        try:
+            async with self._browser_pool().lease(current_thread_id()) as context:
+                return await self._execute_in_context(context, url, action, parameters)
+        except Exception as e:
+            logger.error(f"浏览器初始化失败: {str(e)}")
             return "浏览器初始化失败，无法执行操作"
-        
+
+    async def _execute_in_context(
+        self, context: BrowserContext, url: str, action: str, parameters: Optional[Dict[str, Any]]
+    ) -> str:
+        """在租用的浏览器上下文中执行操作。"""
         # 提取参数
         parameters = parameters or {}
         search_query = parameters.get("search_query")
@@ -563,22 +483,11 @@ class BrowserUseTool(BaseTool):
         except Exception as e:
             logger.error(f"执行浏览器操作时出错: {str(e)}")
             return f"执行浏览器操作时出错: {str(e)}"
-        
-        finally:
-            # 确保资源被清理
-            try:
-                await context.close()
-            except Exception as e:
-                logger.error(f"关闭浏览器上下文时出错: {str(e)}")
 
     async def get_current_state(self) -> Dict[str, Any]:
         """获取当前浏览器状态。"""
-        async with self.lock:
-            try:
-                context = await self._ensure_browser_initialized()
-                if not context:
-                    return {"error": "浏览器未初始化"}
-                
+        try:
+            async with self._browser_pool().lease(current_thread_id()) as context:
                 state = await context.get_state()
                 state_info = {
                     "url": state.url,
@@ -587,43 +496,12 @@ class BrowserUseTool(BaseTool):
                     "interactive_elements": state.element_tree.clickable_elements_to_string(),
                 }
                 return state_info
-            except Exception as e:
-                logger.error(f"获取浏览器状态失败: {str(e)}")
-                return {"error": f"获取浏览器状态失败: {str(e)}"}
+        except Exception as e:
+            logger.error(f"获取浏览器状态失败: {str(e)}")
+            return {"error": f"获取浏览器状态失败: {str(e)}"}
 
     async def cleanup(self):
-        """清理浏览器资源。"""
-        async with self.lock:
-            logger.info("正在清理浏览器资源...")
-            if self.context is not None:
-                try:
-                    await self.context.close()
-                except Exception as e:
-                    logger.error(f"关闭浏览器上下文失败: {str(e)}")
-                finally:
-                    self.context = None
-                    self.dom_service = None
-            
-            if self.browser is not None:
-                try:
-                    await self.browser.close()
-                except Exception as e:
-                    logger.error(f"关闭浏览器失败: {str(e)}")
-                finally:
-                    self.browser = None
-            
-            self.browser_initialized = False
-            logger.info("浏览器资源清理完成")
-
-    def __del__(self):
-        """确保对象销毁时清理资源。"""
-        if self.browser is not None or self.context is not None:
-            try:
-                asyncio.run(self.cleanup())
-            except RuntimeError:
-                try:
-                    loop = asyncio.new_event_loop()
-                    loop.run_until_complete(self.cleanup())
-                    loop.close()
-                except Exception as e:
-                    logger.error(f"在析构函数中清理浏览器资源失败: {str(e)}")
+        """重置本会话线程的浏览器上下文；共享的浏览器保持运行。"""
+        logger.info("正在重置浏览器上下文...")
+        await self._browser_pool().discard(current_thread_id())
+        logger.info("浏览器上下文已重置")
@@ -0,0 +1,172 @@
+"""Chunked saves for `FileSaver`.
+
+A large file can be saved in pieces: a save is opened with a handle, the
+content is written chunk by chunk, optionally compressed on the fly, and
+the save is committed by renaming its temp file over the target. Until
+then the target is untouched, and nothing but the current chunk is held
+in memory. Saves left open longer than `idle_timeout` are aborted.
+"""
+
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+from uuid import uuid4
+
+from react_agent.tool.atomic_write import (
+    commit_temp_file,
+    discard_temp_file,
+    open_temp_file,
+)
+from react_agent.tool.compression import Compressor
+from react_agent.tool.write_behind import DEFAULT_FSYNC
+
+DEFAULT_MAX_OPEN_SAVES: int = 64
+DEFAULT_IDLE_TIMEOUT: float = 60 * 60  # seconds
+
+
+@dataclass
+class SaveStats:
+    path: str
+    raw_bytes: int  # of content, UTF-8 encoded
+    written_bytes: int
+    compression: Optional[str]
+
+    @property
+    def ratio(self) -> float:
+        """How many times smaller compression made the content."""
+        return self.raw_bytes / self.written_bytes if self.written_bytes else 1.0
+
+    def describe(self) -> str:
+        if not self.compression:
+            return f"{self.raw_bytes} bytes"
+        return (
+            f"{self.raw_bytes} bytes, compressed with {self.compression} to "
+            f"{self.written_bytes} bytes (ratio {self.ratio:.2f}x)"
+        )
+
+
+class ChunkedSave:
+    """One open save of `path`, written to a temp file next to it."""
+
+    def __init__(self, path: str, compression: Optional[str] = None):
+        self.path = os.path.abspath(path)
+        self.compression = compression
+        self._compressor = Compressor(compression) if compression else None
+        fd, self._tmp = open_temp_file(self.path)
+        self._file = os.fdopen(fd, "wb")
+        self.raw_bytes = self.written_bytes = 0
+        self.last_used = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _write(self, data: bytes):
+        self._file.write(data)
+        self.written_bytes += len(data)
+
+    def write(self, content: str):
+        data = content.encode("utf-8")
+        with self._lock:
+            self.raw_bytes += len(data)
+            self._write(self._compressor.compress(data) if self._compressor else data)
+            self.last_used = time.monotonic()
+
+    def commit(self, fsync: bool) -> SaveStats:
+        with self._lock:
+            return self._commit(fsync)
+
+    def _commit(self, fsync: bool) -> SaveStats:
+        try:
+            if self._compressor:
+                self._write(self._compressor.flush())
+            self._file.flush()
+            if fsync:
+                os.fsync(self._file.fileno())
+            self._file.close()
+        except BaseException:
+            self.abort()
+            raise
+        commit_temp_file(self._tmp, self.path, fsync)
+        return self.stats()
+
+    def abort(self):
+        self._file.close()
+        discard_temp_file(self._tmp)
+
+    def stats(self) -> SaveStats:
+        return SaveStats(self.path, self.raw_bytes, self.written_bytes, self.compression)
+
+
+class ChunkedSaves:
+    """The open chunked saves of the process, by handle. Thread-safe."""
+
+    def __init__(
+        self,
+        max_open: int = DEFAULT_MAX_OPEN_SAVES,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+        fsync: bool = DEFAULT_FSYNC != "never",
+    ):
+        self.max_open = max_open
+        self.idle_timeout = idle_timeout
+        self.fsync = fsync
+        self._saves: Dict[str, ChunkedSave] = {}
+        self._lock = threading.Lock()
+
+    def _expire(self):
+        # called with `_lock` held
+        deadline = time.monotonic() - self.idle_timeout
+        for handle, save in list(self._saves.items()):
+            if save.last_used < deadline:
+                del self._saves[handle]
+                save.abort()
+
+    def open(self, path: str, compression: Optional[str] = None) -> str:
+        """Start a save of `path` and return its handle."""
+        with self._lock:
+            self._expire()
+            if len(self._saves) >= self.max_open:
+                raise RuntimeError(
+                    f"Too many chunked saves are open ({self.max_open}); commit or abort some first"
+                )
+            handle = uuid4().hex[:12]
+            self._saves[handle] = ChunkedSave(path, compression)
+            return handle
+
+    def _get(self, handle: str, path: Optional[str] = None) -> ChunkedSave:
+        with self._lock:
+            save = self._saves.get(handle)
+        if save is None:
+            raise ValueError(f"No open chunked save has handle {handle!r}; it may have expired")
+        if path is not None and os.path.abspath(path) != save.path:
+            raise ValueError(f"Handle {handle!r} belongs to a save of {save.path}, not {path}")
+        return save
+
+    def write(self, handle: str, content: str, path: Optional[str] = None) -> SaveStats:
+        save = self._get(handle, path)
+        save.write(content)
+        return save.stats()
+
+    def commit(self, handle: str, path: Optional[str] = None) -> SaveStats:
+        save = self._get(handle, path)
+        with self._lock:
+            self._saves.pop(handle, None)
+        return save.commit(self.fsync)
+
+    def abort(self, handle: str, path: Optional[str] = None):
+        save = self._get(handle, path)
+        with self._lock:
+            self._saves.pop(handle, None)
+        save.abort()
+
+
+_saves: Optional[ChunkedSaves] = None
+_saves_lock = threading.Lock()
+
+
+def get_chunked_saves() -> ChunkedSaves:
+    """Return the process-wide chunked saves, creating them on first use."""
+    global _saves
+    with _saves_lock:
+        if _saves is None:
+            _saves = ChunkedSaves()
+        return _saves
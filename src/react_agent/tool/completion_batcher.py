@@ -0,0 +1,201 @@
+"""Coalescing and micro-batching of short completion prompts.
+
+Prompts of the same conversation thread arriving within `window` seconds
+of each other are collected and sent as one request: a prompt already waiting or in flight is not sent
+again but shares that answer, and distinct prompts are packed into a
+single numbered multi-part prompt whose numbered answers are handed back
+to each caller. A window is sent early once it holds
+`max_batch` distinct prompts. If the reply cannot be split into exactly one
+answer per part, the parts are sent one by one instead. Prompts longer than
+`max_prompt_chars` are never packed, prompts of different threads are
+never packed together (one user's prompt must not be able to forge the
+answers of another), and if a packed request fails its prompts are sent
+one by one. Nothing is packed while
+`packable()` is false, for example when the router would fall through to
+the local model, which has a small context.
+
+This trades a few milliseconds of latency for far fewer requests against
+the providers' rate limits.
+"""
+
+import asyncio
+import logging
+import os
+import re
+import threading
+import weakref
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from react_agent.tool.base import current_thread_id
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW: float = float(
+    os.environ.get("REACT_AGENT_COMPLETION_BATCH_WINDOW", 0.02)
+)  # seconds
+DEFAULT_MAX_BATCH: int = int(os.environ.get("REACT_AGENT_COMPLETION_MAX_BATCH", 4))
+DEFAULT_MAX_PROMPT_CHARS: int = 500
+MAX_TOKENS_PER_PROMPT: int = 1000
+MAX_TOKENS_PER_REQUEST: int = 4096
+
+PACKED_PROMPT = (
+    "下面有 {n} 个彼此独立的请求。请依次回答每一个请求，回答之间互不引用。"
+    "每个回答以单独一行的“### 回答 i”开头（i 为请求编号），按编号顺序给出，不要输出其他内容。\n\n"
+    "{parts}"
+)
+_PART = "### 请求 {i}\n{prompt}"
+_ANSWER = re.compile(r"^\s*#+\s*回答\s*(\d+)\s*$", re.MULTILINE)
+
+# (prompt, max_tokens) -> reply
+Complete = Callable[[str, int], Awaitable[str]]
+
+
+def pack(prompts: List[str]) -> str:
+    parts = "\n\n".join(_PART.format(i=i, prompt=p) for i, p in enumerate(prompts, 1))
+    return PACKED_PROMPT.format(n=len(prompts), parts=parts)
+
+
+def unpack(reply: str, n: int) -> Optional[List[str]]:
+    """The `n` numbered answers in `reply`, or None if they are not all there."""
+    marks = list(_ANSWER.finditer(reply))
+    if [int(m.group(1)) for m in marks] != list(range(1, n + 1)):
+        return None
+    ends = [m.start() for m in marks[1:]] + [len(reply)]
+    return [reply[m.end() : end].strip() for m, end in zip(marks, ends)]
+
+
+class _Pending:
+    """The prompts of one thread that are waiting or being answered."""
+
+    def __init__(self):
+        self.window: Dict[str, asyncio.Future] = {}  # not sent yet, in arrival order
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.answers: Dict[str, asyncio.Future] = {}  # waiting or in flight
+
+
+class CompletionBatcher:
+    """Collects prompts for `window` seconds and sends them together."""
+
+    def __init__(
+        self,
+        complete: Complete,
+        window: float = DEFAULT_WINDOW,
+        max_batch: int = DEFAULT_MAX_BATCH,
+        max_prompt_chars: int = DEFAULT_MAX_PROMPT_CHARS,
+        packable: Callable[[], bool] = lambda: True,
+    ):
+        self._complete = complete
+        self.packable = packable
+        self.window = window
+        self.max_batch = max_batch
+        self.max_prompt_chars = max_prompt_chars
+        self.prompts = 0  # received from callers
+        self.requests = 0  # sent to `complete`
+        # event loop -> thread id -> its prompts
+        self._pending: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, _Pending]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._tasks = set()
+
+    async def _send(self, prompt: str, max_tokens: int = MAX_TOKENS_PER_PROMPT) -> str:
+        self.requests += 1
+        return await self._complete(prompt, max_tokens)
+
+    async def complete(self, prompt: str, thread_id: Optional[str] = None) -> str:
+        """The answer to `prompt`, batched with other prompts of `thread_id`."""
+        self.prompts += 1
+        if len(prompt) > self.max_prompt_chars:
+            return await self._send(prompt)
+        thread_id = thread_id or current_thread_id()
+        loop = asyncio.get_running_loop()
+        threads = self._pending.setdefault(loop, {})
+        pending = threads.setdefault(thread_id, _Pending())
+        answer = pending.answers.get(prompt)
+        if answer is None:
+            # the first caller with this prompt; later ones share its answer
+            answer = pending.answers[prompt] = loop.create_future()
+
+            def done(_):
+                pending.answers.pop(prompt, None)
+                if not pending.answers and threads.get(thread_id) is pending:
+                    del threads[thread_id]
+
+            answer.add_done_callback(done)
+            pending.window[prompt] = answer
+            if len(pending.window) >= self.max_batch:
+                self._flush(loop, pending)
+            elif pending.timer is None:
+                pending.timer = loop.call_later(self.window, self._flush, loop, pending)
+        # one caller giving up must not cancel the answer for the others
+        return await asyncio.shield(answer)
+
+    def _flush(self, loop: asyncio.AbstractEventLoop, pending: _Pending):
+        if not pending.window:
+            return
+        window, pending.window = pending.window, {}
+        if pending.timer is not None:
+            pending.timer.cancel()
+            pending.timer = None
+        task = loop.create_task(self._dispatch(window))
+        self._tasks.add(task)  # keep a reference until it is done
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, window: Dict[str, asyncio.Future]):
+        prompts = list(window)
+        if len(prompts) > 1 and self.packable():
+            try:
+                answers = await self._send_packed(prompts)
+            except Exception as e:
+                logger.warning(
+                    "Packed request for %d prompts failed (%s); sending them one by one",
+                    len(prompts),
+                    e,
+                )
+                answers = None
+            if answers is not None:
+                for prompt, answer in zip(prompts, answers):
+                    window[prompt].set_result(answer)
+                return
+        results = await asyncio.gather(
+            *(self._send(prompt) for prompt in prompts), return_exceptions=True
+        )
+        for prompt, result in zip(prompts, results):
+            if isinstance(result, BaseException):
+                window[prompt].set_exception(result)
+            else:
+                window[prompt].set_result(result)
+
+    async def _send_packed(self, prompts: List[str]) -> Optional[List[str]]:
+        """The answers to `prompts` sent as one request; None if the reply cannot be split."""
+        max_tokens = min(MAX_TOKENS_PER_PROMPT * len(prompts), MAX_TOKENS_PER_REQUEST)
+        answers = unpack(await self._send(pack(prompts), max_tokens), len(prompts))
+        if answers is None or not all(answers):
+            logger.warning(
+                "Packed reply to %d prompts could not be split; sending them one by one",
+                len(prompts),
+            )
+            return None
+        return answers
+
+
+_batchers: "weakref.WeakKeyDictionary[object, CompletionBatcher]" = weakref.WeakKeyDictionary()
+_batchers_lock = threading.Lock()
+
+
+def get_completion_batcher(router) -> CompletionBatcher:
+    """Return the batcher sending completions through `router`, an `LLMRouter`."""
+    with _batchers_lock:
+        batcher = _batchers.get(router)
+        if batcher is None:
+            router_ref = weakref.ref(router)  # the batcher must not keep the router alive
+
+            async def complete(prompt: str, max_tokens: int) -> str:
+                record = await router_ref().complete(prompt, max_tokens)
+                logger.info("completion by %s in %.2fs", record.provider, record.latency)
+                return record.text
+
+            def packable() -> bool:
+                return router_ref().packable()
+
+            batcher = _batchers[router] = CompletionBatcher(complete, packable=packable)
+        return batcher
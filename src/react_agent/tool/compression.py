@@ -0,0 +1,68 @@
+"""Streaming gzip and zstd compression for `FileSaver`.
+
+Both formats allow compressed streams to be concatenated, so appending a
+new gzip member or zstd frame to a compressed file keeps it readable with
+`gzip -dc` / `zstd -dc` as one stream.
+"""
+
+import zlib
+from pathlib import Path
+from typing import Literal, Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+Compression = Literal["auto", "none", "gzip", "zstd"]
+
+_EXTENSIONS = {".gz": "gzip", ".gzip": "gzip", ".zst": "zstd", ".zstd": "zstd"}
+
+
+def resolve_compression(path: str, compression: Optional[str] = "auto") -> Optional[str]:
+    """The compression to save `path` with: "gzip", "zstd" or None.
+
+    "auto" (or None) picks it from the extension of `path`.
+    """
+    if compression in (None, "auto"):
+        compression = _EXTENSIONS.get(Path(path).suffix.lower())
+    elif compression == "none":
+        compression = None
+    elif compression not in ("gzip", "zstd"):
+        raise ValueError(
+            f"Unknown compression {compression!r}; use 'auto', 'none', 'gzip' or 'zstd'"
+        )
+    if compression == "zstd" and zstandard is None:
+        raise ValueError("zstd compression requires the `zstandard` package")
+    return compression
+
+
+class Compressor:
+    """Compresses a stream of chunks into one gzip member or zstd frame."""
+
+    def __init__(self, kind: str, level: Optional[int] = None):
+        if kind == "gzip":
+            self._compressor = zlib.compressobj(
+                level if level is not None else 6, zlib.DEFLATED, 31
+            )
+        elif kind == "zstd":
+            if zstandard is None:
+                raise ValueError("zstd compression requires the `zstandard` package")
+            self._compressor = zstandard.ZstdCompressor(
+                level=level if level is not None else 3
+            ).compressobj()
+        else:
+            raise ValueError(f"Unknown compression {kind!r}")
+        self.kind = kind
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+
+def compress(kind: str, data: bytes) -> bytes:
+    """`data` as one complete gzip member or zstd frame."""
+    compressor = Compressor(kind)
+    return compressor.compress(data) + compressor.flush()
@@ -2,18 +2,30 @@
 此模块提供了创建聊天完成的工具。
 """
 
+import asyncio
 import logging
-import os
-from typing import Any, Dict, List, Optional
+from typing import Optional
 
 from pydantic import Field
-from react_agent.tool.base import BaseTool
+from react_agent.tool.base import BaseTool, current_thread_id
+from react_agent.tool.completion_batcher import get_completion_batcher
+from react_agent.tool.llm_router import LLMRouter, NoProviderAvailable, get_llm_router
+from react_agent.tool.semantic_cache import SemanticCache
 
 logger = logging.getLogger(__name__)
 
 class CreateChatCompletion(BaseTool):
     """创建聊天完成的工具。"""
-    
+
+    router: LLMRouter = Field(default_factory=get_llm_router, exclude=True)
+    batching: bool = Field(default=True, exclude=True)
+    # 语义缓存默认关闭：相似的提示不一定有相同的回复，需由调用方显式启用；
+    # 缓存按对话线程隔离，不同对话之间不共享条目
+    cache: Optional[SemanticCache] = Field(default=None, exclude=True)
+    cache_namespace: str = Field(default="chat", exclude=True)
+    # 出错时抛出异常而不是返回说明文字，供需要区分失败的调用方（如缓存总结的场景）使用
+    raise_on_error: bool = Field(default=False, exclude=True)
+
     def __init__(self, **data):
         """初始化CreateChatCompletion工具。"""
         super().__init__(
@@ -35,145 +47,42 @@ class CreateChatCompletion(BaseTool):
     async def execute(self, prompt: str) -> str:
         """执行聊天完成。
 
+        按配置的顺序（REACT_AGENT_LLM_PROVIDERS）选择健康的提供方，跳过熔断中的
+        提供方；设置 REACT_AGENT_LLM_HEDGE_DELAY 时，慢的提供方会被对冲。
+        启用 `batching` 时，短时间内的多个短提示会合并为一次请求发送。
+        给定 `cache` 时，与当前对话线程中缓存的某个提示足够相似（在 `cache_namespace` 内）
+        则直接返回缓存的回复。
+        失败的回复不会被缓存；设置 `raise_on_error` 时，失败会抛出异常而不是返回说明文字。
+
         参数:
             prompt: 要发送给模型的提示文本
 
         返回:
             str: 模型生成的回复
         """
+        namespace = f"{self.cache_namespace}:{current_thread_id()}"
         try:
-            # 尝试使用OpenAI API
-            try:
-                import openai
-                
-                # 检查是否设置了API密钥
-                api_key = os.environ.get("OPENAI_API_KEY")
-                if not api_key:
-                    logger.warning("未设置OPENAI_API_KEY环境变量，尝试使用其他方法")
-                    raise ImportError("未设置OPENAI_API_KEY")
-                
-                # 创建客户端
-                client = openai.OpenAI(api_key=api_key)
-                
-                # 调用API
-                response = client.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=[
-                        {"role": "system", "content": "你是一个有用的AI助手。"},
-                        {"role": "user", "content": prompt}
-                    ],
-                    max_tokens=1000
-                )
-                
-                # 提取回复内容
-                if hasattr(response, 'choices') and len(response.choices) > 0:
-                    if hasattr(response.choices[0], 'message') and hasattr(response.choices[0].message, 'content'):
-                        return response.choices[0].message.content
-                    else:
-                        return str(response.choices[0])
-                else:
-                    return str(response)
-            
-            except (ImportError, Exception) as e:
-                logger.warning(f"使用OpenAI API失败: {str(e)}，尝试使用本地模型")
-                
-                # 尝试使用langchain
-                try:
-                    from langchain_openai import ChatOpenAI
-                    
-                    chat = ChatOpenAI(model="gpt-3.5-turbo")
-                    result = chat.invoke(prompt)
-                    return result.content
-                
-                except Exception as e:
-                    logger.warning(f"使用langchain失败: {str(e)}，尝试使用Anthropic")
-                    
-                    # 尝试使用Anthropic
-                    try:
-                        from langchain_anthropic import ChatAnthropic
-                        
-                        anthropic_api_key = os.environ.get("ANTHROPIC_API_KEY")
-                        if not anthropic_api_key:
-                            logger.warning("未设置ANTHROPIC_API_KEY环境变量，尝试使用其他方法")
-                            raise ImportError("未设置ANTHROPIC_API_KEY")
-                        
-                        chat = ChatAnthropic(model="claude-3-haiku-20240307")
-                        result = chat.invoke(prompt)
-                        return result.content
-                    
-                    except Exception as e:
-                        logger.warning(f"使用Anthropic失败: {str(e)}，尝试使用Google")
-                        
-                        # 尝试使用Google Gemini
-                        try:
-                            from langchain_google_genai import ChatGoogleGenerativeAI
-                            
-                            google_api_key = os.environ.get("GOOGLE_API_KEY")
-                            if not google_api_key:
-                                logger.warning("未设置GOOGLE_API_KEY环境变量，尝试使用其他方法")
-                                raise ImportError("未设置GOOGLE_API_KEY")
-                            
-                            chat = ChatGoogleGenerativeAI(model="gemini-pro")
-                            result = chat.invoke(prompt)
-                            return result.content
-                        
-                        except Exception as e:
-                            logger.warning(f"使用Google Gemini失败: {str(e)}，尝试使用本地模型")
-                            
-                            # 尝试使用本地模型
-                            try:
-                                import torch
-                                from transformers import AutoModelForCausalLM, AutoTokenizer
-                                
-                                # 使用较小的模型，适合本地运行
-                                model_name = "TinyLlama/TinyLlama-1.1B-Chat-v1.0"
-                                
-                                tokenizer = AutoTokenizer.from_pretrained(model_name)
-                                model = AutoModelForCausalLM.from_pretrained(
-                                    model_name, 
-                                    torch_dtype=torch.float16,
-                                    device_map="auto"
-                                )
-                                
-                                # 准备输入
-                                messages = [
-                                    {"role": "system", "content": "你是一个有用的AI助手。"},
-                                    {"role": "user", "content": prompt}
-                                ]
-                                
-                                # 将消息格式化为模型可接受的格式
-                                input_text = ""
-                                for msg in messages:
-                                    if msg["role"] == "system":
-                                        input_text += f"<|system|>\n{msg['content']}\n"
-                                    elif msg["role"] == "user":
-                                        input_text += f"<|user|>\n{msg['content']}\n"
-                                    elif msg["role"] == "assistant":
-                                        input_text += f"<|assistant|>\n{msg['content']}\n"
-                                
-                                input_text += "<|assistant|>\n"
-                                
-                                # 生成回复
-                                inputs = tokenizer(input_text, return_tensors="pt").to(model.device)
-                                outputs = model.generate(
-                                    inputs["input_ids"],
-                                    max_new_tokens=500,
-                                    temperature=0.7,
-                                    do_sample=True
-                                )
-                                
-                                # 解码并返回生成的文本
-                                generated_text = tokenizer.decode(outputs[0], skip_special_tokens=True)
-                                
-                                # 提取助手的回复
-                                assistant_response = generated_text.split("<|assistant|>\n")[-1].strip()
-                                return assistant_response
-                            
-                            except Exception as e:
-                                logger.warning(f"使用本地模型失败: {str(e)}，返回简单回复")
-                                
-                                # 如果所有方法都失败，返回一个简单的回复
-                                return f"""
+            if self.cache is not None:
+                cached = await asyncio.to_thread(self.cache.get, prompt, namespace)
+                if cached is not None:
+                    return cached
+            if self.batching:
+                reply = await get_completion_batcher(self.router).complete(prompt)
+            else:
+                record = await self.router.complete(prompt)
+                logger.info(f"聊天完成由 {record.provider} 生成，耗时 {record.latency:.2f} 秒")
+                reply = record.text
+            if self.cache is not None:
+                await asyncio.to_thread(self.cache.put, prompt, reply, namespace)
+            return reply
+
+        except NoProviderAvailable as e:
+            if self.raise_on_error:
+                raise
+            logger.warning(f"{str(e)}，返回简单回复")
+
+            # 如果所有方法都失败，返回一个简单的回复
+            return f"""
 我收到了你的问题: '{prompt}'。
 
 由于无法连接到任何外部或本地模型，我无法生成详细回复。这可能是由于以下原因：
@@ -185,11 +94,13 @@ class CreateChatCompletion(BaseTool):
 请尝试以下解决方案：
 - 设置OPENAI_API_KEY、ANTHROPIC_API_KEY或GOOGLE_API_KEY环境变量
 - 检查网络连接
-- 安装必要的依赖包（openai、langchain-openai、langchain-anthropic、langchain-google-genai、transformers、torch）
+- 安装必要的依赖包（openai、anthropic、langchain-google-genai、transformers、torch）
 
 或者，您可以直接向我提问，我会尽力提供帮助。
 """
-        
+
         except Exception as e:
             logger.error(f"创建聊天完成时出错: {str(e)}")
+            if self.raise_on_error:
+                raise
             return f"生成回复时出错: {str(e)}"
@@ -0,0 +1,283 @@
+"""In-process directory listing for the editor's `view` on directories.
+
+Replaces a `find -maxdepth 2` subprocess with an `os.scandir` walk that skips
+hidden entries and whatever `.gitignore` files ignore. Directory listings and
+parsed `.gitignore` files are cached per mtime, so listing an unchanged tree
+again only costs a `stat` per directory. Directories with too many entries
+are summarized rather than cut off mid-listing.
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+DEFAULT_MAX_DEPTH: int = 2
+DEFAULT_MAX_ENTRIES: int = 1000  # entries listed in total
+DEFAULT_MAX_DIR_ENTRIES: int = 100  # entries listed per directory
+MAX_CACHED_DIRECTORIES: int = 65536
+
+
+@dataclass(frozen=True)
+class _Rule:
+    regex: "re.Pattern[str]"
+    negate: bool
+    directory_only: bool
+    anchored: bool
+
+
+def _glob_to_regex(pattern: str) -> str:
+    """Translate a `.gitignore` glob into a regular expression."""
+    regex, i = "", 0
+    while i < len(pattern):
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            regex += "(?:.*/)?"
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == len(pattern):
+            regex += "/.*"
+            i += 3
+        elif pattern.startswith("**", i):
+            regex += ".*"
+            i += 2
+        elif c == "*":
+            regex += "[^/]*"
+            i += 1
+        elif c == "?":
+            regex += "[^/]"
+            i += 1
+        elif c == "[":
+            end = pattern.find("]", i + 2)
+            if end == -1:
+                regex += re.escape(c)
+                i += 1
+            else:
+                body = pattern[i + 1 : end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                regex += f"[{body.replace(chr(92), chr(92) * 2)}]"
+                i = end + 1
+        elif c == "\\" and i + 1 < len(pattern):
+            regex += re.escape(pattern[i + 1])
+            i += 2
+        else:
+            regex += re.escape(c)
+            i += 1
+    return regex
+
+
+def parse_gitignore(text: str) -> List[_Rule]:
+    """Parse the rules of a `.gitignore` file."""
+    rules = []
+    for line in text.splitlines():
+        if not line.strip() or line.startswith("#"):
+            continue
+        line = line.rstrip()
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        elif line.startswith("\\"):
+            line = line[1:]
+        directory_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            continue
+        anchored = "/" in line
+        line = line.lstrip("/")
+        rules.append(
+            _Rule(re.compile(_glob_to_regex(line)), negate, directory_only, anchored)
+        )
+    return rules
+
+
+class _IgnoreStack:
+    """The `.gitignore` rules in force in one directory."""
+
+    def __init__(self, scopes: Tuple[Tuple[str, Tuple[_Rule, ...]], ...] = ()):
+        # (base directory, rules) pairs from the outermost to the innermost
+        self.scopes = scopes
+
+    def extend(self, base: str, rules: List[_Rule]) -> "_IgnoreStack":
+        return _IgnoreStack(self.scopes + ((base, tuple(rules)),)) if rules else self
+
+    def ignored(self, path: str, is_dir: bool) -> bool:
+        ignored = False
+        # the last rule that matches decides, inner files overriding outer ones
+        for base, rules in self.scopes:
+            relative = os.path.relpath(path, base)
+            name = os.path.basename(path)
+            for rule in rules:
+                if rule.directory_only and not is_dir:
+                    continue
+                target = relative if rule.anchored else name
+                if rule.negate == ignored and rule.regex.fullmatch(target):
+                    ignored = not rule.negate
+        return ignored
+
+
+class DirectoryWalker:
+    """Cached, `.gitignore`-aware directory listings. Thread-safe."""
+
+    def __init__(self, max_cached: int = MAX_CACHED_DIRECTORIES):
+        self.max_cached = max_cached
+        # directory -> (mtime, sorted (name, is_dir) entries)
+        self._listings: "OrderedDict[str, Tuple[int, List[Tuple[str, bool]]]]" = OrderedDict()
+        # .gitignore path -> (mtime, rules)
+        self._ignores: "OrderedDict[str, Tuple[int, List[_Rule]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cached(self, cache: OrderedDict, key: str, mtime: int):
+        with self._lock:
+            hit = cache.get(key)
+            if hit is None or hit[0] != mtime:
+                return None
+            cache.move_to_end(key)
+            return hit[1]
+
+    def _store(self, cache: OrderedDict, key: str, mtime: int, value):
+        with self._lock:
+            cache[key] = (mtime, value)
+            cache.move_to_end(key)
+            while len(cache) > self.max_cached:
+                cache.popitem(last=False)
+
+    def _listing(self, directory: str) -> List[Tuple[str, bool]]:
+        mtime = os.stat(directory).st_mtime_ns
+        entries = self._cached(self._listings, directory, mtime)
+        if entries is None:
+            with os.scandir(directory) as it:
+                entries = sorted(
+                    (entry.name, entry.is_dir(follow_symlinks=False)) for entry in it
+                )
+            self._store(self._listings, directory, mtime, entries)
+        return entries
+
+    def _rules(self, path: str) -> List[_Rule]:
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return []
+        rules = self._cached(self._ignores, path, mtime)
+        if rules is None:
+            try:
+                with open(path, encoding="utf-8", errors="replace") as f:
+                    rules = parse_gitignore(f.read())
+            except OSError:
+                rules = []
+            self._store(self._ignores, path, mtime, rules)
+        return rules
+
+    def _outer_ignores(self, root: str) -> _IgnoreStack:
+        """The `.gitignore` rules of the repository directories above `root`."""
+        parents = []
+        directory = root
+        while True:
+            parent = os.path.dirname(directory)
+            if parent == directory or os.path.exists(os.path.join(directory, ".git")):
+                break
+            directory = parent
+            parents.append(directory)
+        stack = _IgnoreStack()
+        if not os.path.exists(os.path.join(directory, ".git")):
+            # `root` is not inside a repository
+            return stack
+        for directory in reversed(parents):
+            stack = stack.extend(directory, self._rules(os.path.join(directory, ".gitignore")))
+        return stack
+
+    def _visible(
+        self, directory: str, ignores: _IgnoreStack
+    ) -> Tuple[List[Tuple[str, bool]], _IgnoreStack]:
+        """The entries of `directory` that are neither hidden nor ignored."""
+        entries = self._listing(directory)
+        if any(name == ".gitignore" for name, _ in entries):
+            ignores = ignores.extend(
+                directory, self._rules(os.path.join(directory, ".gitignore"))
+            )
+        visible = [
+            (name, is_dir)
+            for name, is_dir in entries
+            if not name.startswith(".")
+            and not ignores.ignored(os.path.join(directory, name), is_dir)
+        ]
+        return visible, ignores
+
+    def iter_files(self, root: Path) -> Iterator[str]:
+        """Yield every file below `root` that `walk` would list at any depth."""
+        root = os.path.abspath(root)
+        pending = [(root, self._outer_ignores(root))]
+        while pending:
+            directory, ignores = pending.pop()
+            try:
+                visible, ignores = self._visible(directory, ignores)
+            except OSError:
+                continue
+            for name, is_dir in visible:
+                path = os.path.join(directory, name)
+                if is_dir:
+                    pending.append((path, ignores))
+                else:
+                    yield path
+
+    def walk(
+        self,
+        root: Path,
+        max_depth: int = DEFAULT_MAX_DEPTH,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_dir_entries: int = DEFAULT_MAX_DIR_ENTRIES,
+    ) -> List[str]:
+        """List `root` and the entries below it up to `max_depth` levels deep.
+
+        Returns lines like `find` prints them, depth first. Directories with
+        more than `max_dir_entries` visible entries, and whatever is left
+        once `max_entries` have been listed, are summarized in one line.
+        """
+        root = os.path.abspath(root)
+        lines = [root]
+        listed = 0
+
+        def visit(directory: str, depth: int, ignores: _IgnoreStack):
+            nonlocal listed
+            if listed >= max_entries:
+                lines.append(
+                    f"{directory}/... (not listed: the listing stopped after {max_entries} entries; view this directory to see it)"
+                )
+                return
+            try:
+                visible, ignores = self._visible(directory, ignores)
+            except OSError as e:
+                lines.append(f"{directory}/... (cannot be listed: {e.strerror})")
+                return
+            shown = visible[: min(max_dir_entries, max_entries - listed)]
+            listed += len(shown)
+            for name, is_dir in shown:
+                path = os.path.join(directory, name)
+                lines.append(path)
+                if is_dir and depth + 1 < max_depth:
+                    visit(path, depth + 1, ignores)
+            hidden = visible[len(shown) :]
+            if hidden:
+                directories = sum(is_dir for _, is_dir in hidden)
+                lines.append(
+                    f"{directory}/... ({len(hidden)} more entries: {len(hidden) - directories} files, {directories} directories)"
+                )
+
+        if max_depth > 0:
+            visit(root, 0, self._outer_ignores(root))
+        return lines
+
+
+_walker: Optional[DirectoryWalker] = None
+_walker_lock = threading.Lock()
+
+
+def get_directory_walker() -> DirectoryWalker:
+    """Return the process-wide directory walker, creating it on first use."""
+    global _walker
+    with _walker_lock:
+        if _walker is None:
+            _walker = DirectoryWalker()
+        return _walker
@@ -0,0 +1,225 @@
+"""Undo history for file edits, stored as reverse patches.
+
+Instead of a full copy of the file before every edit, each entry keeps only
+the span of text an edit replaced, which is enough to turn the edited file
+back into the original. All files share one byte budget: when it is
+exceeded, the oldest entries of the least recently edited files are moved
+to disk (if a spill directory is configured) or forgotten.
+"""
+
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Union
+from uuid import uuid4
+
+DEFAULT_HISTORY_BUDGET: int = int(
+    os.environ.get("REACT_AGENT_EDIT_HISTORY_BUDGET", 64 * 1024**2)
+)  # bytes
+_ENTRY_OVERHEAD: int = 200  # rough bytes per entry besides the replaced text
+
+
+def _digest(text: str) -> bytes:
+    return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+
+def _common_prefix(a: str, b: str) -> int:
+    """Length of the common prefix of `a` and `b`, in O(log n) slice compares."""
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[low:middle] == b[low:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def _common_suffix(a: str, b: str, limit: int) -> int:
+    """Length, at most `limit`, of the common suffix of `a` and `b`."""
+    low, high = 0, limit
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[len(a) - middle : len(a) - low] == b[len(b) - middle : len(b) - low]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+@dataclass
+class ReversePatch:
+    """Turns the text after an edit back into the text before it.
+
+    `new[start:end]` is replaced by `old`; `length` and `digest` (of
+    `new[start:end]`) check that the patch is applied to the right text.
+    """
+
+    start: int
+    end: int
+    old: str
+    length: int
+    digest: bytes
+
+    @classmethod
+    def between(cls, old: str, new: str) -> "ReversePatch":
+        start = _common_prefix(old, new)
+        suffix = _common_suffix(old, new, min(len(old), len(new)) - start)
+        end = len(new) - suffix
+        return cls(
+            start=start,
+            end=end,
+            old=old[start : len(old) - suffix],
+            length=len(new),
+            digest=_digest(new[start:end]),
+        )
+
+    @classmethod
+    def replacement(cls, start: int, old: str, new: str, length: int) -> "ReversePatch":
+        """Undo an edit that replaced `old` at `start` with `new`, leaving `length` characters."""
+        return cls(
+            start=start, end=start + len(new), old=old, length=length, digest=_digest(new)
+        )
+
+    @property
+    def size(self) -> int:
+        return len(self.old) + _ENTRY_OVERHEAD
+
+    def apply(self, new: str) -> str:
+        if len(new) != self.length or _digest(new[self.start : self.end]) != self.digest:
+            raise ValueError("the file was changed since this edit was made")
+        return new[: self.start] + self.old + new[self.end :]
+
+
+@dataclass
+class _Spilled:
+    path: Path
+    size: int = _ENTRY_OVERHEAD
+
+    def load(self) -> ReversePatch:
+        return pickle.loads(self.path.read_bytes())
+
+    def discard(self):
+        self.path.unlink(missing_ok=True)
+
+
+class EditHistory:
+    """Per-file undo stacks of reverse patches under a shared byte budget.
+
+    Thread-safe; files are kept in least recently edited order.
+    """
+
+    def __init__(
+        self,
+        budget: int = DEFAULT_HISTORY_BUDGET,
+        spill_dir: Optional[Path] = None,
+    ):
+        self.budget = budget
+        self.spill_dir = spill_dir
+        self._files: "OrderedDict[Path, List[Union[ReversePatch, _Spilled]]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        """Bytes of history held in memory."""
+        return self._size
+
+    def record(self, path: Path, old: str, new: str):
+        """Remember how to turn `new`, the text of `path` after an edit, back into `old`."""
+        self.push(path, ReversePatch.between(old, new))
+
+    def push(self, path: Path, patch: ReversePatch):
+        """Remember `patch` as the way to undo the last edit of `path`."""
+        with self._lock:
+            self._files.setdefault(path, []).append(patch)
+            self._files.move_to_end(path)
+            self._size += patch.size
+            self._shrink()
+
+    def undo(self, path: Path, current: str) -> Optional[str]:
+        """Pop the last edit of `path` and return `current` with it undone.
+
+        Returns None if there is no history; raises ValueError if `current`
+        is not the text that edit produced.
+        """
+        with self._lock:
+            entries = self._files.get(path)
+            if not entries:
+                return None
+            entry = entries[-1]
+            patch = entry.load() if isinstance(entry, _Spilled) else entry
+            text = patch.apply(current)
+            entries.pop()
+            self._size -= entry.size
+            if isinstance(entry, _Spilled):
+                entry.discard()
+            if not entries:
+                del self._files[path]
+            return text
+
+    def __contains__(self, path: Path) -> bool:
+        return bool(self._files.get(path))
+
+    def depth(self, path: Path) -> int:
+        """Number of edits of `path` that can be undone."""
+        return len(self._files.get(path, ()))
+
+    def clear(self, path: Optional[Path] = None):
+        """Forget the history of `path`, or of every file."""
+        with self._lock:
+            paths = [path] if path is not None else list(self._files)
+            for key in paths:
+                for entry in self._files.pop(key, []):
+                    self._size -= entry.size
+                    if isinstance(entry, _Spilled):
+                        entry.discard()
+
+    def _shrink(self):
+        for path in list(self._files):
+            entries = self._files[path]
+            while self._size > self.budget:
+                # the oldest entry of this file still held in memory
+                index = next(
+                    (i for i, entry in enumerate(entries) if not isinstance(entry, _Spilled)),
+                    None,
+                )
+                if index is None:
+                    break
+                entry = entries[index]
+                self._size -= entry.size
+                if self.spill_dir is not None:
+                    entries[index] = self._spill(entry)
+                    self._size += entries[index].size
+                else:
+                    # without a spill directory nothing is ever spilled, so
+                    # this is the oldest entry and can simply be forgotten
+                    del entries[0]
+            if not entries:
+                del self._files[path]
+            if self._size <= self.budget:
+                return
+
+    def _spill(self, patch: ReversePatch) -> _Spilled:
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        path = self.spill_dir / f"{uuid4().hex}.patch"
+        path.write_bytes(pickle.dumps(patch))
+        return _Spilled(path)
+
+
+_history: Optional[EditHistory] = None
+_history_lock = threading.Lock()
+
+
+def get_edit_history() -> EditHistory:
+    """Return the process-wide edit history, creating it on first use."""
+    global _history
+    with _history_lock:
+        if _history is None:
+            spill_dir = os.environ.get("REACT_AGENT_EDIT_HISTORY_SPILL_DIR")
+            _history = EditHistory(spill_dir=Path(spill_dir) if spill_dir else None)
+        return _history
@@ -1,8 +1,12 @@
+import asyncio
 import os
 
-import aiofiles
+from pydantic import Field
 
 from react_agent.tool.base import BaseTool
+from react_agent.tool.chunked_save import ChunkedSaves, SaveStats, get_chunked_saves
+from react_agent.tool.compression import resolve_compression
+from react_agent.tool.write_behind import WriteBehindBuffer, get_write_behind_buffer
 
 
 class FileSaver(BaseTool):
@@ -16,7 +20,7 @@ class FileSaver(BaseTool):
         "properties": {
             "content": {
                 "type": "string",
-                "description": "(required) The content to save to the file.",
+                "description": "The content to save to the file. Required for modes 'w' and 'a'; for 'open', 'chunk' and 'commit' it is an optional chunk of content.",
             },
             "file_path": {
                 "type": "string",
@@ -24,36 +28,103 @@ class FileSaver(BaseTool):
             },
             "mode": {
                 "type": "string",
-                "description": "(optional) The file opening mode. Default is 'w' for write. Use 'a' for append.",
-                "enum": ["w", "a"],
+                "description": "(optional) The file opening mode. Default is 'w' for write. Use 'a' for append. To save a large file in pieces, use 'open' to start a chunked save and get its handle, 'chunk' to write each piece, and 'commit' to finish it (or 'abort' to discard it); the file is only replaced on commit.",
+                "enum": ["w", "a", "open", "chunk", "commit", "abort"],
                 "default": "w",
             },
+            "handle": {
+                "type": "string",
+                "description": "The handle returned by mode 'open'. Required for modes 'chunk', 'commit' and 'abort'.",
+            },
+            "compression": {
+                "type": "string",
+                "description": "(optional) Compress the file. 'auto' (the default) uses gzip for .gz paths and zstd for .zst paths.",
+                "enum": ["auto", "none", "gzip", "zstd"],
+                "default": "auto",
+            },
         },
-        "required": ["content", "file_path"],
+        "required": ["file_path"],
     }
 
-    async def execute(self, content: str, file_path: str, mode: str = "w") -> str:
+    buffer: WriteBehindBuffer = Field(default_factory=get_write_behind_buffer, exclude=True)
+    saves: ChunkedSaves = Field(default_factory=get_chunked_saves, exclude=True)
+
+    async def execute(
+        self,
+        file_path: str,
+        content: str | None = None,
+        mode: str = "w",
+        handle: str | None = None,
+        compression: str = "auto",
+    ) -> str:
         """
         Save content to a file at the specified path.
 
+        Overwrites are committed atomically before this returns; appends are
+        buffered and written shortly after, together with other appends to
+        the same file. A chunked save writes to a temp file that replaces
+        the file on commit.
+
         Args:
-            content (str): The content to save to the file.
             file_path (str): The path where the file should be saved.
-            mode (str, optional): The file opening mode. Default is 'w' for write. Use 'a' for append.
+            content (str, optional): The content, or chunk of content, to save.
+            mode (str, optional): 'w' to write, 'a' to append, or 'open', 'chunk', 'commit' and 'abort' for a chunked save.
+            handle (str, optional): The handle of a chunked save.
+            compression (str, optional): 'auto', 'none', 'gzip' or 'zstd'.
 
         Returns:
             str: A message indicating the result of the operation.
         """
         try:
+            if mode in ("chunk", "commit", "abort"):
+                if not handle:
+                    return f"Error saving file: mode '{mode}' requires the handle returned by mode 'open'"
+                return await asyncio.to_thread(
+                    self._continue_save, mode, handle, file_path, content
+                )
+            if content is None and mode in ("w", "a"):
+                return f"Error saving file: mode '{mode}' requires content"
+
             # Ensure the directory exists
             directory = os.path.dirname(file_path)
             if directory and not os.path.exists(directory):
                 os.makedirs(directory)
 
-            # Write directly to the file
-            async with aiofiles.open(file_path, mode, encoding="utf-8") as file:
-                await file.write(content)
-
-            return f"Content successfully saved to {file_path}"
+            kind = resolve_compression(file_path, compression)
+            if mode == "a":
+                self.buffer.append(file_path, content, kind)
+                return f"Content successfully saved to {file_path} ({len(content.encode('utf-8'))} bytes appended)"
+            if mode == "open":
+                handle = await asyncio.to_thread(self._open_save, file_path, kind, content)
+                return f"Chunked save of {file_path} opened with handle {handle}. Write the content with mode 'chunk' and this handle, then finish with mode 'commit'."
+            if mode != "w":
+                return f"Error saving file: unknown mode '{mode}'"
+            raw, written = await asyncio.to_thread(
+                self.buffer.overwrite, file_path, content, kind
+            )
+            stats = SaveStats(file_path, raw, written, kind)
+            return f"Content successfully saved to {file_path} ({stats.describe()})"
         except Exception as e:
             return f"Error saving file: {str(e)}"
+
+    def _open_save(self, file_path: str, kind: str | None, content: str | None) -> str:
+        handle = self.saves.open(file_path, kind)
+        if content:
+            self.saves.write(handle, content)
+        return handle
+
+    def _continue_save(
+        self, mode: str, handle: str, file_path: str, content: str | None
+    ) -> str:
+        if mode == "abort":
+            self.saves.abort(handle, file_path)
+            return f"Chunked save {handle} of {file_path} aborted; the file was not changed"
+        stats = self.saves.write(handle, content, file_path) if content else None
+        if mode == "chunk":
+            if stats is None:
+                return "Error saving file: mode 'chunk' requires content"
+            return f"Chunk written to {file_path} (handle {handle}): {stats.describe()} so far"
+        # appends still buffered would otherwise land after the commit
+        self.buffer.flush(file_path)
+        stats = self.saves.commit(handle, file_path)
+        return f"Content successfully saved to {file_path} ({stats.describe()})"
@@ -1,9 +1,9 @@
-import asyncio
 from typing import List
 
-from googlesearch import search
+from pydantic import Field
 
 from react_agent.tool.base import BaseTool
+from react_agent.tool.search_router import SearchRouter, get_search_router
 
 
 class GoogleSearch(BaseTool):
@@ -30,6 +30,8 @@ class GoogleSearch(BaseTool):
         "required": ["query"],
     }
 
+    router: SearchRouter = Field(default_factory=get_search_router, exclude=True)
+
     async def execute(self, query: str, num_results: int = 10) -> List[str]:
         """
         Execute a Google search and return a list of URLs.
@@ -41,10 +43,6 @@ class GoogleSearch(BaseTool):
         Returns:
             List[str]: A list of URLs matching the search query.
         """
-        # Run the search in a thread pool to prevent blocking
-        loop = asyncio.get_event_loop()
-        links = await loop.run_in_executor(
-            None, lambda: list(search(query, num=num_results))
-        )
-
-        return links
+        # Query every configured backend at once and fuse their rankings
+        result = await self.router.search(query, num_results)
+        return [hit.url for hit in result.hits]
@@ -0,0 +1,224 @@
+"""Line-offset index over a memory-mapped file.
+
+Viewing a few lines of a huge file should not read all of it. A `LineIndex`
+maps the file and records where lines start, scanning only as far as the
+lines asked for. To stay small on files with millions of lines it keeps the
+offset of every `STRIDE`-th line and finds the lines in between with a short
+forward scan. Indexes are cached per (path, mtime, size); when a file has
+grown since it was indexed and looks only appended to (its old head and
+tail bytes are unchanged and every recorded line start still follows a
+newline), the cached index is extended instead of rebuilt. Any other
+change, including one that keeps the size, rebuilds it.
+
+Lines are separated by "\\n", like `str.split("\\n")`, and a "\\r" before
+the "\\n" is dropped.
+"""
+
+import codecs
+import mmap
+import os
+import threading
+from array import array
+from collections import OrderedDict
+from itertools import accumulate
+from operator import add
+from pathlib import Path
+from typing import Optional
+
+STRIDE: int = 64  # lines between recorded offsets
+MAX_CACHED_INDEXES: int = 32
+_SCAN_CHUNK: int = 1024**2  # bytes
+_FINGERPRINT: int = 4096  # bytes compared to detect appends
+
+
+class LineIndex:
+    """Lazily built line-start offsets of one file."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._data = b""
+        self._checkpoints = array("q", [0])  # offsets of lines 0, STRIDE, 2*STRIDE, ...
+        self._lines = 1  # lines whose start has been found
+        self._scanned = 0  # bytes scanned for line starts
+        self._lock = threading.RLock()
+        self._map()
+
+    def _map(self):
+        stat = os.fstat(self._file.fileno())
+        self.inode, self.mtime, self.size = stat.st_ino, stat.st_mtime_ns, stat.st_size
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._data = (
+            mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if self.size
+            else b""
+        )
+        self._fingerprint = self._fingerprint_at(self.size)
+
+    def _fingerprint_at(self, size: int) -> bytes:
+        head = self._data[: min(size, _FINGERPRINT)]
+        return head + self._data[max(0, size - _FINGERPRINT) : size]
+
+    def refresh(self) -> bool:
+        """Catch up with the file on disk.
+
+        Returns False if the file was changed other than by appending to it,
+        or without growing, in which case the index is stale and must be
+        rebuilt.
+        """
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        with self._lock:
+            return self._refresh(stat)
+
+    def _refresh(self, stat) -> bool:
+        if (stat.st_ino, stat.st_mtime_ns, stat.st_size) == (self.inode, self.mtime, self.size):
+            return True
+        # an edit in place that keeps the size is not an append
+        if stat.st_ino != self.inode or stat.st_size <= self.size:
+            return False
+        old_size, fingerprint = self.size, self._fingerprint
+        self._map()
+        if self._fingerprint_at(old_size) != fingerprint:
+            return False
+        # an edit between the fingerprinted ends moves the lines after it
+        data = self._data
+        return all(data[offset - 1] == 0x0A for offset in self._checkpoints[1:])
+
+    def close(self):
+        with self._lock:
+            if isinstance(self._data, mmap.mmap):
+                self._data.close()
+            self._file.close()
+
+    def _scan(self, lines: Optional[int] = None):
+        """Find line starts until `lines` are known, or to the end of the file."""
+        while self._scanned < self.size and (lines is None or self._lines < lines):
+            start = self._scanned
+            parts = self._data[start : start + _SCAN_CHUNK].split(b"\n")
+            # offsets of the lines starting after each newline in the chunk
+            starts = list(
+                map(add, accumulate(map(len, parts[:-1])), range(start + 1, start + len(parts)))
+            )
+            first = -self._lines % STRIDE
+            self._checkpoints.extend(starts[first::STRIDE])
+            self._lines += len(starts)
+            # resume at the start of the last, possibly incomplete, line
+            self._scanned = starts[-1] if starts else start + len(parts[0])
+
+    def line_count(self) -> int:
+        """Number of lines in the file, as `len(text.split("\\n"))` counts them."""
+        with self._lock:
+            self._scan()
+            return self._lines
+
+    def has_line(self, number: int) -> bool:
+        """Whether the file has a line `number` (1-based)."""
+        with self._lock:
+            self._scan(number)
+            return number <= self._lines
+
+    def _line_start(self, line: int) -> int:
+        """Offset of 0-based `line`, which must have been scanned."""
+        offset = self._checkpoints[line // STRIDE]
+        for _ in range(line % STRIDE):
+            offset = self._data.find(b"\n", offset) + 1
+        return offset
+
+    def read(self, first: int, last: int = -1, max_bytes: Optional[int] = None) -> str:
+        """Return lines `first` to `last` (1-based, inclusive; -1 for the end).
+
+        Lines are joined with "\\n" without a trailing one. At most
+        `max_bytes` are read; text cut off at that limit is simply missing.
+        """
+        with self._lock:
+            self._scan(first)
+            start = self._line_start(first - 1)
+            end = self.size
+            if last != -1:
+                # find the newline ending line `last` by scanning forward
+                offset = start
+                for _ in range(last - first + 1):
+                    if max_bytes is not None and offset - start > max_bytes:
+                        break
+                    newline = self._data.find(b"\n", offset)
+                    if newline == -1:
+                        break
+                    offset = newline + 1
+                else:
+                    end = offset - 1
+            cut = max_bytes is not None and end - start > max_bytes
+            if cut:
+                end = start + max_bytes
+            data = self._data[start:end]
+        # a character split by the `max_bytes` cut is dropped, not an error
+        text = codecs.getincrementaldecoder("utf-8")().decode(data, final=not cut)
+        return text.replace("\r\n", "\n")
+
+
+_cache: "OrderedDict[Path, LineIndex]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_line_index(path: Path) -> LineIndex:
+    """Return an up-to-date index of `path`, reusing a cached one if possible."""
+    with _cache_lock:
+        index = _cache.pop(path, None)
+        if index is not None and not index.refresh():
+            index.close()
+            index = None
+        if index is None:
+            index = LineIndex(path)
+        _cache[path] = index
+        while len(_cache) > MAX_CACHED_INDEXES:
+            _cache.popitem(last=False)[1].close()
+        return index
+
+
+def forget_line_index(path: Path):
+    """Drop the cached index of `path`, e.g. after rewriting the file."""
+    with _cache_lock:
+        index = _cache.pop(path, None)
+    if index is not None:
+        index.close()
+
+
+def read_lines_around(
+    path: Path, offset: int, before: int, after: int, max_bytes: Optional[int] = None
+) -> str:
+    """Return the line of `path` containing byte `offset`, with up to
+    `before` lines preceding it and `after` lines following it.
+
+    Only the bytes of those lines are read; `max_bytes` caps them as in
+    `LineIndex.read`.
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if not size:
+            return ""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            start = offset
+            for _ in range(before + 1):
+                start = data.rfind(b"\n", 0, start)
+                if start == -1:
+                    break
+            start += 1
+            end = offset
+            for _ in range(after + 1):
+                if max_bytes is not None and end - start > max_bytes:
+                    break
+                end = data.find(b"\n", end)
+                if end == -1:
+                    end = size
+                    break
+                end += 1
+            else:
+                end -= 1
+            cut = max_bytes is not None and end - start > max_bytes
+            if cut:
+                end = start + max_bytes
+            text = codecs.getincrementaldecoder("utf-8")().decode(data[start:end], final=not cut)
+    return text.replace("\r\n", "\n")
@@ -0,0 +1,369 @@
+"""Routing of chat completions over several LLM providers.
+
+Providers are tried in a configured order. Each has a circuit breaker: after
+`failure_threshold` consecutive failures it is skipped for `reset_timeout`
+seconds, then a single trial call decides whether it is closed again or
+stays open. With a `hedge_delay`, the next provider is also started when
+the current one has not answered within that many seconds, and the first
+answer wins.
+
+The clients of the remote providers are async and created once per event
+loop, so their HTTP connection pools are reused across calls. Every
+call records which provider answered and how long it took.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+import weakref
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = "你是一个有用的AI助手。"
+
+DEFAULT_PROVIDER_ORDER: List[str] = os.environ.get(
+    "REACT_AGENT_LLM_PROVIDERS", "openai,anthropic,gemini,local"
+).split(",")
+DEFAULT_HEDGE_DELAY: Optional[float] = (
+    float(os.environ["REACT_AGENT_LLM_HEDGE_DELAY"])
+    if os.environ.get("REACT_AGENT_LLM_HEDGE_DELAY")
+    else None
+)  # seconds; None disables hedging
+DEFAULT_PROVIDER_DEADLINE: float = 60.0  # seconds
+DEFAULT_FAILURE_THRESHOLD: int = 3
+DEFAULT_RESET_TIMEOUT: float = 30.0  # seconds
+MAX_HISTORY: int = 256
+MAX_TOKENS: int = 1000  # of a reply, unless the caller asks for more
+
+CompleteFunction = Callable[..., Awaitable[str]]
+
+
+class NoProviderAvailable(RuntimeError):
+    """Every provider failed or had its circuit open."""
+
+
+@dataclass
+class Provider:
+    name: str
+    complete: CompleteFunction  # (prompt, max_tokens=...) -> reply
+    deadline: float = DEFAULT_PROVIDER_DEADLINE
+    # whether it can answer several prompts packed into one; small models
+    # run out of context or mix up the parts
+    packable: bool = True
+
+
+class CircuitBreaker:
+    """Closed, open after repeated failures, half-open once it may be retried."""
+
+    def __init__(
+        self,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        reset_timeout: float = DEFAULT_RESET_TIMEOUT,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial = False  # a half-open trial call is in flight
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return "open"
+        return "half-open"
+
+    def allow(self) -> bool:
+        """Whether a call may be made now; a half-open breaker allows one."""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def succeeded(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def failed(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial = False
+
+    def released(self):
+        """A call allowed by `allow` was cancelled before it finished."""
+        with self._lock:
+            self._trial = False
+
+
+@dataclass
+class ProviderHealth:
+    calls: int = 0
+    successes: int = 0
+    failures: int = 0
+    skipped: int = 0  # times its circuit was open
+    total_latency: float = 0.0  # of successful calls
+    last_error: Optional[str] = None
+    breaker: CircuitBreaker = field(default_factory=CircuitBreaker)
+
+    @property
+    def mean_latency(self) -> float:
+        return self.total_latency / self.successes if self.successes else 0.0
+
+
+@dataclass
+class CompletionRecord:
+    """Which provider answered a call, and how long the call took."""
+
+    text: str
+    provider: str
+    latency: float  # of the whole call, fallbacks and hedges included
+    attempts: List[str]  # providers called, in order
+
+
+class LLMRouter:
+    """Sends completions to the first healthy provider of `providers`."""
+
+    def __init__(
+        self,
+        providers: List[Provider],
+        hedge_delay: Optional[float] = DEFAULT_HEDGE_DELAY,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        reset_timeout: float = DEFAULT_RESET_TIMEOUT,
+    ):
+        self.providers = providers
+        self.hedge_delay = hedge_delay
+        self.health: Dict[str, ProviderHealth] = {
+            p.name: ProviderHealth(breaker=CircuitBreaker(failure_threshold, reset_timeout))
+            for p in providers
+        }
+        self.history: Deque[CompletionRecord] = deque(maxlen=MAX_HISTORY)
+        self._lock = threading.Lock()
+
+    async def _call(self, provider: Provider, prompt: str, max_tokens: Optional[int]) -> str:
+        health = self.health[provider.name]
+        options = {} if max_tokens is None else {"max_tokens": max_tokens}
+        start = time.monotonic()
+        try:
+            text = await asyncio.wait_for(provider.complete(prompt, **options), provider.deadline)
+        except asyncio.CancelledError:
+            health.breaker.released()
+            raise
+        except Exception as e:
+            health.breaker.failed()
+            with self._lock:
+                health.calls += 1
+                health.failures += 1
+                health.last_error = f"{type(e).__name__}: {e}"
+            raise
+        health.breaker.succeeded()
+        with self._lock:
+            health.calls += 1
+            health.successes += 1
+            health.total_latency += time.monotonic() - start
+        return text
+
+    def _available(self) -> List[Provider]:
+        available = []
+        for provider in self.providers:
+            if self.health[provider.name].breaker.allow():
+                available.append(provider)
+            else:
+                with self._lock:
+                    self.health[provider.name].skipped += 1
+        return available
+
+    def packable(self) -> bool:
+        """Whether the provider a call would go to first now accepts packed prompts."""
+        for provider in self.providers:
+            if self.health[provider.name].breaker.state != "open":
+                return provider.packable
+        return False
+
+    async def complete(self, prompt: str, max_tokens: Optional[int] = None) -> CompletionRecord:
+        """Complete `prompt`, falling back and hedging across providers.
+
+        `max_tokens` bounds the reply, where the provider supports it. Raises `NoProviderAvailable` when every provider failed or was
+        skipped.
+        """
+        start = time.monotonic()
+        waiting = self._available()
+        attempts: List[str] = []
+        running: Dict[asyncio.Task, str] = {}
+        errors: Dict[str, str] = {}
+
+        def start_next():
+            provider = waiting.pop(0)
+            attempts.append(provider.name)
+            running[asyncio.create_task(self._call(provider, prompt, max_tokens))] = provider.name
+
+        if waiting:
+            start_next()
+        try:
+            while running:
+                done, _ = await asyncio.wait(
+                    running,
+                    timeout=self.hedge_delay if waiting else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    # the current provider is slow; hedge with the next one
+                    start_next()
+                    continue
+                for task in done:
+                    name = running.pop(task)
+                    try:
+                        text = task.result()
+                    except Exception as e:
+                        logger.warning("LLM provider %s failed: %s", name, e)
+                        errors[name] = str(e)
+                        if waiting:
+                            start_next()
+                        continue
+                    record = CompletionRecord(text, name, time.monotonic() - start, attempts)
+                    self.history.append(record)
+                    logger.debug(
+                        "completion by %s in %.3fs (tried %s)", name, record.latency, attempts
+                    )
+                    return record
+        finally:
+            for task in running:
+                task.cancel()
+            for provider in waiting:
+                # never called, so give back a half-open trial `allow` granted
+                self.health[provider.name].breaker.released()
+        # providers skipped by their breaker were never tried
+        raise NoProviderAvailable(
+            "No LLM provider could answer: "
+            + (", ".join(f"{n}: {e}" for n, e in errors.items()) or "all circuits are open")
+        )
+
+    def report(self) -> Dict[str, Dict[str, object]]:
+        """Health of every provider, for logging and debugging."""
+        with self._lock:
+            return {
+                name: {
+                    "state": h.breaker.state,
+                    "calls": h.calls,
+                    "failures": h.failures,
+                    "skipped": h.skipped,
+                    "mean_latency": round(h.mean_latency, 3),
+                    "last_error": h.last_error,
+                }
+                for name, h in self.health.items()
+            }
+
+
+# Pooled clients, one per event loop (an async HTTP pool cannot be shared
+# between loops), so their connections are reused across calls.
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, object]]" = (
+    weakref.WeakKeyDictionary()
+)
+_clients_lock = threading.Lock()
+
+
+def _client(name: str, create: Callable[[], object]) -> object:
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        clients = _clients.setdefault(loop, {})
+        if name not in clients:
+            clients[name] = create()
+        return clients[name]
+
+
+def _messages(prompt: str) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt},
+    ]
+
+
+async def _openai(prompt: str, max_tokens: int = MAX_TOKENS) -> str:
+    import openai
+
+    client = _client("openai", lambda: openai.AsyncOpenAI(api_key=os.environ["OPENAI_API_KEY"]))
+    response = await client.chat.completions.create(
+        model="gpt-3.5-turbo", messages=_messages(prompt), max_tokens=max_tokens
+    )
+    return response.choices[0].message.content
+
+
+async def _anthropic(prompt: str, max_tokens: int = MAX_TOKENS) -> str:
+    import anthropic
+
+    client = _client(
+        "anthropic", lambda: anthropic.AsyncAnthropic(api_key=os.environ["ANTHROPIC_API_KEY"])
+    )
+    response = await client.messages.create(
+        model="claude-3-haiku-20240307",
+        system=SYSTEM_PROMPT,
+        messages=[{"role": "user", "content": prompt}],
+        max_tokens=max_tokens,
+    )
+    return "".join(block.text for block in response.content if block.type == "text")
+
+
+async def _gemini(prompt: str, max_tokens: int = MAX_TOKENS) -> str:
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    chat = _client("gemini", lambda: ChatGoogleGenerativeAI(model="gemini-pro"))
+    result = await chat.ainvoke(
+        _messages(prompt), generation_config={"max_output_tokens": max_tokens}
+    )
+    return result.content
+
+
+async def _local(prompt: str, max_tokens: int = MAX_TOKENS) -> str:
+    from react_agent.tool.local_model import get_local_model_worker
+
+    return await get_local_model_worker().generate(prompt, max_new_tokens=max_tokens)
+
+
+def default_providers(order: List[str] = DEFAULT_PROVIDER_ORDER) -> List[Provider]:
+    """The providers configured in this environment, in `order`.
+
+    A remote provider is used only if its API key is set: OPENAI_API_KEY,
+    ANTHROPIC_API_KEY or GOOGLE_API_KEY. The local model is always usable.
+    """
+    available = {
+        "openai": (_openai, "OPENAI_API_KEY", DEFAULT_PROVIDER_DEADLINE),
+        "anthropic": (_anthropic, "ANTHROPIC_API_KEY", DEFAULT_PROVIDER_DEADLINE),
+        "gemini": (_gemini, "GOOGLE_API_KEY", DEFAULT_PROVIDER_DEADLINE),
+        "local": (_local, None, 10 * DEFAULT_PROVIDER_DEADLINE),
+    }
+    providers = []
+    for name in (name.strip() for name in order):
+        if name not in available:
+            logger.warning("Unknown LLM provider %r ignored", name)
+            continue
+        complete, key, deadline = available[name]
+        if key is None or os.environ.get(key):
+            providers.append(Provider(name, complete, deadline, packable=name != "local"))
+    return providers
+
+
+_router: Optional[LLMRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_llm_router() -> LLMRouter:
+    """Return the process-wide LLM router, creating it on first use."""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = LLMRouter(default_providers())
+        return _router
@@ -0,0 +1,272 @@
+"""A resident worker process for local-model inference.
+
+The model is loaded once, in a separate process started on first use, and
+kept there. Prompts are sent to it over a queue and batched dynamically:
+the worker takes the first waiting prompt, then keeps collecting until it
+has `max_batch` prompts or `max_wait` seconds have passed, and generates
+replies for the whole batch at once. Prompts arriving during a generation
+wait for the next batch. A prompt whose caller has timed out is dropped
+before generation. Each prompt carries its own bound on new tokens; a
+batch is generated with the largest bound of its prompts.
+
+The model is chosen by a loader, given as "module:function". The function
+is called in the worker and returns a function mapping a list of prompts
+and a bound on new tokens to a list of replies.
+"""
+
+import asyncio
+import atexit
+import importlib
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL: str = os.environ.get(
+    "REACT_AGENT_LOCAL_MODEL", "TinyLlama/TinyLlama-1.1B-Chat-v1.0"
+)
+DEFAULT_LOADER: str = "react_agent.tool.local_model:load_chat_model"
+DEFAULT_MAX_BATCH: int = int(os.environ.get("REACT_AGENT_LOCAL_MODEL_MAX_BATCH", 4))
+DEFAULT_MAX_WAIT: float = float(
+    os.environ.get("REACT_AGENT_LOCAL_MODEL_MAX_WAIT", 0.05)
+)  # seconds
+DEFAULT_TIMEOUT: float = 600.0  # seconds, loading included
+MAX_NEW_TOKENS: int = 500
+SYSTEM_PROMPT = "你是一个有用的AI助手。"
+
+GenerateBatch = Callable[[List[str], int], List[str]]  # (prompts, max_new_tokens) -> replies
+
+
+def load_chat_model(model_name: str = DEFAULT_MODEL) -> GenerateBatch:
+    """Load a chat model with transformers, on CPU."""
+    import torch
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    tokenizer.padding_side = "left"  # so every prompt ends where generation starts
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    model = AutoModelForCausalLM.from_pretrained(model_name, torch_dtype=torch.float32)
+    model.eval()
+
+    def generate(prompts: List[str], max_new_tokens: int = MAX_NEW_TOKENS) -> List[str]:
+        texts = [
+            f"<|system|>\n{SYSTEM_PROMPT}\n<|user|>\n{prompt}\n<|assistant|>\n"
+            for prompt in prompts
+        ]
+        inputs = tokenizer(texts, return_tensors="pt", padding=True)
+        with torch.inference_mode():
+            outputs = model.generate(
+                **inputs,
+                max_new_tokens=max_new_tokens,
+                temperature=0.7,
+                do_sample=True,
+                pad_token_id=tokenizer.pad_token_id,
+            )
+        replies = outputs[:, inputs["input_ids"].shape[1] :]
+        return [
+            text.strip() for text in tokenizer.batch_decode(replies, skip_special_tokens=True)
+        ]
+
+    return generate
+
+
+def _load(loader: str) -> GenerateBatch:
+    module, _, function = loader.partition(":")
+    return getattr(importlib.import_module(module), function)()
+
+
+# A request is (id, prompt, deadline, max_new_tokens), a reply (id, text,
+# error). A reply with id None reports that the worker could not start.
+Request = Tuple[int, str, float, int]
+Reply = Tuple[Optional[int], Optional[str], Optional[str]]
+
+
+def _serve(loader: str, requests, replies, max_batch: int, max_wait: float):
+    """The worker process: load the model, then answer batches until told to stop."""
+    try:
+        generate = _load(loader)
+    except BaseException as e:
+        replies.put((None, None, f"Loading the local model failed: {type(e).__name__}: {e}"))
+        return
+    stopping = False
+    while not stopping:
+        first = requests.get()
+        if first is None:
+            break
+        batch: List[Request] = [first]
+        end = time.monotonic() + max_wait
+        while len(batch) < max_batch:
+            try:
+                request = requests.get(timeout=max(0.0, end - time.monotonic()))
+            except queue.Empty:
+                break
+            if request is None:
+                stopping = True
+                break
+            batch.append(request)
+
+        now = time.time()
+        live = [request for request in batch if request[2] > now]
+        for request_id, _, deadline, _ in batch:
+            if deadline <= now:
+                replies.put((request_id, None, "Timed out waiting for the local model"))
+        if not live:
+            continue
+        try:
+            texts = generate(
+                [prompt for _, prompt, _, _ in live], max(request[3] for request in live)
+            )
+        except Exception as e:
+            for request_id, *_ in live:
+                replies.put((request_id, None, f"{type(e).__name__}: {e}"))
+            continue
+        for (request_id, *_), text in zip(live, texts):
+            replies.put((request_id, text, None))
+
+
+class LocalModelWorker:
+    """Async interface to a lazily started, long-lived inference process."""
+
+    def __init__(
+        self,
+        loader: str = DEFAULT_LOADER,
+        max_batch: int = DEFAULT_MAX_BATCH,
+        max_wait: float = DEFAULT_MAX_WAIT,
+        timeout: float = DEFAULT_TIMEOUT,
+    ):
+        self.loader = loader
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.timeout = timeout
+        self._context = multiprocessing.get_context("spawn")
+        self._process = None
+        self._requests = None
+        # request id -> (worker process, loop of the caller, future of the reply)
+        self._pending: Dict[int, Tuple[object, asyncio.AbstractEventLoop, asyncio.Future]] = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    def _start(self):
+        # called with `_lock` held
+        if self._process is not None and self._process.is_alive():
+            return
+        self._requests = self._context.Queue()
+        replies = self._context.Queue()
+        self._process = self._context.Process(
+            target=_serve,
+            args=(self.loader, self._requests, replies, self.max_batch, self.max_wait),
+            name="local-model-worker",
+            daemon=True,
+        )
+        self._process.start()
+        threading.Thread(
+            target=self._read_replies,
+            args=(self._process, replies),
+            name="local-model-replies",
+            daemon=True,
+        ).start()
+        logger.info("Started local model worker %s (%s)", self._process.pid, self.loader)
+
+    def _read_replies(self, process, replies):
+        while True:
+            try:
+                request_id, text, error = replies.get(timeout=1.0)
+            except queue.Empty:
+                if process.is_alive():
+                    continue
+                self._fail_pending(process, "The local model worker exited")
+                return
+            if request_id is None:
+                self._fail_pending(process, error)
+                return
+            self._resolve(request_id, text, error)
+
+    def _fail_pending(self, process, error: str):
+        with self._lock:
+            if self._process is process:
+                self._process = None
+            failed = [i for i, (p, _, _) in self._pending.items() if p is process]
+            pending = [self._pending.pop(i) for i in failed]
+        for _, loop, future in pending:
+            _call_soon(loop, future, None, error)
+
+    def _resolve(self, request_id: int, text: Optional[str], error: Optional[str]):
+        with self._lock:
+            entry = self._pending.pop(request_id, None)
+        if entry is not None:
+            _, loop, future = entry
+            _call_soon(loop, future, text, error)
+
+    async def generate(
+        self,
+        prompt: str,
+        timeout: Optional[float] = None,
+        max_new_tokens: int = MAX_NEW_TOKENS,
+    ) -> str:
+        """The model's reply to `prompt`, of at most `max_new_tokens` tokens.
+
+        Raises TimeoutError after `timeout` seconds.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        request_id = next(self._ids)
+        with self._lock:
+            self._start()
+            self._pending[request_id] = (self._process, loop, future)
+            self._requests.put((request_id, prompt, time.time() + timeout, max_new_tokens))
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            with self._lock:
+                self._pending.pop(request_id, None)
+
+    def close(self, timeout: float = 5.0):
+        """Stop the worker, letting it finish the current batch first."""
+        with self._lock:
+            process, self._process = self._process, None
+            requests = self._requests
+        if process is None:
+            return
+        requests.put(None)
+        process.join(timeout)
+        if process.is_alive():
+            process.kill()
+            process.join()
+
+
+def _call_soon(loop, future, text: Optional[str], error: Optional[str]):
+    try:
+        loop.call_soon_threadsafe(_set_result, future, text, error)
+    except RuntimeError:
+        pass  # the caller's loop is closed, so nobody is waiting
+
+
+def _set_result(future: asyncio.Future, text: Optional[str], error: Optional[str]):
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(RuntimeError(error))
+    else:
+        future.set_result(text)
+
+
+_worker: Optional[LocalModelWorker] = None
+_worker_lock = threading.Lock()
+
+
+def get_local_model_worker() -> LocalModelWorker:
+    """Return the process-wide local model worker, creating it on first use."""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = LocalModelWorker()
+            atexit.register(_worker.close)
+        return _worker
@@ -0,0 +1,146 @@
+"""Outlines of source files for the editor's `outline` command.
+
+An outline lists the classes and functions of a file with their signatures
+and line ranges, so a large file can be navigated without reading all of
+it. Python files are parsed with `ast`; other languages, and Python that
+does not parse, fall back to matching definition keywords line by line,
+with ranges inferred from indentation. Outlines are cached by the hash of
+the file contents.
+"""
+
+import ast
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Tuple
+
+MAX_CACHED_OUTLINES: int = 128
+MAX_SIGNATURE_LEN: int = 200
+
+_DEFINITION = re.compile(
+    r"^(?P<indent>[ \t]*)"
+    r"(?:(?:export|default|public|private|protected|internal|static|abstract|final"
+    r"|async|pub(?:\([^)]*\))?|unsafe|extern|const)\s+)*"
+    r"(?:def|class|function\*?|fn|func|interface|struct|enum|trait|impl|module|type)\s+[\w$(]"
+)
+# `const name = (...) =>` and `const name = async x =>`
+_ARROW_FUNCTION = re.compile(
+    r"^(?P<indent>[ \t]*)(?:export\s+)?(?:const|let|var)\s+[\w$]+\s*=\s*(?:async\s+)?"
+    r"(?:\([^)]*\)|[\w$]+)\s*(?::[^=]+)?=>"
+)
+
+
+@dataclass(frozen=True)
+class OutlineEntry:
+    depth: int  # nesting level, 0 at the top of the file
+    start: int  # 1-based, including decorators
+    end: int  # 1-based, inclusive
+    signature: str
+
+
+def _shorten(signature: str) -> str:
+    signature = " ".join(signature.split())
+    if len(signature) > MAX_SIGNATURE_LEN:
+        signature = signature[: MAX_SIGNATURE_LEN - 3] + "..."
+    return signature
+
+
+def _python_signature(node: ast.AST) -> str:
+    if isinstance(node, ast.ClassDef):
+        bases = [ast.unparse(base) for base in node.bases]
+        bases += [ast.unparse(keyword) for keyword in node.keywords]
+        return f"class {node.name}({', '.join(bases)})" if bases else f"class {node.name}"
+    prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+    signature = f"{prefix} {node.name}({ast.unparse(node.args)})"
+    if node.returns is not None:
+        signature += f" -> {ast.unparse(node.returns)}"
+    return signature
+
+
+def _python_outline(text: str) -> List[OutlineEntry]:
+    entries: List[OutlineEntry] = []
+
+    def visit(body: List[ast.stmt], depth: int):
+        for node in body:
+            if not isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+                continue
+            start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+            entries.append(
+                OutlineEntry(depth, start, node.end_lineno, _shorten(_python_signature(node)))
+            )
+            # methods and nested classes, but not functions local to a function
+            if isinstance(node, ast.ClassDef):
+                visit(node.body, depth + 1)
+
+    visit(ast.parse(text).body, 0)
+    return entries
+
+
+def _generic_outline(text: str) -> List[OutlineEntry]:
+    lines = text.split("\n")
+    found: List[Tuple[int, int, str]] = []  # (indent, line, signature)
+    for number, line in enumerate(lines, 1):
+        match = _DEFINITION.match(line) or _ARROW_FUNCTION.match(line)
+        if match:
+            indent = len(match.group("indent").expandtabs())
+            found.append((indent, number, _shorten(line.strip().rstrip("{").rstrip())))
+
+    def last_content_line(before: int) -> int:
+        """The last non-blank line before line `before`."""
+        end = before - 1
+        while end > 1 and not lines[end - 1].strip():
+            end -= 1
+        return end
+
+    entries: List[OutlineEntry] = []
+    open_indents: List[int] = []
+    for i, (indent, number, signature) in enumerate(found):
+        while open_indents and open_indents[-1] >= indent:
+            open_indents.pop()
+        # a definition ends where the next one at the same or an outer level starts
+        following = next(
+            (line for other, line, _ in found[i + 1 :] if other <= indent),
+            len(lines) + 1,
+        )
+        end = max(number, last_content_line(following))
+        entries.append(OutlineEntry(len(open_indents), number, end, signature))
+        open_indents.append(indent)
+    return entries
+
+
+def outline(text: str, path: Path) -> List[OutlineEntry]:
+    """The classes and functions defined in `text`, the contents of `path`."""
+    if path.suffix in (".py", ".pyi"):
+        try:
+            return _python_outline(text)
+        except (SyntaxError, ValueError):
+            pass
+    return _generic_outline(text)
+
+
+_cache: "OrderedDict[bytes, List[OutlineEntry]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_outline(path: Path) -> Tuple[List[OutlineEntry], int]:
+    """Return the outline of `path` and its number of lines, from the cache if
+    a file with the same contents and suffix was outlined before."""
+    data = path.read_bytes()
+    digest = hashlib.blake2b(data, digest_size=16)
+    digest.update(path.suffix.encode())
+    key = digest.digest()
+    lines = data.count(b"\n") + 1
+    with _cache_lock:
+        entries = _cache.get(key)
+        if entries is not None:
+            _cache.move_to_end(key)
+            return entries, lines
+    entries = outline(data.decode("utf-8", errors="replace"), path)
+    with _cache_lock:
+        _cache[key] = entries
+        while len(_cache) > MAX_CACHED_OUTLINES:
+            _cache.popitem(last=False)
+    return entries, lines
@@ -0,0 +1,145 @@
+"""Bounded capture of command output with spill-to-file.
+
+Only a fixed-size head and tail of a stream are kept in memory; the complete
+stream is written to a temporary file so that it can be paged through later
+with the `str_replace_editor` tool instead of being held in RAM.
+"""
+
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+OUTPUT_SPILL_DIR: Path = Path(tempfile.gettempdir()) / "react_agent_outputs"
+MAX_SPILL_FILES: int = 64
+DEFAULT_HEAD_LIMIT: int = 8000  # bytes
+DEFAULT_TAIL_LIMIT: int = 8000  # bytes
+
+CLIPPED_MESSAGE: str = "\n<response clipped: {omitted} bytes omitted><NOTE>The full output ({total} bytes) has been saved to {path}. Use `str_replace_editor` with command `view` and a `view_range` to page through it, or search it with `grep -n`.</NOTE>\n"
+
+
+def _prune_spill_dir(directory: Path, keep: int = MAX_SPILL_FILES):
+    """Remove the oldest spill files so that at most `keep` remain."""
+    try:
+        entries = sorted(
+            (entry for entry in os.scandir(directory) if entry.is_file()),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+    except OSError:
+        return
+    for entry in entries[: max(0, len(entries) - keep)]:
+        try:
+            os.unlink(entry.path)
+        except OSError:
+            pass
+
+
+class OutputCapture:
+    """Capture a byte stream, keeping a bounded head and tail in memory.
+
+    Everything written is also streamed to a temporary file. If the stream
+    turns out to fit within the head and tail limits the file is discarded on
+    `close`, otherwise it is kept and referenced from the rendered text.
+    Passing `None` for both limits keeps the whole stream in memory and never
+    spills, matching the behaviour of an untruncated read.
+    """
+
+    def __init__(
+        self,
+        head_limit: Optional[int] = DEFAULT_HEAD_LIMIT,
+        tail_limit: Optional[int] = DEFAULT_TAIL_LIMIT,
+        prefix: str = "output",
+        spill_dir: Path = OUTPUT_SPILL_DIR,
+    ):
+        self.head_limit = head_limit
+        self.tail_limit = tail_limit or 0
+        self.prefix = prefix
+        self.spill_dir = spill_dir
+        self.total_bytes = 0
+        self._head = bytearray()
+        self._tail = bytearray()
+        self._file = None
+        self._path: Optional[Path] = None
+        self._closed = False
+
+    @property
+    def bounded(self) -> bool:
+        return self.head_limit is not None
+
+    @property
+    def truncated(self) -> bool:
+        return self.bounded and self.total_bytes > self.head_limit + self.tail_limit
+
+    @property
+    def path(self) -> Optional[Path]:
+        """Path of the spill file, if the full output had to be kept on disk."""
+        return self._path if self._closed and self.truncated else None
+
+    def _open_spill_file(self):
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        fd, name = tempfile.mkstemp(
+            prefix=f"{self.prefix}-", suffix=".log", dir=self.spill_dir
+        )
+        self._file = os.fdopen(fd, "wb")
+        self._path = Path(name)
+
+    def write(self, data: bytes):
+        """Append a chunk of the stream."""
+        if not data:
+            return
+        if self._closed:
+            raise ValueError("write to a closed OutputCapture")
+        self.total_bytes += len(data)
+
+        if not self.bounded:
+            self._head += data
+            return
+
+        if self._file is None:
+            self._open_spill_file()
+        self._file.write(data)
+
+        room = self.head_limit - len(self._head)
+        if room > 0:
+            self._head += data[:room]
+            data = data[room:]
+        if data and self.tail_limit:
+            self._tail += data
+            if len(self._tail) > self.tail_limit:
+                del self._tail[: len(self._tail) - self.tail_limit]
+
+    def close(self):
+        """Finish the capture; the spill file is removed unless it is needed."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._file is None:
+            return
+        self._file.close()
+        if self.truncated:
+            _prune_spill_dir(self.spill_dir)
+        else:
+            try:
+                self._path.unlink()
+            except OSError:
+                pass
+
+    def getvalue(self) -> str:
+        """Render the captured text, eliding the middle of oversized output."""
+        if not self.truncated:
+            return (bytes(self._head) + bytes(self._tail)).decode(errors="replace")
+        omitted = self.total_bytes - len(self._head) - len(self._tail)
+        notice = CLIPPED_MESSAGE.format(
+            omitted=omitted, total=self.total_bytes, path=self._path
+        )
+        return (
+            self._head.decode(errors="replace")
+            + notice
+            + self._tail.decode(errors="replace")
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
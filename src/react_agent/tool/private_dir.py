@@ -0,0 +1,34 @@
+"""Directories private to the current user.
+
+Caches and snapshots written below the shared temp directory must not be
+readable, or worse writable, by other local users. `private_dir` creates
+such a directory with mode 0700 and refuses one that another user created
+first.
+"""
+
+import os
+import stat
+import tempfile
+from pathlib import Path
+
+
+def user_temp_dir(name: str) -> Path:
+    """`name` below the temp directory, suffixed with the current uid."""
+    return Path(tempfile.gettempdir()) / f"{name}-{os.getuid()}"
+
+
+def private_dir(path: Path) -> Path:
+    """Create `path` with mode 0700, or make an existing one private.
+
+    Raises PermissionError if `path` is not a directory owned by the
+    current user, for example a symlink or a directory planted by someone
+    else.
+    """
+    path = Path(path)
+    path.mkdir(mode=0o700, parents=True, exist_ok=True)
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid():
+        raise PermissionError(f"{path} is not a directory owned by the current user")
+    if st.st_mode & 0o077:
+        os.chmod(path, 0o700)
+    return path
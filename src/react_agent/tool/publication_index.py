@@ -0,0 +1,379 @@
+"""Local full-text index of the publications `ScholarSearch` has seen.
+
+Every publication fetched from the network is stored in a SQLite database
+with an FTS5 index over its title, authors and abstract. A publication is
+identified by the DOI in its URL, if any, and by its title, lowercased and
+stripped of punctuation; a new one is merged into a stored one that has
+the same DOI or the same title (unless both have DOIs and they differ), so
+the same paper found by SerpAPI and by scholarly is stored once even when
+only one of them links to its DOI.
+
+Each query run on the network is recorded, by its normalized text and year
+filter, with the publications it returned in order. A query is answered
+from the index when it was run within `max_age` for at least as many
+results, or when enough fresh publications have every word of it in their
+title, a match close enough to stand in for the search; otherwise it goes
+to the network.
+"""
+
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+import unicodedata
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+PUBLICATION_INDEX_PATH: Path = Path(
+    os.environ.get(
+        "REACT_AGENT_PUBLICATION_INDEX",
+        Path(tempfile.gettempdir()) / "react_agent_publications.sqlite",
+    )
+)
+DEFAULT_MAX_AGE: float = float(
+    os.environ.get("REACT_AGENT_PUBLICATION_MAX_AGE", 7 * 24 * 60 * 60)
+)  # seconds
+
+_SCHEMA_VERSION: int = 3
+
+# the index is a cache, so an older schema is simply dropped
+_SCHEMA = f"""
+BEGIN IMMEDIATE;
+DROP TRIGGER IF EXISTS publications_insert;
+DROP TRIGGER IF EXISTS publications_update;
+DROP TRIGGER IF EXISTS publications_delete;
+DROP TABLE IF EXISTS publications_fts;
+DROP TABLE IF EXISTS publications;
+DROP TABLE IF EXISTS queries;
+DROP TABLE IF EXISTS query_results;
+CREATE TABLE publications (
+    id INTEGER PRIMARY KEY,
+    doi TEXT,
+    title_key TEXT,
+    title TEXT NOT NULL,
+    authors TEXT NOT NULL,
+    year INTEGER,
+    abstract TEXT NOT NULL,
+    citations INTEGER NOT NULL,
+    url TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE INDEX publications_doi ON publications (doi);
+CREATE INDEX publications_title_key ON publications (title_key);
+CREATE INDEX publications_year ON publications (year);
+CREATE VIRTUAL TABLE publications_fts USING fts5(
+    title, authors, abstract, content = 'publications', content_rowid = 'id'
+);
+CREATE TABLE queries (
+    key TEXT PRIMARY KEY,
+    requested INTEGER NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE query_results (
+    query_key TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    publication_id INTEGER NOT NULL,
+    PRIMARY KEY (query_key, rank)
+);
+CREATE INDEX query_results_publication ON query_results (publication_id);
+CREATE TRIGGER publications_insert AFTER INSERT ON publications BEGIN
+    INSERT INTO publications_fts (rowid, title, authors, abstract)
+    VALUES (new.id, new.title, new.authors, new.abstract);
+END;
+CREATE TRIGGER publications_update AFTER UPDATE ON publications BEGIN
+    INSERT INTO publications_fts (publications_fts, rowid, title, authors, abstract)
+    VALUES ('delete', old.id, old.title, old.authors, old.abstract);
+    INSERT INTO publications_fts (rowid, title, authors, abstract)
+    VALUES (new.id, new.title, new.authors, new.abstract);
+END;
+CREATE TRIGGER publications_delete AFTER DELETE ON publications BEGIN
+    INSERT INTO publications_fts (publications_fts, rowid, title, authors, abstract)
+    VALUES ('delete', old.id, old.title, old.authors, old.abstract);
+END;
+PRAGMA user_version = {_SCHEMA_VERSION};
+COMMIT;
+"""
+
+_COLUMNS = ("doi", "title_key", "title", "authors", "year", "abstract", "citations", "url", "fetched_at")
+
+# a refetch refreshes the entry but does not blank fields the other
+# backend filled in
+_MERGE = """
+UPDATE publications SET
+    doi = coalesce(doi, :doi),
+    title_key = coalesce(title_key, :title_key),
+    title = CASE WHEN :title != '' THEN :title ELSE title END,
+    authors = CASE WHEN :authors != '' THEN :authors ELSE authors END,
+    year = coalesce(:year, year),
+    abstract = CASE WHEN length(:abstract) > length(abstract) THEN :abstract ELSE abstract END,
+    citations = max(:citations, citations),
+    url = CASE WHEN :url != '' THEN :url ELSE url END,
+    fetched_at = max(:fetched_at, fetched_at)
+WHERE id = :id
+"""
+
+_DOI = re.compile(r"\b(10\.\d{4,9}/[^\s?#&]+)", re.IGNORECASE)
+
+
+def publication_keys(publication: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+    """The DOI in the URL of `publication` and its normalized title, each if any."""
+    match = _DOI.search(publication.get("url") or "")
+    doi = match.group(1).rstrip(".").lower() if match else None
+    title = unicodedata.normalize("NFKC", publication.get("title") or "").lower()
+    return doi, " ".join(re.findall(r"\w+", title)) or None
+
+
+def _authors(authors: Any) -> str:
+    # SerpAPI gives a list of {"name": ...}, scholarly a list of names or a string
+    if isinstance(authors, str):
+        return authors
+    return ", ".join(
+        author.get("name", "") if isinstance(author, dict) else str(author)
+        for author in authors or []
+    )
+
+
+def _year(year: Any) -> Optional[int]:
+    match = re.search(r"\d{4}", str(year or ""))
+    return int(match.group()) if match else None
+
+
+def _words(text: str) -> List[str]:
+    return re.findall(r"\w+", unicodedata.normalize("NFKC", text).lower())
+
+
+def query_key(query: str, year_from: Optional[int], year_to: Optional[int]) -> Optional[str]:
+    """The normalized text of `query` and its year filter, if it has any words."""
+    words = _words(query)
+    if not words:
+        return None
+    years = ["" if year is None else str(year) for year in (year_from, year_to)]
+    return "|".join([" ".join(words), *years])
+
+
+def _match_title(query: str) -> Optional[str]:
+    """An FTS5 query requiring every word of `query` in the title."""
+    words = _words(query)
+    return " AND ".join(f'title : "{word}"' for word in words) if words else None
+
+
+class PublicationIndex:
+    """SQLite FTS5 index of publications. Thread- and process-safe."""
+
+    def __init__(self, path: Path = PUBLICATION_INDEX_PATH, max_age: float = DEFAULT_MAX_AGE):
+        self.path = Path(path)
+        self.max_age = max_age
+
+    @contextmanager
+    def _connect(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(self.path, timeout=60)
+        try:
+            db.execute("PRAGMA journal_mode = WAL")
+            if db.execute("PRAGMA user_version").fetchone()[0] != _SCHEMA_VERSION:
+                db.executescript(_SCHEMA)
+            yield db
+            db.commit()
+        except BaseException:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def add(
+        self,
+        publications: List[Dict[str, Any]],
+        query: Optional[str] = None,
+        year_from: Optional[int] = None,
+        year_to: Optional[int] = None,
+        num_results: Optional[int] = None,
+        now: Optional[float] = None,
+    ) -> int:
+        """Store or refresh `publications`; returns how many were stored.
+
+        Given the `query` (and year filter) they were returned for, in
+        order, the query is recorded as run for `num_results` results
+        (by default, as many as were returned).
+        """
+        now = time.time() if now is None else now
+        stored = 0
+        ids = []
+        with self._connect() as db:
+            # look up and insert under one write lock, so no paper is stored twice
+            db.execute("BEGIN IMMEDIATE")
+            for publication in publications:
+                doi, title_key = publication_keys(publication)
+                if doi is None and title_key is None:
+                    continue
+                values = {
+                    "doi": doi,
+                    "title_key": title_key,
+                    "title": publication.get("title") or "",
+                    "authors": _authors(publication.get("authors")),
+                    "year": _year(publication.get("year")),
+                    "abstract": publication.get("abstract") or "",
+                    "citations": int(publication.get("citations") or 0),
+                    "url": publication.get("url") or "",
+                    "fetched_at": now,
+                }
+                ids.append(self._store(db, values))
+                stored += 1
+            key = query_key(query, year_from, year_to) if query is not None else None
+            # an empty answer may be a transient failure, so it is not recorded
+            if key is not None and ids:
+                db.execute("DELETE FROM query_results WHERE query_key = ?", (key,))
+                db.executemany(
+                    "INSERT INTO query_results (query_key, rank, publication_id) VALUES (?, ?, ?)",
+                    [(key, rank, id) for rank, id in enumerate(ids)],
+                )
+                db.execute(
+                    "INSERT OR REPLACE INTO queries (key, requested, fetched_at) VALUES (?, ?, ?)",
+                    (key, num_results if num_results is not None else len(ids), now),
+                )
+        return stored
+
+    def _store(self, db: sqlite3.Connection, values: Dict[str, Any]) -> int:
+        """Insert `values`, or merge them into the entries of the same paper; returns its id."""
+        # the same DOI, or the same title unless both have different DOIs
+        ids = [
+            row[0]
+            for row in db.execute(
+                """
+                SELECT id FROM publications
+                WHERE doi = :doi
+                    OR (title_key = :title_key AND (doi IS NULL OR :doi IS NULL OR doi = :doi))
+                ORDER BY id
+                """,
+                values,
+            )
+        ]
+        if not ids:
+            return db.execute(
+                f"INSERT INTO publications ({', '.join(_COLUMNS)}) "
+                f"VALUES ({', '.join(':' + column for column in _COLUMNS)})",
+                values,
+            ).lastrowid
+        # a paper stored once by its DOI and once by its title is merged too
+        target, *duplicates = ids
+        for duplicate in duplicates:
+            row = db.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM publications WHERE id = ?", (duplicate,)
+            ).fetchone()
+            db.execute("DELETE FROM publications WHERE id = ?", (duplicate,))
+            db.execute(_MERGE, {**dict(zip(_COLUMNS, row)), "id": target})
+            db.execute(
+                "UPDATE query_results SET publication_id = ? WHERE publication_id = ?",
+                (target, duplicate),
+            )
+        db.execute(_MERGE, {**values, "id": target})
+        return target
+
+    def search(
+        self,
+        query: str,
+        num_results: int = 5,
+        year_from: Optional[int] = None,
+        year_to: Optional[int] = None,
+        now: Optional[float] = None,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """The best `num_results` fresh publications for `query`.
+
+        These are the results of the same query and year filter run within
+        `max_age`, or else the fresh publications with every word of `query`
+        in their title, best first. Returns None on a miss: the query was
+        not run, or for fewer results, and fewer than `num_results`
+        publications match on their title.
+        """
+        key = query_key(query, year_from, year_to)
+        if key is None:
+            return None
+        now = time.time() if now is None else now
+        with self._connect() as db:
+            rows = self._recorded(db, key, num_results, now - self.max_age)
+            if rows is None:
+                rows = self._title_matches(
+                    db, query, num_results, year_from, year_to, now - self.max_age
+                )
+                if len(rows) < num_results:
+                    return None
+        return [
+            {
+                "title": title,
+                "authors": authors,
+                "year": year if year is not None else "",
+                "abstract": abstract,
+                "url": url,
+                "citations": citations,
+            }
+            for title, authors, year, abstract, url, citations in rows
+        ]
+
+    def _recorded(
+        self, db: sqlite3.Connection, key: str, num_results: int, fresh_since: float
+    ) -> Optional[List[Tuple]]:
+        """The results recorded for the query `key`, if it was run recently enough for as many."""
+        row = db.execute(
+            "SELECT requested, fetched_at FROM queries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[0] < num_results or row[1] < fresh_since:
+            return None
+        # results merged into one paper are listed once, at the best rank
+        return db.execute(
+            """
+            SELECT p.title, p.authors, p.year, p.abstract, p.url, p.citations
+            FROM query_results AS r JOIN publications AS p ON p.id = r.publication_id
+            WHERE r.query_key = ?
+            GROUP BY p.id
+            ORDER BY min(r.rank)
+            LIMIT ?
+            """,
+            (key, num_results),
+        ).fetchall()
+
+    def _title_matches(
+        self,
+        db: sqlite3.Connection,
+        query: str,
+        num_results: int,
+        year_from: Optional[int],
+        year_to: Optional[int],
+        fresh_since: float,
+    ) -> List[Tuple]:
+        conditions = ["publications_fts MATCH ?", "p.fetched_at >= ?"]
+        params: List[Any] = [_match_title(query), fresh_since]
+        if year_from is not None:
+            conditions.append("p.year >= ?")
+            params.append(year_from)
+        if year_to is not None:
+            conditions.append("p.year <= ?")
+            params.append(year_to)
+        return db.execute(
+            f"""
+            SELECT p.title, p.authors, p.year, p.abstract, p.url, p.citations
+            FROM publications_fts JOIN publications AS p ON p.id = publications_fts.rowid
+            WHERE {' AND '.join(conditions)}
+            ORDER BY bm25(publications_fts, 10.0, 2.0, 1.0)
+            LIMIT ?
+            """,
+            (*params, num_results),
+        ).fetchall()
+
+    def count(self) -> int:
+        with self._connect() as db:
+            return db.execute("SELECT count(*) FROM publications").fetchone()[0]
+
+
+_index: Optional[PublicationIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_publication_index() -> PublicationIndex:
+    """Return the process-wide publication index, creating it on first use."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = PublicationIndex()
+        return _index
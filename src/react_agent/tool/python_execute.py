@@ -1,7 +1,10 @@
+import asyncio
 import threading
-from typing import Dict
+from typing import Callable, Dict, Literal, Optional
 
-from react_agent.tool.base import BaseTool
+from react_agent.tool.base import BaseTool, current_thread_id
+from react_agent.tool.python_pool import get_worker_pool, run_code
+from react_agent.tool.python_session import get_session_manager
 
 
 class PythonExecute(BaseTool):
@@ -19,52 +22,74 @@ class PythonExecute(BaseTool):
         },
         "required": ["code"],
     }
+    backend: Literal["process", "thread"] = "process"
+    stateful: bool = False
 
     async def execute(
         self,
         code: str,
         timeout: int = 5,
+        on_output: Optional[Callable[[str, str], None]] = None,
     ) -> Dict:
         """
         Executes the provided Python code with a timeout.
 
+        With the default `process` backend the code runs in a pre-forked
+        worker process that is killed when it overruns the timeout. The
+        `thread` backend runs it in a thread of this process, which cannot be
+        stopped and keeps running after a timeout. With `stateful` set, the
+        code runs in the long-lived session of the current conversation
+        thread, whose variables persist across calls. Either way stdout and
+        stderr are captured per execution, so concurrent executions do not
+        see each other's output.
+
         Args:
             code (str): The Python code to execute.
             timeout (int): Execution timeout in seconds.
+            on_output (Callable, optional): Called on the event loop with
+                `(stream, text)` chunks as the code produces output.
 
         Returns:
             Dict: Contains 'output' with execution output or error message and 'success' status.
         """
-        result = {"observation": ""}
-
-        def run_code():
+        loop = asyncio.get_running_loop()
+        if on_output is not None:
+            callback = on_output
+            on_output = lambda stream, text: loop.call_soon_threadsafe(
+                callback, stream, text
+            )
+
+        if self.stateful:
+            return await asyncio.to_thread(
+                get_session_manager().execute,
+                current_thread_id(),
+                code,
+                timeout,
+                on_output,
+            )
+
+        if self.backend == "process":
+            return await asyncio.to_thread(
+                get_worker_pool().execute, code, timeout, on_output
+            )
+
+        done = loop.create_future()
+
+        def _run():
+            result = run_code(code, on_output)
             try:
-                safe_globals = {"__builtins__": dict(__builtins__)}
-
-                import sys
-                from io import StringIO
-
-                output_buffer = StringIO()
-                sys.stdout = output_buffer
-
-                exec(code, safe_globals, {})
-
-                sys.stdout = sys.__stdout__
-
-                result["observation"] = output_buffer.getvalue()
-
-            except Exception as e:
-                result["observation"] = str(e)
-                result["success"] = False
-
-        thread = threading.Thread(target=run_code)
-        thread.start()
-        thread.join(timeout)
-
-        if thread.is_alive():
+                loop.call_soon_threadsafe(
+                    lambda: done.done() or done.set_result(result)
+                )
+            except RuntimeError:
+                # the event loop was closed after the execution timed out
+                pass
+
+        threading.Thread(target=_run, daemon=True).start()
+        try:
+            return await asyncio.wait_for(asyncio.shield(done), timeout)
+        except asyncio.TimeoutError:
             return {
                 "observation": f"Execution timeout after {timeout} seconds",
                 "success": False,
             }
-
-        return result
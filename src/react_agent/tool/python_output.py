@@ -0,0 +1,155 @@
+"""Per-execution capture of stdout and stderr for executed Python code.
+
+Swapping `sys.stdout` for a buffer is process-global: two executions running
+at the same time, or anything else printing meanwhile, end up in each
+other's output. Instead `sys.stdout` and `sys.stderr` are replaced once by
+proxies that route each write to the `ExecutionOutput` active in the writing
+context (see `ExecutionOutput.activate`) and to the real stream otherwise.
+"""
+
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional
+
+MAX_OUTPUT_CHARS: int = 16000  # per stream
+TRUNCATED_NOTE: str = "\n<output truncated: {dropped} more characters were not captured>\n"
+
+_current_output: ContextVar[Optional["ExecutionOutput"]] = ContextVar(
+    "python_execution_output", default=None
+)
+_install_lock = threading.Lock()
+
+
+class _ContextStream:
+    """A stand-in for `sys.stdout`/`sys.stderr` that routes by context."""
+
+    def __init__(self, name: str, fallback):
+        self._name = name
+        self._fallback = fallback
+
+    def write(self, text: str) -> int:
+        output = _current_output.get()
+        if output is None:
+            return self._fallback.write(text)
+        output.write(self._name, text)
+        return len(text)
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+    def flush(self):
+        if _current_output.get() is None:
+            self._fallback.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._fallback, name)
+
+
+def install():
+    """Route `sys.stdout` and `sys.stderr` through context-aware proxies."""
+    with _install_lock:
+        if not isinstance(sys.stdout, _ContextStream):
+            sys.stdout = _ContextStream("stdout", sys.stdout)
+        if not isinstance(sys.stderr, _ContextStream):
+            sys.stderr = _ContextStream("stderr", sys.stderr)
+
+
+class ExecutionOutput:
+    """Bounded stdout/stderr buffers of one execution.
+
+    At most `max_chars` characters are kept per stream; the rest is counted
+    and reported as truncated. If `on_chunk` is given it is called with
+    `(stream, text)` as output is produced, coalesced into chunks of about
+    `chunk_size` characters or `flush_interval` seconds.
+    """
+
+    def __init__(
+        self,
+        max_chars: int = MAX_OUTPUT_CHARS,
+        on_chunk: Optional[Callable[[str, str], None]] = None,
+        chunk_size: int = 4096,
+        flush_interval: float = 0.05,
+    ):
+        self.max_chars = max_chars
+        self.on_chunk = on_chunk
+        self.chunk_size = chunk_size
+        self.flush_interval = flush_interval
+        self._parts: Dict[str, List[str]] = {"stdout": [], "stderr": []}
+        self._sizes: Dict[str, int] = {"stdout": 0, "stderr": 0}
+        self._dropped: Dict[str, int] = {"stdout": 0, "stderr": 0}
+        self._pending: List[tuple] = []
+        self._pending_size = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def write(self, stream: str, text: str):
+        if not text:
+            return
+        with self._lock:
+            room = self.max_chars - self._sizes[stream]
+            if len(text) > room:
+                self._dropped[stream] += len(text) - max(room, 0)
+                text = text[: max(room, 0)]
+                if not text:
+                    return
+            self._parts[stream].append(text)
+            self._sizes[stream] += len(text)
+            if self.on_chunk is None:
+                return
+            self._pending.append((stream, text))
+            self._pending_size += len(text)
+            if (
+                self._pending_size < self.chunk_size
+                and time.monotonic() - self._last_flush < self.flush_interval
+            ):
+                return
+            chunks = self._take_pending()
+        self._emit(chunks)
+
+    def _take_pending(self) -> List[tuple]:
+        # merge consecutive writes to the same stream
+        chunks: List[tuple] = []
+        for stream, text in self._pending:
+            if chunks and chunks[-1][0] == stream:
+                chunks[-1] = (stream, chunks[-1][1] + text)
+            else:
+                chunks.append((stream, text))
+        self._pending = []
+        self._pending_size = 0
+        self._last_flush = time.monotonic()
+        return chunks
+
+    def _emit(self, chunks: List[tuple]):
+        for stream, text in chunks:
+            self.on_chunk(stream, text)
+
+    def flush(self):
+        """Deliver any output not yet passed to `on_chunk`."""
+        with self._lock:
+            chunks = self._take_pending()
+        if self.on_chunk is not None:
+            self._emit(chunks)
+
+    def getvalue(self, stream: str = "stdout") -> str:
+        """Return the captured text of `stream`, with a note if it was truncated."""
+        with self._lock:
+            text = "".join(self._parts[stream])
+            dropped = self._dropped[stream]
+        if dropped:
+            text += TRUNCATED_NOTE.format(dropped=dropped)
+        return text
+
+    @contextmanager
+    def activate(self):
+        """Capture writes made to `sys.stdout`/`sys.stderr` in this context."""
+        install()
+        token = _current_output.set(self)
+        try:
+            yield self
+        finally:
+            _current_output.reset(token)
+            self.flush()
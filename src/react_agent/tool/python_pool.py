@@ -0,0 +1,330 @@
+"""Pre-forked worker processes for executing Python code.
+
+Workers are forked from a forkserver that has already imported the modules
+in `PRELOAD_MODULES`, so starting (or replacing) a worker is cheap and code
+using numpy or pandas does not pay for their import on every execution. Each
+execution runs in a worker process under a hard timeout: a worker that
+overruns the timeout or its memory cap is killed and replaced, instead of
+being left running as a thread would be.
+"""
+
+import atexit
+import builtins
+import multiprocessing
+import os
+import resource
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from react_agent.tool.python_output import ExecutionOutput
+
+PRELOAD_MODULES: List[str] = ["numpy", "pandas"]
+DEFAULT_POOL_SIZE: int = min(4, os.cpu_count() or 1)
+DEFAULT_MEMORY_LIMIT: int = 2 * 1024**3  # bytes of RSS per worker
+_MEMORY_CHECK_INTERVAL: float = 0.1  # seconds
+
+
+def new_namespace() -> Dict:
+    """Return a fresh global namespace for executed code.
+
+    Where NumPy is available the namespace has `shared`, the
+    `SharedObjectStore` through which executions exchange arrays and
+    DataFrames without reloading them.
+    """
+    namespace = {"__builtins__": dict(builtins.__dict__)}
+    try:
+        from react_agent.tool.shared_store import get_shared_store
+    except ImportError:
+        return namespace
+    namespace["shared"] = get_shared_store()
+    return namespace
+
+
+def run_code(
+    code: str,
+    on_output: Optional[Callable[[str, str], None]] = None,
+    namespace: Optional[Dict] = None,
+) -> Dict:
+    """Execute `code` and return its printed output.
+
+    Without `namespace` the code runs in a fresh one; with it, names the code
+    defines are kept in `namespace` for later executions. Output is captured
+    per execution, so this is safe to call from several threads at once.
+    `on_output` receives `(stream, text)` chunks as they are produced.
+    """
+    result = {"observation": ""}
+    output = ExecutionOutput(on_chunk=on_output)
+    try:
+        with output.activate():
+            if namespace is None:
+                exec(code, new_namespace(), {})
+            else:
+                exec(code, namespace)
+        result["observation"] = output.getvalue("stdout")
+        stderr = output.getvalue("stderr")
+        if stderr:
+            result["stderr"] = stderr
+    except Exception as e:
+        result["observation"] = str(e)
+        result["success"] = False
+    return result
+
+
+def _worker_main(conn, stateful: bool = False):
+    """Serve requests received on `conn` until it is closed.
+
+    Requests are `("exec", code, stream)`, and for stateful workers, which
+    keep one namespace across executions, also `("snapshot",)` and
+    `("restore", data)`. While executing with `stream` set, output chunks are
+    sent back as `("chunk", stream, text)`; the reply is always
+    `("result", payload, rss)`.
+    """
+    namespace = new_namespace() if stateful else None
+    while True:
+        try:
+            kind, *args = conn.recv()
+        except (EOFError, OSError):
+            return
+        if kind == "exec":
+            code, stream = args
+            on_output = (
+                (lambda name, text: conn.send(("chunk", name, text))) if stream else None
+            )
+            payload = run_code(code, on_output, namespace)
+            if not stateful:
+                # nothing of a stateless execution outlives it, so neither
+                # should its pins on shared objects
+                _release_shared()
+        elif kind == "snapshot":
+            from react_agent.tool.python_session import snapshot_namespace
+
+            payload = snapshot_namespace(namespace)
+        elif kind == "restore":
+            from react_agent.tool.python_session import restore_namespace
+
+            payload = restore_namespace(namespace, *args)
+        else:
+            payload = None
+        rss = _rss(os.getpid())
+        if rss is None:
+            rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        conn.send(("result", payload, rss))
+
+
+def _release_shared():
+    try:
+        from react_agent.tool.shared_store import get_shared_store
+    except ImportError:
+        return
+    get_shared_store().release_all()
+
+
+def _rss(pid: int) -> Optional[int]:
+    """Return the current RSS of `pid` in bytes (Linux only)."""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def _worker_context():
+    """Return the multiprocessing context that workers are started from."""
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("spawn")
+    context = multiprocessing.get_context("forkserver")
+    # the worker entry points live in these modules, so preload them too
+    context.set_forkserver_preload(
+        [__name__, "react_agent.tool.python_session", "react_agent.tool.shared_store"]
+        + PRELOAD_MODULES
+    )
+    return context
+
+
+class WorkerFailure(Exception):
+    """A worker overran its limits, or died, while serving a request."""
+
+
+class Worker:
+    """A worker process and the parent's end of its pipe."""
+
+    def __init__(self, context=None, stateful: bool = False):
+        context = context or _worker_context()
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child_conn, stateful), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.tasks = 0
+
+    def request(
+        self,
+        request: tuple,
+        timeout: float,
+        memory_limit: Optional[int] = None,
+        on_output: Optional[Callable[[str, str], None]] = None,
+    ) -> Tuple[Any, int]:
+        """Send `request` and return the reply's `(payload, rss)`.
+
+        The worker is killed, and `WorkerFailure` raised, if it does not reply
+        within `timeout` seconds, if its RSS exceeds `memory_limit` bytes, or
+        if it dies.
+        """
+        try:
+            self.conn.send(request)
+            deadline = time.monotonic() + timeout
+            while True:
+                if self.conn.poll(
+                    max(0.0, min(_MEMORY_CHECK_INTERVAL, deadline - time.monotonic()))
+                ):
+                    message = self.conn.recv()
+                    if message[0] == "result":
+                        return message[1], message[2]
+                    on_output(*message[1:])
+                if _over_memory(_rss(self.process.pid), memory_limit):
+                    raise WorkerFailure(
+                        f"Execution exceeded the memory limit of {memory_limit} bytes"
+                    )
+                if time.monotonic() >= deadline:
+                    raise WorkerFailure(f"Execution timeout after {timeout} seconds")
+        except (EOFError, OSError):
+            self.kill()
+            raise WorkerFailure("Execution worker exited unexpectedly") from None
+        except BaseException:
+            self.kill()
+            raise
+
+    def kill(self):
+        self.conn.close()
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+
+
+def _over_memory(rss: Optional[int], memory_limit: Optional[int]) -> bool:
+    return memory_limit is not None and rss is not None and rss > memory_limit
+
+
+class PythonWorkerPool:
+    """A bounded pool of pre-forked Python worker processes.
+
+    The pool is thread-safe and blocking; `PythonExecute` calls `execute` in
+    an executor thread, where waiting for a worker does not hold the GIL.
+    """
+
+    def __init__(
+        self,
+        size: int = DEFAULT_POOL_SIZE,
+        memory_limit: Optional[int] = DEFAULT_MEMORY_LIMIT,
+        max_tasks_per_worker: Optional[int] = None,
+    ):
+        self.size = size
+        self.memory_limit = memory_limit
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self._context = _worker_context()
+        self._idle: List[Worker] = []
+        self._workers = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def start(self):
+        """Start all workers up front instead of on first use."""
+        workers = [self._acquire() for _ in range(self.size - self._workers)]
+        for worker in workers:
+            self._release(worker)
+
+    def _acquire(self) -> Worker:
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError("worker pool has been shut down")
+                if self._idle:
+                    return self._idle.pop()
+                if self._workers < self.size:
+                    self._workers += 1
+                    break
+                self._condition.wait()
+        try:
+            return Worker(self._context)
+        except BaseException:
+            self._discard(None)
+            raise
+
+    def _release(self, worker: Worker):
+        with self._condition:
+            if self._closed:
+                self._workers -= 1
+                worker.kill()
+            else:
+                self._idle.append(worker)
+            self._condition.notify()
+
+    def _discard(self, worker: Optional[Worker]):
+        """Kill `worker`; a replacement is started by the next `_acquire`."""
+        if worker is not None:
+            worker.kill()
+        with self._condition:
+            self._workers -= 1
+            self._condition.notify()
+
+    def execute(
+        self,
+        code: str,
+        timeout: float,
+        on_output: Optional[Callable[[str, str], None]] = None,
+    ) -> Dict:
+        """Run `code` in a worker, killing the worker if it overruns `timeout`.
+
+        `on_output` is called with `(stream, text)` chunks as the worker
+        produces output.
+        """
+        worker = self._acquire()
+        try:
+            result, rss = worker.request(
+                ("exec", code, on_output is not None),
+                timeout,
+                self.memory_limit,
+                on_output,
+            )
+        except WorkerFailure as e:
+            self._discard(worker)
+            return {"observation": str(e), "success": False}
+        except BaseException:
+            self._discard(worker)
+            raise
+
+        worker.tasks += 1
+        if _over_memory(rss, self.memory_limit) or (
+            self.max_tasks_per_worker is not None
+            and worker.tasks >= self.max_tasks_per_worker
+        ):
+            self._discard(worker)
+        else:
+            self._release(worker)
+        return result
+
+    def shutdown(self):
+        """Kill all idle workers; busy ones are killed when they are released."""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._workers -= len(idle)
+            self._condition.notify_all()
+        for worker in idle:
+            worker.kill()
+
+
+_pool: Optional[PythonWorkerPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_worker_pool() -> PythonWorkerPool:
+    """Return the process-wide worker pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = PythonWorkerPool()
+            atexit.register(_pool.shutdown)
+        return _pool
@@ -0,0 +1,322 @@
+"""Long-lived Python sessions, one per conversation thread.
+
+Each session is a dedicated worker process whose namespace survives between
+executions, so the agent does not have to reload data on every step. Sessions
+are evicted when idle, by a background timer, or when there are too many of
+them, and killed when they exceed their memory ceiling. The namespace is
+snapshotted with cloudpickle (pickle if it is not installed) after each
+execution that changed it, so the session can be rebuilt on its next use,
+after an eviction or a crash, without re-running everything.
+
+Snapshots are written to a directory private to the current user (mode
+0700, owned by it) and are only ever unpickled inside the session's worker,
+never in the process that manages the sessions.
+"""
+
+import atexit
+import hashlib
+import importlib
+import pickle
+import threading
+import time
+import types
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+try:
+    import cloudpickle
+except ImportError:
+    cloudpickle = None
+
+from react_agent.tool.private_dir import private_dir, user_temp_dir
+from react_agent.tool.python_pool import Worker, WorkerFailure
+
+SESSION_SNAPSHOT_DIR: Path = user_temp_dir("react_agent_sessions")
+DEFAULT_MAX_SESSIONS: int = 8
+DEFAULT_IDLE_TIMEOUT: float = 15 * 60  # seconds
+DEFAULT_SESSION_MEMORY_LIMIT: int = 4 * 1024**3  # bytes of RSS per session
+_SNAPSHOT_TIMEOUT: float = 120.0  # seconds
+_MAX_EVICTION_INTERVAL: float = 60.0  # seconds between idle checks
+
+
+def snapshot_namespace(namespace: Dict) -> Dict:
+    """Serialize what can be serialized of `namespace`.
+
+    Modules are recorded by name and re-imported on restore; values that
+    cannot be pickled are skipped and listed under `skipped`.
+    """
+    dumps = cloudpickle.dumps if cloudpickle is not None else pickle.dumps
+    values, modules, skipped = {}, {}, []
+    for name, value in namespace.items():
+        if name == "__builtins__":
+            continue
+        if isinstance(value, types.ModuleType):
+            modules[name] = value.__name__
+            continue
+        try:
+            values[name] = dumps(value)
+        except Exception:
+            skipped.append(name)
+    return {"values": values, "modules": modules, "skipped": skipped}
+
+
+def restore_namespace(namespace: Dict, data: bytes) -> List[str]:
+    """Load a pickled `snapshot_namespace` snapshot into `namespace`.
+
+    Runs in the session's worker: unpickling a snapshot runs arbitrary
+    code, so it must not happen in the managing process. Returns the names
+    that could not be restored, including those that were skipped when the
+    snapshot was taken.
+    """
+    snapshot = pickle.loads(data)
+    missing = list(snapshot["skipped"])
+    for name, module in snapshot["modules"].items():
+        try:
+            namespace[name] = importlib.import_module(module)
+        except Exception:
+            missing.append(name)
+    for name, data in snapshot["values"].items():
+        try:
+            namespace[name] = pickle.loads(data)
+        except Exception:
+            missing.append(name)
+    return missing
+
+
+class _Session:
+    def __init__(self, thread_id: str):
+        self.thread_id = thread_id
+        self.worker: Optional[Worker] = None
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+        self.dirty = False  # the namespace changed since the last snapshot
+
+
+class PythonSessionManager:
+    """Per-thread Python sessions with eviction and snapshot/restore.
+
+    The manager is thread-safe and blocking, like `PythonWorkerPool`.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = DEFAULT_MAX_SESSIONS,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+        memory_limit: Optional[int] = DEFAULT_SESSION_MEMORY_LIMIT,
+        snapshot_dir: Path = SESSION_SNAPSHOT_DIR,
+    ):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.memory_limit = memory_limit
+        self.snapshot_dir = snapshot_dir
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._evictor: Optional[threading.Thread] = None
+
+    def _private_dir(self) -> Path:
+        """`snapshot_dir`, created with mode 0700; refuses one owned by another user."""
+        return private_dir(self.snapshot_dir)
+
+    def _snapshot_path(self, thread_id: str) -> Path:
+        digest = hashlib.sha256(thread_id.encode()).hexdigest()[:32]
+        return self.snapshot_dir / f"{digest}.pkl"
+
+    def _session(self, thread_id: str) -> _Session:
+        """Return the session of `thread_id`, evicting idle or surplus ones."""
+        with self._lock:
+            session = self._sessions.get(thread_id)
+            if session is None:
+                session = self._sessions[thread_id] = _Session(thread_id)
+            self._sessions.move_to_end(thread_id)
+            session.last_used = time.monotonic()
+            if self._evictor is None:
+                self._evictor = threading.Thread(
+                    target=self._evict_periodically, name="python-session-evictor", daemon=True
+                )
+                self._evictor.start()
+        self.evict_idle(keep=session)
+        return session
+
+    def evict_idle(self, keep: Optional[_Session] = None):
+        """Evict idle sessions, and the least recently used ones beyond `max_sessions`.
+
+        A session is idle when unused for longer than `idle_timeout`. `keep`,
+        the session about to be used, is never evicted.
+        """
+        evicted = []
+        with self._lock:
+            now = time.monotonic()
+            live = [s for s in self._sessions.values() if s.worker is not None]
+            # sessions are kept in least recently used order
+            surplus = len(live) - self.max_sessions
+            if keep is not None and keep.worker is None:
+                surplus += 1
+            for other in live:
+                if other is keep:
+                    continue
+                if now - other.last_used > self.idle_timeout or surplus > 0:
+                    evicted.append(other)
+                    surplus -= 1
+        for other in evicted:
+            self.evict(other.thread_id, blocking=False)
+
+    def _evict_periodically(self):
+        interval = min(self.idle_timeout / 2, _MAX_EVICTION_INTERVAL)
+        while not self._stopped.wait(interval):
+            self.evict_idle()
+
+    def _start(self, session: _Session) -> List[str]:
+        """Start the session's worker, restoring its snapshot if there is one.
+
+        Returns the names that could not be restored.
+        """
+        session.worker = Worker(stateful=True)
+        path = self._snapshot_path(session.thread_id)
+        if not path.exists():
+            return []
+        self._private_dir()
+        # the worker unpickles it
+        missing, _ = session.worker.request(
+            ("restore", path.read_bytes()), _SNAPSHOT_TIMEOUT, self.memory_limit
+        )
+        return missing
+
+    def execute(
+        self,
+        thread_id: str,
+        code: str,
+        timeout: float,
+        on_output: Optional[Callable[[str, str], None]] = None,
+    ) -> Dict:
+        """Run `code` in the session of `thread_id`."""
+        session = self._session(thread_id)
+        with session.lock:
+            notes = []
+            if session.worker is None:
+                try:
+                    missing = self._start(session)
+                except (WorkerFailure, PermissionError) as e:
+                    if session.worker is not None:
+                        session.worker.kill()
+                    session.worker = None
+                    return {"observation": f"Failed to restore session: {e}", "success": False}
+                if missing:
+                    notes.append(
+                        f"Session restored from snapshot; these names could not be restored: {', '.join(missing)}"
+                    )
+            try:
+                result, rss = session.worker.request(
+                    ("exec", code, on_output is not None),
+                    timeout,
+                    self.memory_limit,
+                    on_output,
+                )
+            except WorkerFailure as e:
+                session.worker = None
+                return {
+                    "observation": f"{e}. The session was reset; its variables will be restored from the last snapshot, if any.",
+                    "success": False,
+                }
+            session.last_used = time.monotonic()
+            session.dirty = True
+            if self.memory_limit is not None and rss > self.memory_limit:
+                session.worker.kill()
+                session.worker = None
+                notes.append(
+                    f"Session exceeded the memory limit of {self.memory_limit} bytes and was reset."
+                )
+            else:
+                # keep the snapshot current, so a crash loses at most one execution
+                try:
+                    self._snapshot(session)
+                except (WorkerFailure, PermissionError) as e:
+                    notes.append(f"The session could not be snapshotted: {e}")
+        if notes:
+            result = {**result, "observation": "\n".join(notes + [result["observation"]])}
+        return result
+
+    def snapshot(self, thread_id: str) -> Optional[List[str]]:
+        """Save the namespace of a live session; returns the names skipped."""
+        with self._lock:
+            session = self._sessions.get(thread_id)
+        if session is None:
+            return None
+        with session.lock:
+            return self._snapshot(session)
+
+    def _snapshot(self, session: _Session) -> Optional[List[str]]:
+        if session.worker is None:
+            return None
+        try:
+            snapshot, _ = session.worker.request(("snapshot",), _SNAPSHOT_TIMEOUT)
+        except WorkerFailure:
+            session.worker = None
+            raise
+        self._private_dir()
+        path = self._snapshot_path(session.thread_id)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(pickle.dumps(snapshot))
+        tmp.replace(path)
+        session.dirty = False
+        return snapshot["skipped"]
+
+    def evict(self, thread_id: str, blocking: bool = True):
+        """Snapshot and stop the session of `thread_id`.
+
+        With `blocking=False` a session that is busy executing is left alone.
+        """
+        with self._lock:
+            session = self._sessions.get(thread_id)
+        if session is None or not session.lock.acquire(blocking=blocking):
+            return
+        try:
+            if session.worker is None:
+                return
+            try:
+                if session.dirty:
+                    self._snapshot(session)
+            except (WorkerFailure, PermissionError):
+                # dead already, or nowhere safe to keep its snapshot: keep it running
+                return
+            session.worker.kill()
+            session.worker = None
+        finally:
+            session.lock.release()
+
+    def reset(self, thread_id: str):
+        """Discard the session of `thread_id` and its snapshot."""
+        with self._lock:
+            session = self._sessions.pop(thread_id, None)
+        if session is not None:
+            with session.lock:
+                if session.worker is not None:
+                    session.worker.kill()
+                    session.worker = None
+        self._snapshot_path(thread_id).unlink(missing_ok=True)
+
+    def shutdown(self):
+        """Stop all sessions without snapshotting them."""
+        self._stopped.set()
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            if session.worker is not None:
+                session.worker.kill()
+                session.worker = None
+
+
+_manager: Optional[PythonSessionManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_session_manager() -> PythonSessionManager:
+    """Return the process-wide session manager, creating it on first use."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = PythonSessionManager()
+            atexit.register(_manager.shutdown)
+        return _manager
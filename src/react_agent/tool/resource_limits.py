@@ -0,0 +1,307 @@
+"""Resource limits and usage accounting for spawned commands.
+
+Limits are applied with `setrlimit` before the command is executed, so they
+are inherited by everything the command starts. Usage is taken from the
+kernel's rusage for the reaped command and aggregated per conversation thread.
+Commands run inside a long-lived shell are not reaped by us; their peak RSS
+is sampled from /proc while they run instead.
+"""
+
+import asyncio
+import json
+import os
+import resource
+import sys
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from react_agent.tool.base import current_thread_id
+
+
+def _env_int(name: str, default: Optional[int]) -> Optional[int]:
+    value = os.environ.get(name)
+    if value is None or value == "":
+        return default
+    value = int(value)
+    return value if value > 0 else None
+
+
+@dataclass(frozen=True)
+class ResourceLimits:
+    """Per-process limits applied to spawned commands; `None` means unlimited."""
+
+    cpu_time: Optional[int] = 600  # seconds of CPU time, per process
+    memory: Optional[int] = None  # bytes of address space, per process
+    file_size: Optional[int] = 2 * 1024**3  # bytes, largest file a command may write
+    open_files: Optional[int] = 1024
+    processes: Optional[int] = None  # per user, counts every process of that user
+
+    @classmethod
+    def from_env(cls) -> "ResourceLimits":
+        """Read limits from `REACT_AGENT_LIMIT_*` environment variables.
+
+        A value of `0` disables the corresponding limit.
+        """
+        defaults = cls()
+        return cls(
+            cpu_time=_env_int("REACT_AGENT_LIMIT_CPU_TIME", defaults.cpu_time),
+            memory=_env_int("REACT_AGENT_LIMIT_MEMORY", defaults.memory),
+            file_size=_env_int("REACT_AGENT_LIMIT_FILE_SIZE", defaults.file_size),
+            open_files=_env_int("REACT_AGENT_LIMIT_OPEN_FILES", defaults.open_files),
+            processes=_env_int("REACT_AGENT_LIMIT_PROCESSES", defaults.processes),
+        )
+
+    def rlimits(self) -> List[Tuple[int, int]]:
+        """Return the `(resource, value)` pairs of the limits that are set."""
+        return [
+            (limit, value)
+            for limit, value in (
+                (resource.RLIMIT_CPU, self.cpu_time),
+                (resource.RLIMIT_AS, self.memory),
+                (resource.RLIMIT_FSIZE, self.file_size),
+                (resource.RLIMIT_NOFILE, self.open_files),
+                (resource.RLIMIT_NPROC, self.processes),
+            )
+            if value is not None
+        ]
+
+    def apply(self):
+        """Apply the limits to the current process as soft limits.
+
+        A limit above the current hard limit is clamped to it, since an
+        unprivileged process cannot raise its hard limits.
+        """
+        for limit, value in self.rlimits():
+            _, hard = resource.getrlimit(limit)
+            if hard != resource.RLIM_INFINITY:
+                value = min(value, hard)
+            resource.setrlimit(limit, (value, hard))
+
+    def preexec_fn(self, new_session: bool = False) -> Callable[[], None]:
+        """Return a `preexec_fn` that applies the limits in the child."""
+
+        def _preexec():
+            if new_session:
+                os.setsid()
+            self.apply()
+
+        return _preexec
+
+
+@dataclass
+class ResourceUsage:
+    """Resources consumed by one command."""
+
+    cpu_time: Optional[float] = None  # seconds, user + system
+    peak_rss: Optional[int] = None  # bytes
+    wall_time: Optional[float] = None  # seconds
+
+    @classmethod
+    def from_rusage(cls, rusage, wall_time: float) -> "ResourceUsage":
+        """Build usage from a `resource.struct_rusage` (`ru_maxrss` is in KiB on Linux)."""
+        return cls(
+            cpu_time=rusage.ru_utime + rusage.ru_stime,
+            peak_rss=rusage.ru_maxrss * 1024,
+            wall_time=wall_time,
+        )
+
+    def format(self) -> str:
+        parts = []
+        if self.cpu_time is not None:
+            parts.append(f"cpu={self.cpu_time:.3f}s")
+        if self.peak_rss is not None:
+            parts.append(f"peak_rss={self.peak_rss / 1024**2:.1f}MiB")
+        if self.wall_time is not None:
+            parts.append(f"wall={self.wall_time:.3f}s")
+        return ", ".join(parts)
+
+
+@dataclass
+class ThreadUsage:
+    """Aggregated resource usage of all commands run for one thread."""
+
+    commands: int = 0
+    cpu_time: float = 0.0
+    wall_time: float = 0.0
+    peak_rss: int = 0  # largest peak RSS of any single command
+
+
+@dataclass
+class ResourceAccounting:
+    """Thread-safe registry of resource usage per conversation thread."""
+
+    _usage: Dict[str, ThreadUsage] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def record(self, usage: ResourceUsage, thread_id: Optional[str] = None):
+        thread_id = thread_id or current_thread_id()
+        with self._lock:
+            total = self._usage.setdefault(thread_id, ThreadUsage())
+            total.commands += 1
+            total.cpu_time += usage.cpu_time or 0.0
+            total.wall_time += usage.wall_time or 0.0
+            total.peak_rss = max(total.peak_rss, usage.peak_rss or 0)
+
+    def get(self, thread_id: Optional[str] = None) -> ThreadUsage:
+        thread_id = thread_id or current_thread_id()
+        with self._lock:
+            total = self._usage.get(thread_id, ThreadUsage())
+            return ThreadUsage(**vars(total))
+
+    def reset(self, thread_id: Optional[str] = None):
+        with self._lock:
+            if thread_id is None:
+                self._usage.clear()
+            else:
+                self._usage.pop(thread_id, None)
+
+
+accounting = ResourceAccounting()
+
+
+def children_cpu_time(pid: int) -> Optional[float]:
+    """Return the CPU time of the reaped children of `pid`, from /proc (Linux only)."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # the command name may contain spaces; the fields start after its ")"
+    fields = stat[stat.rindex(")") + 2 :].split()
+    cutime, cstime = int(fields[13]), int(fields[14])
+    return (cutime + cstime) / os.sysconf("SC_CLK_TCK")
+
+
+def descendants(pid: int) -> List[int]:
+    """Return the pids of the living descendants of `pid`, from /proc (Linux only)."""
+    children: Dict[int, List[int]] = {}
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return []
+    for name in entries:
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue  # exited meanwhile
+        ppid = int(stat[stat.rindex(")") + 2 :].split()[1])
+        children.setdefault(ppid, []).append(int(name))
+    found, stack = [], [pid]
+    while stack:
+        for child in children.get(stack.pop(), ()):
+            found.append(child)
+            stack.append(child)
+    return found
+
+
+def process_peak_rss(pid: int) -> Optional[int]:
+    """Return the peak RSS (VmHWM) of `pid` in bytes, from /proc (Linux only)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None  # exited, or a zombie
+
+
+class PeakRssSampler:
+    """Sample the peak RSS of the processes that a running shell spawns.
+
+    Processes that were already running when the sampler was created, such
+    as servers started in the background by earlier commands, are ignored.
+    A process that starts and exits between two samples is missed, so
+    `peak_rss` is a lower bound, and None if no process was seen.
+    """
+
+    interval: float = 0.05  # seconds
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.peak_rss: Optional[int] = None
+        self._ignored = set(descendants(pid))
+
+    def sample(self):
+        for child in descendants(self.pid):
+            if child in self._ignored:
+                continue
+            rss = process_peak_rss(child)
+            if rss is not None:
+                self.peak_rss = max(self.peak_rss or 0, rss)
+
+    async def run(self):
+        """Sample until cancelled."""
+        while True:
+            await asyncio.to_thread(self.sample)
+            await asyncio.sleep(self.interval)
+
+
+async def wait4(pid: int):
+    """Wait for child `pid` to exit without blocking the event loop.
+
+    Returns the `(pid, status, rusage)` tuple of `os.wait4`. A pidfd is used
+    to get notified of the exit where available; otherwise the blocking call
+    is moved to the default executor.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        pidfd = os.pidfd_open(pid)
+    except (AttributeError, OSError):
+        return await loop.run_in_executor(None, os.wait4, pid, 0)
+    try:
+        exited = loop.create_future()
+        loop.add_reader(pidfd, lambda: exited.done() or exited.set_result(None))
+        try:
+            await exited
+        finally:
+            loop.remove_reader(pidfd)
+        return os.wait4(pid, 0)
+    finally:
+        os.close(pidfd)
+
+
+# Run through `python -S -I -c` to spawn a command and report its rusage on a
+# pipe. Linux records the peak RSS of the address space a process had before
+# `exec`, so a command spawned directly from the (large) agent process would
+# report the agent's RSS; spawned from this small wrapper it does not.
+_RUSAGE_WRAPPER = """
+import json, os, resource, sys
+report_fd, rlimits, cmd = int(sys.argv[1]), json.loads(sys.argv[2]), sys.argv[3]
+os.set_inheritable(report_fd, False)
+for limit, value in rlimits:
+    _, hard = resource.getrlimit(limit)
+    if hard != resource.RLIM_INFINITY:
+        value = min(value, hard)
+    resource.setrlimit(limit, (value, hard))
+pid = os.posix_spawn("/bin/sh", ["/bin/sh", "-c", cmd], os.environ)
+_, status, ru = os.wait4(pid, 0)
+os.write(report_fd, json.dumps([status, ru.ru_utime + ru.ru_stime, ru.ru_maxrss]).encode())
+os.close(report_fd)
+code = os.waitstatus_to_exitcode(status)
+sys.exit(code if code >= 0 else 128 - code)
+"""
+
+
+def rusage_wrapper_args(
+    cmd: str, limits: ResourceLimits, report_fd: int
+) -> List[str]:
+    """Return the argv that runs `cmd` under `limits` and reports its rusage.
+
+    The report written to `report_fd` is a JSON list of the command's wait
+    status, CPU time in seconds and peak RSS in KiB.
+    """
+    return [
+        sys.executable,
+        "-S",
+        "-I",
+        "-c",
+        _RUSAGE_WRAPPER,
+        str(report_fd),
+        json.dumps(limits.rlimits()),
+        cmd,
+    ]
@@ -1,9 +1,24 @@
 """Utility to run shell commands asynchronously with a timeout."""
 
 import asyncio
+import json
+import os
+import signal
+import subprocess
+import time
 from typing import Optional, Tuple
 
+from pydantic import Field
+
 from react_agent.tool.base import BaseTool
+from react_agent.tool.output_capture import OutputCapture
+from react_agent.tool.resource_limits import (
+    ResourceLimits,
+    ResourceUsage,
+    accounting,
+    rusage_wrapper_args,
+    wait4,
+)
 
 
 TRUNCATED_MESSAGE: str = "<response clipped><NOTE>To save on context only part of this file has been shown to you. You should retry this tool after you have searched inside the file with `grep -n` in order to find the line numbers of what you are looking for.</NOTE>"
@@ -19,31 +34,128 @@ def maybe_truncate(content: str, truncate_after: int | None = MAX_RESPONSE_LEN):
     )
 
 
-async def run(
+async def pump(
+    stream: asyncio.StreamReader, capture: OutputCapture, chunk_size: int = 65536
+):
+    """Copy a stream into a capture until EOF."""
+    while True:
+        chunk = await stream.read(chunk_size)
+        if not chunk:
+            break
+        capture.write(chunk)
+
+
+async def _connect_reader(pipe) -> Tuple[asyncio.StreamReader, asyncio.BaseTransport]:
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(loop=loop)
+    transport, _ = await loop.connect_read_pipe(
+        lambda: asyncio.StreamReaderProtocol(reader, loop=loop), pipe
+    )
+    return reader, transport
+
+
+def _read_report(fd: int) -> Optional[list]:
+    try:
+        os.set_blocking(fd, False)
+        data = os.read(fd, 4096)
+    except BlockingIOError:
+        data = b""
+    finally:
+        os.close(fd)
+    return json.loads(data) if data else None
+
+
+async def run_with_usage(
     cmd: str,
     timeout: float | None = 120.0,  # seconds
     truncate_after: int | None = MAX_RESPONSE_LEN,
-) -> Tuple[int, str, str]:
-    """Run a shell command asynchronously with a timeout."""
-    process = await asyncio.create_subprocess_shell(
-        cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
-    )
+    limits: Optional[ResourceLimits] = None,
+) -> Tuple[int, str, str, ResourceUsage]:
+    """Run a shell command under resource limits and report what it used.
 
+    Output is streamed through an `OutputCapture`, so at most `truncate_after`
+    characters of each stream are held in memory; anything longer is kept in
+    a spill file that the rendered output points to. The command is started
+    through a small wrapper process that applies the limits and reports the
+    command's rusage, which is recorded for the current thread.
+    """
+    limits = limits or ResourceLimits.from_env()
+    started = time.monotonic()
+    report_fd, write_fd = os.pipe()
     try:
-        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
-        return (
-            process.returncode or 0,
-            maybe_truncate(stdout.decode(), truncate_after=truncate_after),
-            maybe_truncate(stderr.decode(), truncate_after=truncate_after),
+        process = subprocess.Popen(
+            rusage_wrapper_args(cmd, limits, write_fd),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            pass_fds=(write_fd,),
+            start_new_session=True,
+        )
+    except BaseException:
+        os.close(report_fd)
+        raise
+    finally:
+        os.close(write_fd)
+    exited = asyncio.ensure_future(wait4(process.pid))
+
+    half = truncate_after // 2 if truncate_after else None
+    stdout = OutputCapture(half, half, prefix="stdout")
+    stderr = OutputCapture(half, half, prefix="stderr")
+    transports = []
+
+    try:
+        stdout_reader, transport = await _connect_reader(process.stdout)
+        transports.append(transport)
+        stderr_reader, transport = await _connect_reader(process.stderr)
+        transports.append(transport)
+        await asyncio.wait_for(
+            asyncio.gather(
+                pump(stdout_reader, stdout),
+                pump(stderr_reader, stderr),
+                asyncio.shield(exited),
+            ),
+            timeout=timeout,
         )
     except asyncio.TimeoutError as exc:
-        try:
-            process.kill()
-        except ProcessLookupError:
-            pass
         raise TimeoutError(
             f"Command '{cmd}' timed out after {timeout} seconds"
         ) from exc
+    finally:
+        # kill the whole process group; not `process.kill()`, which polls (and
+        # so reaps) the wrapper first and loses its status
+        if not exited.done():
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        _, status, rusage = await exited
+        wall_time = time.monotonic() - started
+        report = _read_report(report_fd)
+        if report:
+            status, cpu_time, peak_rss = report
+            usage = ResourceUsage(cpu_time, peak_rss * 1024, wall_time)
+        else:
+            # the wrapper was killed before the command finished
+            usage = ResourceUsage.from_rusage(rusage, wall_time)
+        process.returncode = os.waitstatus_to_exitcode(status)
+        for transport in transports:
+            transport.close()
+        stdout.close()
+        stderr.close()
+        accounting.record(usage)
+
+    return process.returncode or 0, stdout.getvalue(), stderr.getvalue(), usage
+
+
+async def run(
+    cmd: str,
+    timeout: float | None = 120.0,  # seconds
+    truncate_after: int | None = MAX_RESPONSE_LEN,
+) -> Tuple[int, str, str]:
+    """Run a shell command asynchronously with a timeout."""
+    returncode, stdout, stderr, _ = await run_with_usage(
+        cmd, timeout=timeout, truncate_after=truncate_after
+    )
+    return returncode, stdout, stderr
 
 
 class Run(BaseTool):
@@ -66,6 +178,7 @@ class Run(BaseTool):
         },
         "required": ["cmd"],
     }
+    limits: ResourceLimits = Field(default_factory=ResourceLimits.from_env, exclude=True)
 
     async def execute(self, cmd: str, timeout: float = 120.0) -> str:
         """
@@ -79,9 +192,12 @@ class Run(BaseTool):
             str: 命令的输出结果，包括退出代码、标准输出和标准错误。
         """
         try:
-            returncode, stdout, stderr = await run(cmd, timeout=timeout)
-            
+            returncode, stdout, stderr, usage = await run_with_usage(
+                cmd, timeout=timeout, limits=self.limits
+            )
+
             result = f"Exit Code: {returncode}\n"
+            result += f"Resources: {usage.format()}\n"
             if stdout:
                 result += f"\nStandard Output:\n{stdout}\n"
             if stderr:
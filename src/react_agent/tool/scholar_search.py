@@ -1,12 +1,20 @@
 """Google Scholar 搜索工具。
 
 此模块提供了一个工具，用于在 Google Scholar 上搜索学术文献并总结结果。
+
+SerpAPI 与 scholarly 两个后端以对冲方式执行：先启动首选后端，若其在
+`hedge_delay` 秒内没有返回有效结果（或已失败），立即启动另一个后端，
+采用先到的有效结果并取消另一个。首选后端根据各后端的历史成功率与
+延迟自适应选择。
 """
 
 import asyncio
-import os
-from typing import Dict, List, Optional, Any
 import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 
 from scholarly import scholarly
 try:
@@ -32,8 +40,61 @@ except ImportError:
                 }
 
 from langchain_text_splitters import RecursiveCharacterTextSplitter
+from pydantic import Field
 
 from react_agent.tool.base import BaseTool
+from react_agent.tool.create_chat_completion import CreateChatCompletion
+from react_agent.tool.publication_index import PublicationIndex, get_publication_index
+from react_agent.tool.search_router import BackendStats
+from react_agent.tool.semantic_cache import get_semantic_cache
+from react_agent.tool.summarize import (
+    DEFAULT_CONCURRENCY,
+    REDUCE_PROMPT,
+    SummaryCache,
+    get_summary_cache,
+    map_reduce_summarize,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEDGE_DELAY: float = float(os.environ.get("REACT_AGENT_SCHOLAR_HEDGE_DELAY", 1.0))  # seconds
+# 尚无统计数据时假定的延迟（秒），使 SerpAPI 默认作为首选后端
+_PRIOR_LATENCY: Dict[str, float] = {"serpapi": 1.0, "scholarly": 3.0}
+
+# 按年份过滤时，scholarly 最多取回所需结果数的多少倍
+_SCHOLARLY_FETCH_FACTOR: int = 3
+
+_backend_stats: Dict[str, BackendStats] = {}
+_backend_stats_lock = threading.Lock()
+
+
+def _record(name: str, latency: float, ok: bool):
+    with _backend_stats_lock:
+        stats = _backend_stats.setdefault(name, BackendStats())
+        stats.calls += 1
+        if ok:
+            stats.successes += 1
+            stats.total_latency += latency
+        else:
+            stats.errors += 1
+
+
+def _in_years(year: Any, year_from: Optional[int], year_to: Optional[int]) -> bool:
+    """`year`（可能是字符串或缺失）是否落在给定的年份范围内。"""
+    try:
+        year = int(year)
+    except (TypeError, ValueError):
+        return False
+    return (year_from is None or year >= year_from) and (year_to is None or year <= year_to)
+
+
+def _expected_cost(name: str) -> float:
+    """预计得到一次有效结果所需的时间：平均延迟除以（平滑后的）成功率。"""
+    with _backend_stats_lock:
+        stats = _backend_stats.get(name, BackendStats())
+        latency = stats.mean_latency if stats.successes else _PRIOR_LATENCY.get(name, 2.0)
+        success_rate = (stats.successes + 1) / (stats.calls + 2)
+    return latency / success_rate
 
 
 class ScholarSearch(BaseTool):
@@ -70,31 +131,73 @@ class ScholarSearch(BaseTool):
         "required": ["query"],
     }
 
-    async def _search_with_scholarly(self, query: str, num_results: int = 5) -> List[Dict]:
-        """使用 scholarly 库在 Google Scholar 上搜索。"""
+    hedge_delay: float = Field(default=DEFAULT_HEDGE_DELAY, exclude=True)
+    # 用于总结的聊天完成工具，需提供 `async execute(prompt=...) -> str`，失败时须抛出异常，
+    # 否则错误信息会被当作总结缓存。总结同一批文献的提示即使措辞略有不同，回复也可通用，
+    # 因此启用语义缓存（命名空间独立，且按对话线程隔离）；
+    # 总结的分块很长且需并发处理，不合并批处理
+    summarizer: Any = Field(
+        default_factory=lambda: CreateChatCompletion(
+            cache=get_semantic_cache(),
+            cache_namespace="scholar_summary",
+            raise_on_error=True,
+            batching=False,
+        ),
+        exclude=True,
+    )
+    summary_cache: SummaryCache = Field(default_factory=get_summary_cache, exclude=True)
+    summary_concurrency: int = Field(default=DEFAULT_CONCURRENCY, exclude=True)
+    publications: PublicationIndex = Field(default_factory=get_publication_index, exclude=True)
+
+    async def _search_with_scholarly(
+        self,
+        query: str,
+        num_results: int = 5,
+        year_from: Optional[int] = None,
+        year_to: Optional[int] = None,
+    ) -> List[Dict]:
+        """使用 scholarly 库在 Google Scholar 上搜索。
+
+        scholarly 不支持按年份搜索，给定年份范围时在结果中按 `pub_year` 过滤，
+        年份未知的结果会被舍弃。任务被取消时，搜索线程在取下一条结果前停止。
+        """
         loop = asyncio.get_event_loop()
-        
+        stop = threading.Event()
+        limit = min(num_results, 10)  # scholarly 可能会被限制，所以限制最大结果数
+        filtered = year_from is not None or year_to is not None
+        max_fetched = limit * _SCHOLARLY_FETCH_FACTOR if filtered else limit
+
         def _search():
             results = []
             search_query = scholarly.search_pubs(query)
-            for i in range(min(num_results, 10)):  # scholarly 可能会被限制，所以限制最大结果数
+            for _ in range(max_fetched):
+                if stop.is_set() or len(results) >= limit:
+                    break
                 try:
                     pub = next(search_query)
-                    results.append({
-                        "title": pub.get("bib", {}).get("title", ""),
-                        "authors": pub.get("bib", {}).get("author", ""),
-                        "year": pub.get("bib", {}).get("pub_year", ""),
-                        "abstract": pub.get("bib", {}).get("abstract", ""),
-                        "url": pub.get("pub_url", ""),
-                        "citations": pub.get("num_citations", 0),
-                    })
                 except StopIteration:
                     break
                 except Exception as e:
-                    print(f"Error fetching publication: {e}")
+                    logger.warning("获取 scholarly 文献失败: %s", e)
+                    continue
+                bib = pub.get("bib", {})
+                if filtered and not _in_years(bib.get("pub_year"), year_from, year_to):
+                    continue
+                results.append({
+                    "title": bib.get("title", ""),
+                    "authors": bib.get("author", ""),
+                    "year": bib.get("pub_year", ""),
+                    "abstract": bib.get("abstract", ""),
+                    "url": pub.get("pub_url", ""),
+                    "citations": pub.get("num_citations", 0),
+                })
             return results
-        
-        return await loop.run_in_executor(None, _search)
+
+        try:
+            return await loop.run_in_executor(None, _search)
+        finally:
+            # 取消时线程仍在运行，让它不再请求后续结果
+            stop.set()
 
     async def _search_with_serpapi(self, query: str, num_results: int = 5, year_from: Optional[int] = None, year_to: Optional[int] = None) -> List[Dict]:
         """使用 SerpAPI 在 Google Scholar 上搜索。"""
@@ -135,6 +238,87 @@ class ScholarSearch(BaseTool):
         
         return await loop.run_in_executor(None, _search)
 
+    def _backends(
+        self, query: str, num_results: int, year_from: Optional[int], year_to: Optional[int]
+    ) -> List[Tuple[str, Callable[[], Awaitable[List[Dict]]]]]:
+        """可用的后端，按预计代价从低到高排序。"""
+        backends = [
+            (
+                "scholarly",
+                lambda: self._search_with_scholarly(query, num_results, year_from, year_to),
+            ),
+        ]
+        if os.environ.get("SERPAPI_API_KEY"):
+            backends.append(
+                (
+                    "serpapi",
+                    lambda: self._search_with_serpapi(query, num_results, year_from, year_to),
+                )
+            )
+        return sorted(backends, key=lambda backend: _expected_cost(backend[0]))
+
+    async def _hedged_search(
+        self,
+        query: str,
+        num_results: int = 5,
+        year_from: Optional[int] = None,
+        year_to: Optional[int] = None,
+    ) -> List[Dict]:
+        """对冲执行各后端，返回最先得到的非空结果。
+
+        首选后端先启动；它超过 `hedge_delay` 秒未返回、失败或返回空结果时，
+        启动下一个后端。所有后端都失败时抛出最后一个错误，都返回空结果时
+        返回空列表。
+        """
+        waiting = self._backends(query, num_results, year_from, year_to)
+        running: Dict[asyncio.Task, str] = {}
+
+        async def timed(name: str, search: Callable[[], Awaitable[List[Dict]]]) -> List[Dict]:
+            start = time.monotonic()
+            try:
+                results = await search()
+            except Exception:
+                _record(name, time.monotonic() - start, ok=False)
+                raise
+            _record(name, time.monotonic() - start, ok=bool(results))
+            return results
+
+        def start_next():
+            name, search = waiting.pop(0)
+            running[asyncio.create_task(timed(name, search))] = name
+
+        start_next()
+        error: Optional[Exception] = None
+        try:
+            while running:
+                done, _ = await asyncio.wait(
+                    running,
+                    timeout=self.hedge_delay if waiting else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    # 首选后端太慢，对冲启动下一个
+                    start_next()
+                    continue
+                for task in done:
+                    name = running.pop(task)
+                    try:
+                        results = task.result()
+                    except Exception as e:
+                        logger.warning("%s 搜索失败: %s", name, e)
+                        error = e
+                        results = []
+                    if results:
+                        return results
+                    if waiting:
+                        start_next()
+        finally:
+            for task in running:
+                task.cancel()
+        if error is not None:
+            raise error
+        return []
+
     async def _summarize_results(self, results: List[Dict]) -> str:
         """总结搜索结果。"""
         if not results:
@@ -150,40 +334,66 @@ class ScholarSearch(BaseTool):
             text_to_summarize += f"   引用数: {result['citations']}\n"
             text_to_summarize += f"   链接: {result['url']}\n\n"
         
-        text_to_summarize += "\n请总结这些学术文献的主要发现、方法和结论，并指出研究趋势和未来方向。"
-        
-        # 使用 LLM 总结文本
-        # 这里我们假设已经有一个 chat_completion_tool 可以使用
-        from react_agent.all_tools import chat_completion_tool
-        
+        instruction = "请总结这些学术文献的主要发现、方法和结论，并指出研究趋势和未来方向。"
+
         # 如果文本太长，需要分割
         text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=4000,
             chunk_overlap=200,
         )
-        
+
         chunks = text_splitter.split_text(text_to_summarize)
-        
+
+        async def complete(prompt: str) -> str:
+            return await self.summarizer.execute(prompt=prompt)
+
         if len(chunks) == 1:
             # 如果只有一个块，直接总结
-            summary = await chat_completion_tool.execute(prompt=chunks[0])
+            summary = await map_reduce_summarize(
+                [f"{chunks[0]}\n{instruction}"],
+                complete,
+                cache=self.summary_cache,
+                map_prompt="{text}",
+            )
         else:
-            # 如果有多个块，分别总结然后合并
-            summaries = []
-            for i, chunk in enumerate(chunks):
-                chunk_summary = await chat_completion_tool.execute(
-                    prompt=f"这是学术文献信息的第 {i+1}/{len(chunks)} 部分。请总结这部分内容：\n\n{chunk}"
-                )
-                summaries.append(chunk_summary)
-            
-            # 合并所有总结
-            combined_summary = "\n\n".join(summaries)
-            summary = await chat_completion_tool.execute(
-                prompt=f"以下是对学术文献的分部分总结，请将它们整合为一个连贯的总结：\n\n{combined_summary}"
+            # 如果有多个块，并发总结各块，再逐层合并
+            summary = await map_reduce_summarize(
+                chunks,
+                complete,
+                cache=self.summary_cache,
+                concurrency=self.summary_concurrency,
+                final_prompt=REDUCE_PROMPT + "\n\n" + instruction,
             )
-        
+
         return summary
 
+    async def search_publications(
+        self,
+        query: str,
+        num_results: int = 5,
+        year_from: Optional[int] = None,
+        year_to: Optional[int] = None,
+    ) -> List[Dict]:
+        """搜索学术文献，返回未经总结的结果。
+
+        先查询本地文献索引，未命中或结果过期时再对冲执行 SerpAPI 与 scholarly，
+        采用先到的有效结果，并将其存入索引。
+        """
+        results = await asyncio.to_thread(
+            self.publications.search, query, num_results, year_from, year_to
+        )
+        if results is None:
+            results = await self._hedged_search(query, num_results, year_from, year_to)
+            await asyncio.to_thread(
+                self.publications.add,
+                results,
+                query=query,
+                year_from=year_from,
+                year_to=year_to,
+                num_results=num_results,
+            )
+        return results
+
     async def execute(
         self,
         query: str,
@@ -208,24 +418,19 @@ class ScholarSearch(BaseTool):
             str: 搜索结果或总结。
         """
         try:
-            # 尝试使用 SerpAPI 搜索
-            try:
-                results = await self._search_with_serpapi(query, num_results, year_from, year_to)
-            except Exception as e:
-                # 如果 SerpAPI 失败，回退到 scholarly
-                print(f"SerpAPI search failed: {e}. Falling back to scholarly.")
-                results = await self._search_with_scholarly(query, num_results)
-            
+            results = await self.search_publications(query, num_results, year_from, year_to)
+
             if not results:
                 return "未找到相关学术文献。"
             
             if summarize:
-                # 总结搜索结果
-                summary = await self._summarize_results(results)
-                return summary
-            else:
-                # 返回原始搜索结果
-                return json.dumps(results, ensure_ascii=False, indent=2)
+                # 总结搜索结果；总结失败时退回原始搜索结果
+                try:
+                    return await self._summarize_results(results)
+                except Exception as e:
+                    logger.warning("总结学术文献失败，返回原始结果: %s", e)
+            # 返回原始搜索结果
+            return json.dumps(results, ensure_ascii=False, indent=2)
         
         except Exception as e:
             return f"搜索学术文献时出错: {str(e)}" 
\ No newline at end of file
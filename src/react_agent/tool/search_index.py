@@ -0,0 +1,322 @@
+"""Persistent trigram index for searching a workspace.
+
+Each workspace root gets a SQLite database with an FTS5 table using the
+`trigram` tokenizer. A query is narrowed to the files containing every
+trigram of the literal text it requires, and only those files are matched
+line by line. The index is brought up to date from file sizes and mtimes.
+The candidate files of every query are checked before they are matched,
+and a changed one is matched as it is on disk. The whole tree is re-stated
+by the first query, and afterwards in a background thread that a query
+starts when the last refresh is more than `refresh_interval` seconds old,
+so queries never wait for the walk; a file that starts to match through an
+edit is found once that refresh is done.
+
+The databases live in a directory private to the current user, since
+they hold a copy of every text file of the workspace.
+
+Binary files and files larger than `MAX_FILE_SIZE` are not indexed, as
+`grep -I` would skip them.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import re._parser as _regex_parser
+except ImportError:
+    import sre_parse as _regex_parser
+
+from react_agent.tool.dir_walker import get_directory_walker
+from react_agent.tool.private_dir import private_dir, user_temp_dir
+
+SEARCH_INDEX_DIR: Path = user_temp_dir("react_agent_search")
+MAX_FILE_SIZE: int = 2 * 1024**2  # bytes
+DEFAULT_REFRESH_INTERVAL: float = 2.0  # seconds
+MAX_QUERY_TRIGRAMS: int = 16
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    mtime INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS bodies USING fts5(
+    body, tokenize = 'trigram', detail = 'none'
+);
+"""
+
+
+@dataclass
+class SearchMatch:
+    path: str
+    line: int  # 1-based
+    text: str
+
+
+def required_literals(pattern: str) -> List[str]:
+    """Runs of literal text that every match of regex `pattern` contains."""
+    runs: List[str] = []
+
+    def walk(nodes, current: List[str]) -> List[str]:
+        for op, value in nodes:
+            if op is _regex_parser.LITERAL:
+                current.append(chr(value))
+            elif op is _regex_parser.SUBPATTERN:
+                # a plain group is as required as the text around it
+                current = walk(value[-1], current)
+            else:
+                runs.append("".join(current))
+                current = []
+        return current
+
+    runs.append("".join(walk(_regex_parser.parse(pattern), [])))
+    return [run for run in runs if len(run) >= 3]
+
+
+def _trigram_query(literals: List[str]) -> Optional[str]:
+    trigrams = {
+        run[i : i + 3] for run in literals for i in range(len(run) - 2)
+    }
+    # the tokenizer folds case, so trigrams differing only in case are the same
+    trigrams = sorted({t.lower(): t for t in trigrams}.values())[:MAX_QUERY_TRIGRAMS]
+    if not trigrams:
+        return None
+    return " AND ".join('"' + t.replace('"', '""') + '"' for t in trigrams)
+
+
+def _is_text(data: bytes) -> bool:
+    return b"\0" not in data[:8192]
+
+
+class TrigramIndex:
+    """Trigram index of the files below `root`. Thread-safe."""
+
+    def __init__(
+        self,
+        root: Path,
+        index_dir: Path = SEARCH_INDEX_DIR,
+        refresh_interval: float = DEFAULT_REFRESH_INTERVAL,
+    ):
+        self.root = Path(os.path.abspath(root))
+        digest = hashlib.sha256(str(self.root).encode()).hexdigest()[:32]
+        self.db_path = index_dir / f"{digest}.sqlite"
+        self.refresh_interval = refresh_interval
+        self._refreshed_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._refresher: Optional[threading.Thread] = None
+        self._refresher_lock = threading.Lock()
+
+    @contextmanager
+    def _connect(self):
+        private_dir(self.db_path.parent)
+        db = sqlite3.connect(self.db_path, timeout=60)
+        try:
+            # so queries can read while a background refresh writes
+            db.execute("PRAGMA journal_mode = WAL")
+            db.executescript(_SCHEMA)
+            yield db
+            db.commit()
+        except BaseException:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _index_file(self, db, path: str, stat, file_id: Optional[int]) -> int:
+        """(Re)index one file; returns its id."""
+        if file_id is None:
+            file_id = db.execute(
+                "INSERT INTO files (path, mtime, size) VALUES (?, ?, ?)",
+                (path, stat.st_mtime_ns, stat.st_size),
+            ).lastrowid
+        else:
+            db.execute(
+                "UPDATE files SET mtime = ?, size = ? WHERE id = ?",
+                (stat.st_mtime_ns, stat.st_size, file_id),
+            )
+            db.execute("DELETE FROM bodies WHERE rowid = ?", (file_id,))
+        body = _read_body(path, stat)
+        if body is not None:
+            db.execute("INSERT INTO bodies (rowid, body) VALUES (?, ?)", (file_id, body))
+        return file_id
+
+    def refresh(self, force: bool = False) -> Tuple[int, int]:
+        """Bring the index up to date with the tree; returns (indexed, removed).
+
+        Skipped if the last refresh was less than `refresh_interval` ago,
+        unless `force` is set.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if (
+                not force
+                and self._refreshed_at is not None
+                and now - self._refreshed_at < self.refresh_interval
+            ):
+                return 0, 0
+            indexed = removed = 0
+            with self._connect() as db:
+                known: Dict[str, Tuple[int, int, int]] = {
+                    path: (file_id, mtime, size)
+                    for file_id, path, mtime, size in db.execute(
+                        "SELECT id, path, mtime, size FROM files"
+                    )
+                }
+                for path in get_directory_walker().iter_files(self.root):
+                    entry = known.pop(path, None)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    if entry is not None and entry[1:] == (stat.st_mtime_ns, stat.st_size):
+                        continue
+                    self._index_file(db, path, stat, entry[0] if entry else None)
+                    indexed += 1
+                for file_id, _, _ in known.values():
+                    db.execute("DELETE FROM bodies WHERE rowid = ?", (file_id,))
+                    db.execute("DELETE FROM files WHERE id = ?", (file_id,))
+                    removed += 1
+            self._refreshed_at = time.monotonic()
+            return indexed, removed
+
+    def _refresh_soon(self):
+        """Refresh now if never done, else in the background once it is due."""
+        if self._refreshed_at is None:
+            self.refresh()
+            return
+        if time.monotonic() - self._refreshed_at < self.refresh_interval:
+            return
+        with self._refresher_lock:
+            if self._refresher is not None and self._refresher.is_alive():
+                return
+            self._refresher = threading.Thread(
+                target=self.refresh, name="search-index-refresh", daemon=True
+            )
+            self._refresher.start()
+
+    def _candidates(self, db, query: Optional[str]) -> Iterator[Tuple[int, str, int, int, str]]:
+        select = (
+            "SELECT files.id, path, mtime, size, body FROM bodies "
+            "JOIN files ON files.id = bodies.rowid"
+        )
+        if query is None:
+            return db.execute(f"{select} ORDER BY path")
+        return db.execute(f"{select} WHERE bodies MATCH ? ORDER BY path", (query,))
+
+    def search(
+        self,
+        pattern: str,
+        regex: bool = False,
+        ignore_case: bool = False,
+        limit: int = 200,
+        under: Optional[Path] = None,
+    ) -> Tuple[List[SearchMatch], int]:
+        """Find the lines matching `pattern`, a substring or a regex.
+
+        Only files below `under`, if given, are searched. Returns up to
+        `limit` matches in path and line order, and the total number of
+        matching lines.
+        """
+        prefix = os.path.join(os.path.abspath(under), "") if under is not None else ""
+        if regex:
+            compiled = re.compile(pattern, re.MULTILINE | (re.IGNORECASE if ignore_case else 0))
+            literals = required_literals(pattern)
+        else:
+            compiled = re.compile(re.escape(pattern), re.IGNORECASE if ignore_case else 0)
+            literals = [pattern] if len(pattern) >= 3 else []
+        query = _trigram_query(literals)
+
+        self._refresh_soon()
+        matches: List[SearchMatch] = []
+        total = 0
+
+        def match(path: str, body: str):
+            nonlocal total
+            for line, text in _matching_lines(body, compiled):
+                total += 1
+                if len(matches) < limit:
+                    matches.append(SearchMatch(path, line, text))
+
+        with self._connect() as db:
+            stale = []
+            for file_id, path, mtime, size, body in self._candidates(db, query):
+                if not path.startswith(prefix):
+                    continue
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if (stat.st_mtime_ns, stat.st_size) != (mtime, size):
+                    # changed since the last refresh: matched as it is on
+                    # disk once the candidates have been read; the next
+                    # refresh reindexes it
+                    stale.append((path, stat))
+                    continue
+                match(path, body)
+        if stale:
+            fresh, matches = matches, []
+            for path, stat in stale:
+                body = _read_body(path, stat)
+                if body is not None:
+                    match(path, body)
+            matches = sorted(fresh + matches, key=lambda m: (m.path, m.line))[:limit]
+        return matches, total
+
+
+def _read_body(path: str, stat) -> Optional[str]:
+    """The text of the file at `path`, or None if it is not indexed."""
+    if stat.st_size > MAX_FILE_SIZE:
+        return None
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    return data.decode("utf-8", errors="replace") if _is_text(data) else None
+
+
+def _matching_lines(body: str, compiled: "re.Pattern[str]") -> Iterator[Tuple[int, str]]:
+    """Yield (line number, line) for each line of `body` with a match."""
+    line, counted_to, last_line = 1, 0, 0
+    for match in compiled.finditer(body):
+        start = match.start()
+        line += body.count("\n", counted_to, start)
+        counted_to = start
+        if line == last_line:
+            continue
+        last_line = line
+        begin = body.rfind("\n", 0, start) + 1
+        end = body.find("\n", start)
+        yield line, body[begin : end if end != -1 else len(body)].rstrip("\r")
+
+
+_indexes: Dict[Path, TrigramIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def workspace_root(path: Path) -> Path:
+    """The repository containing `path`, or `path` itself outside of one."""
+    path = Path(os.path.abspath(path))
+    for directory in (path, *path.parents):
+        if (directory / ".git").exists():
+            return directory
+    return path
+
+
+def get_search_index(root: Path) -> TrigramIndex:
+    """Return the process-wide index of the workspace at `root`."""
+    root = Path(os.path.abspath(root))
+    with _indexes_lock:
+        index = _indexes.get(root)
+        if index is None:
+            index = _indexes[root] = TrigramIndex(root)
+        return index
@@ -0,0 +1,278 @@
+"""Federated web search over several backends.
+
+A query is sent to every configured backend at once. The router returns as
+soon as `quorum` backends have answered, or when the overall deadline
+passes, whichever comes first; the quorum is capped at the number of
+general-purpose backends, so a web search never waits on a specialized one
+such as Google Scholar; a backend slower than its own deadline, or
+one that fails, is left out. The result lists are merged with reciprocal
+rank fusion: a URL scores `weight / (k + rank)` in every list it appears
+in. Latency, failures and how many merged results each backend contributed
+are recorded per backend.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKEND_DEADLINE: float = 5.0  # seconds
+DEFAULT_DEADLINE: float = 8.0  # seconds
+DEFAULT_QUORUM: int = 2
+RRF_K: int = 60
+
+
+@dataclass
+class SearchHit:
+    url: str
+    title: str = ""
+    snippet: str = ""
+    sources: List[str] = field(default_factory=list)  # backends that returned it
+    score: float = 0.0
+
+
+SearchFunction = Callable[[str, int], Awaitable[List[SearchHit]]]
+
+
+@dataclass
+class Backend:
+    name: str
+    search: SearchFunction  # (query, num_results) -> hits, best first
+    deadline: float = DEFAULT_BACKEND_DEADLINE
+    weight: float = 1.0
+    general: bool = True  # False for backends that only cover some queries well
+
+
+@dataclass
+class BackendReport:
+    """What one backend did for one query."""
+
+    status: str  # "ok", "error", "timeout" or "cancelled"
+    latency: float
+    hits: int = 0
+    contributed: int = 0  # of the merged results returned
+    error: Optional[str] = None
+
+
+@dataclass
+class BackendStats:
+    """What one backend did over all queries."""
+
+    calls: int = 0
+    successes: int = 0
+    timeouts: int = 0
+    errors: int = 0
+    total_latency: float = 0.0  # of successful calls
+    contributed: int = 0
+
+    @property
+    def mean_latency(self) -> float:
+        return self.total_latency / self.successes if self.successes else 0.0
+
+
+@dataclass
+class FederatedResult:
+    hits: List[SearchHit]
+    backends: Dict[str, BackendReport]
+
+
+def reciprocal_rank_fusion(
+    rankings: Dict[str, List[SearchHit]], weights: Dict[str, float], k: int = RRF_K
+) -> List[SearchHit]:
+    """Merge ranked hit lists by backend into one list, best first."""
+    merged: Dict[str, SearchHit] = {}
+    for name, hits in rankings.items():
+        seen = set()
+        for rank, hit in enumerate(hits, 1):
+            if not hit.url or hit.url in seen:
+                continue
+            seen.add(hit.url)
+            entry = merged.get(hit.url)
+            if entry is None:
+                entry = merged[hit.url] = SearchHit(hit.url, hit.title, hit.snippet)
+            entry.title = entry.title or hit.title
+            entry.snippet = entry.snippet or hit.snippet
+            entry.sources.append(name)
+            entry.score += weights.get(name, 1.0) / (k + rank)
+    return sorted(merged.values(), key=lambda hit: -hit.score)
+
+
+class SearchRouter:
+    """Fans queries out to `backends` and fuses their results."""
+
+    def __init__(
+        self,
+        backends: List[Backend],
+        quorum: int = DEFAULT_QUORUM,
+        deadline: float = DEFAULT_DEADLINE,
+        k: int = RRF_K,
+    ):
+        self.backends = backends
+        self.quorum = quorum
+        self.deadline = deadline
+        self.k = k
+        self.stats: Dict[str, BackendStats] = {b.name: BackendStats() for b in backends}
+        self._lock = threading.Lock()
+
+    async def _call(self, backend: Backend, query: str, num_results: int):
+        start = time.monotonic()
+        try:
+            hits = await asyncio.wait_for(backend.search(query, num_results), backend.deadline)
+        except asyncio.TimeoutError:
+            return None, BackendReport("timeout", time.monotonic() - start)
+        except Exception as e:
+            return None, BackendReport("error", time.monotonic() - start, error=str(e))
+        return hits, BackendReport("ok", time.monotonic() - start, hits=len(hits))
+
+    async def search(self, query: str, num_results: int = 10) -> FederatedResult:
+        """Search every backend; return once `quorum` answered or at the deadline."""
+        start = time.monotonic()
+        tasks = {
+            asyncio.create_task(self._call(backend, query, num_results)): backend
+            for backend in self.backends
+        }
+        rankings: Dict[str, List[SearchHit]] = {}
+        reports: Dict[str, BackendReport] = {}
+        pending = set(tasks)
+        general = sum(backend.general for backend in self.backends)
+        quorum = min(self.quorum, general or len(self.backends))
+        try:
+            while pending and len(rankings) < quorum:
+                remaining = self.deadline - (time.monotonic() - start)
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(
+                    pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    hits, report = task.result()
+                    reports[tasks[task].name] = report
+                    if hits is not None:
+                        rankings[tasks[task].name] = hits
+        finally:
+            for task in pending:
+                task.cancel()
+                reports[tasks[task].name] = BackendReport(
+                    "cancelled", time.monotonic() - start
+                )
+
+        # in configuration order, so ties do not depend on which answered first
+        rankings = {b.name: rankings[b.name] for b in self.backends if b.name in rankings}
+        weights = {backend.name: backend.weight for backend in self.backends}
+        hits = reciprocal_rank_fusion(rankings, weights, self.k)[:num_results]
+        for hit in hits:
+            for name in hit.sources:
+                reports[name].contributed += 1
+        self._record(reports)
+        logger.debug(
+            "search %r: %s",
+            query,
+            {name: (r.status, round(r.latency, 3), r.contributed) for name, r in reports.items()},
+        )
+        return FederatedResult(hits, reports)
+
+    def _record(self, reports: Dict[str, BackendReport]):
+        with self._lock:
+            for name, report in reports.items():
+                stats = self.stats.setdefault(name, BackendStats())
+                stats.calls += 1
+                stats.contributed += report.contributed
+                if report.status == "ok":
+                    stats.successes += 1
+                    stats.total_latency += report.latency
+                elif report.status == "error":
+                    stats.errors += 1
+                else:
+                    stats.timeouts += 1
+
+
+async def _google(query: str, num_results: int) -> List[SearchHit]:
+    from googlesearch import search
+
+    urls = await asyncio.to_thread(
+        lambda: list(search(query, num=num_results, stop=num_results))
+    )
+    return [SearchHit(url) for url in urls]
+
+
+async def _serpapi(query: str, num_results: int) -> List[SearchHit]:
+    from serpapi import GoogleSearch
+
+    params = {
+        "engine": "google",
+        "q": query,
+        "num": num_results,
+        "api_key": os.environ["SERPAPI_API_KEY"],
+    }
+    results = await asyncio.to_thread(lambda: GoogleSearch(params).get_dict())
+    if "error" in results:
+        raise RuntimeError(results["error"])
+    return [
+        SearchHit(result.get("link", ""), result.get("title", ""), result.get("snippet", ""))
+        for result in results.get("organic_results", [])[:num_results]
+    ]
+
+
+async def _scholar(query: str, num_results: int) -> List[SearchHit]:
+    from react_agent.tool.scholar_search import ScholarSearch
+
+    results = await ScholarSearch().search_publications(query, num_results)
+    return [
+        SearchHit(result.get("url", ""), result.get("title", ""), result.get("abstract", ""))
+        for result in results
+    ]
+
+
+def local_index_backend(root: str, name: str = "local") -> Backend:
+    """A backend searching the files below `root` with the workspace index."""
+    from react_agent.tool.search_index import get_search_index
+
+    async def search(query: str, num_results: int) -> List[SearchHit]:
+        matches, _ = await asyncio.to_thread(
+            get_search_index(root).search, query, False, True, num_results * 5
+        )
+        hits: Dict[str, SearchHit] = {}
+        for match in matches:
+            if match.path not in hits:
+                hits[match.path] = SearchHit(
+                    f"file://{match.path}", os.path.basename(match.path), match.text.strip()
+                )
+        return list(hits.values())[:num_results]
+
+    return Backend(name, search, deadline=2.0)
+
+
+def default_backends() -> List[Backend]:
+    """The backends available in this environment.
+
+    Google scraping is always used, SerpAPI if SERPAPI_API_KEY is set,
+    Google Scholar if REACT_AGENT_SEARCH_SCHOLAR is set to 1, and the files
+    below REACT_AGENT_SEARCH_LOCAL_ROOT if it is set.
+    """
+    backends = [Backend("google", _google)]
+    if os.environ.get("REACT_AGENT_SEARCH_SCHOLAR") == "1":
+        backends.append(Backend("scholar", _scholar, weight=0.5, general=False))
+    if os.environ.get("SERPAPI_API_KEY"):
+        backends.append(Backend("serpapi", _serpapi))
+    local_root = os.environ.get("REACT_AGENT_SEARCH_LOCAL_ROOT")
+    if local_root:
+        backends.append(local_index_backend(local_root))
+    return backends
+
+
+_router: Optional[SearchRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_search_router() -> SearchRouter:
+    """Return the process-wide search router, creating it on first use."""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = SearchRouter(default_backends())
+        return _router
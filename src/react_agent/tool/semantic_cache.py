@@ -0,0 +1,192 @@
+"""Semantic cache of completions.
+
+Prompts are embedded with a hashing vectorizer: word unigrams and
+character trigrams, hashed into a fixed number of signed buckets and
+L2-normalized. It needs no model, runs on CPU in a few milliseconds, and
+is insensitive to whitespace and case.
+
+A prompt is answered from the cache only when, against one cached prompt,
+both the whole prompt and its last sentence (the question, usually) reach
+`threshold` cosine similarity, and both contain the same numbers. The
+whole-prompt similarity alone is not enough for long prompts: two
+questions asked about the same long context differ in a handful of
+trigrams out of thousands and score above 0.99, so the last sentence is
+compared on its own. Keep the threshold at 0.95 or above; lowering it
+lets the last sentences differ by more than a word or two.
+
+The cache is opt-in: `CreateChatCompletion` uses it only when given one.
+
+Entries live in per-namespace NumPy matrices searched exactly with one
+matrix product, which at a few thousand entries is faster than building
+an approximate index. Each namespace keeps at most `max_entries`,
+evicting the least recently used.
+"""
+
+import math
+import os
+import re
+import threading
+import unicodedata
+import zlib
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_DIMENSIONS: int = 1024
+DEFAULT_THRESHOLD: float = float(
+    os.environ.get("REACT_AGENT_SEMANTIC_CACHE_THRESHOLD", 0.95)
+)  # cosine similarity; above 1 disables the cache
+DEFAULT_MAX_ENTRIES: int = 1024  # per namespace
+_SAME_KEY: float = 0.999  # similarity at which a put replaces an entry
+MAX_TAIL_CHARS: int = 200
+_SENTENCE_END = re.compile(r"[.?!。？！\n]+")
+
+
+class HashingEmbedder:
+    """Embeds text as a normalized vector of hashed word and trigram counts."""
+
+    def __init__(self, dimensions: int = DEFAULT_DIMENSIONS):
+        self.dimensions = dimensions
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return " ".join(unicodedata.normalize("NFKC", text).lower().split())
+
+    def features(self, text: str) -> List[str]:
+        text = self.normalize(text)
+        words = re.findall(r"\w+", text)
+        compact = re.sub(r"\W+", "", text)
+        return words + [compact[i : i + 3] for i in range(len(compact) - 2)]
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for feature, count in Counter(self.features(text)).items():
+            h = zlib.crc32(feature.encode())
+            sign = 1.0 if h & 0x80000000 else -1.0  # so collisions cancel out on average
+            vector[h % self.dimensions] += sign * math.sqrt(count)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+def _numbers(text: str) -> Tuple[str, ...]:
+    return tuple(sorted(re.findall(r"\d+(?:\.\d+)?", text)))
+
+
+def _tail(text: str) -> str:
+    """The last sentence of `text`, at most `MAX_TAIL_CHARS` long."""
+    sentences = [s for s in _SENTENCE_END.split(text) if s.strip()]
+    return (sentences[-1] if sentences else text)[-MAX_TAIL_CHARS:]
+
+
+class _Namespace:
+    def __init__(self, dimensions: int):
+        self.vectors = np.zeros((0, dimensions), dtype=np.float32)
+        self.tails = np.zeros((0, dimensions), dtype=np.float32)
+        self.numbers: List[Tuple[str, ...]] = []
+        self.answers: List[str] = []
+        self.last_used: List[int] = []
+
+    def nearest(self, vector: np.ndarray, tail: np.ndarray) -> Tuple[int, float]:
+        """The entry most similar in both the whole prompt and its tail."""
+        if not self.answers:
+            return -1, 0.0
+        size = len(self.answers)
+        similarities = np.minimum(self.vectors[:size] @ vector, self.tails[:size] @ tail)
+        best = int(np.argmax(similarities))
+        return best, float(similarities[best])
+
+
+class SemanticCache:
+    """Completions by prompt similarity, isolated by namespace. Thread-safe."""
+
+    def __init__(
+        self,
+        embedder: Optional[HashingEmbedder] = None,
+        threshold: float = DEFAULT_THRESHOLD,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        self.embedder = embedder or HashingEmbedder()
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._namespaces: Dict[str, _Namespace] = {}
+        self._clock = 0  # for least-recently-used eviction
+        self._lock = threading.Lock()
+
+    def _tick(self) -> int:
+        self._clock += 1
+        return self._clock
+
+    def get(self, prompt: str, namespace: str = "default") -> Optional[str]:
+        """The cached answer to a prompt similar enough to `prompt`, if any."""
+        if self.threshold > 1:
+            return None
+        vector, tail = self.embedder.embed(prompt), self.embedder.embed(_tail(prompt))
+        numbers = _numbers(prompt)
+        with self._lock:
+            space = self._namespaces.get(namespace)
+            index, similarity = space.nearest(vector, tail) if space else (-1, 0.0)
+            if index < 0 or similarity < self.threshold or space.numbers[index] != numbers:
+                self.misses += 1
+                return None
+            self.hits += 1
+            space.last_used[index] = self._tick()
+            return space.answers[index]
+
+    def put(self, prompt: str, answer: str, namespace: str = "default"):
+        vector, tail = self.embedder.embed(prompt), self.embedder.embed(_tail(prompt))
+        numbers = _numbers(prompt)
+        with self._lock:
+            space = self._namespaces.setdefault(
+                namespace, _Namespace(self.embedder.dimensions)
+            )
+            index, similarity = space.nearest(vector, tail)
+            if index < 0 or similarity < _SAME_KEY or space.numbers[index] != numbers:
+                index = self._free_row(space)
+            space.vectors[index] = vector
+            space.tails[index] = tail
+            space.numbers[index] = numbers
+            space.answers[index] = answer
+            space.last_used[index] = self._tick()
+
+    def _free_row(self, space: _Namespace) -> int:
+        # called with `_lock` held
+        size = len(space.answers)
+        if size >= self.max_entries:
+            return int(np.argmin(space.last_used))
+        if size == len(space.vectors):
+            rows = min(max(2 * size, 16), self.max_entries)
+            for name in ("vectors", "tails"):
+                grown = np.zeros((rows, self.embedder.dimensions), dtype=np.float32)
+                grown[:size] = getattr(space, name)
+                setattr(space, name, grown)
+        space.numbers.append(())
+        space.answers.append("")
+        space.last_used.append(0)
+        return size
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(space.answers) for space in self._namespaces.values())
+
+    def clear(self, namespace: Optional[str] = None):
+        with self._lock:
+            if namespace is None:
+                self._namespaces.clear()
+            else:
+                self._namespaces.pop(namespace, None)
+
+
+_cache: Optional[SemanticCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_semantic_cache() -> SemanticCache:
+    """Return the process-wide semantic cache, creating it on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SemanticCache()
+        return _cache
@@ -0,0 +1,386 @@
+"""Named shared-memory store for arrays and DataFrames.
+
+Executed code can `publish` a NumPy array or pandas DataFrame under a name
+and any later execution, in any worker process, can `attach` to it again
+without reloading or copying it: numeric data is placed in a
+`multiprocessing.shared_memory` segment and attached as read-only views.
+Columns that are not fixed-width (strings, Python objects) are pickled into
+the segment and unpickled, i.e. copied, on attach.
+
+The registry is a SQLite database shared by all processes. It counts, per
+process, who has an object attached; objects nobody holds are evicted in
+least recently used order to keep the store within its memory budget.
+
+Attaching unpickles data, so the registry lives in a directory private to
+the current user, and only segments named with this user's prefix and
+owned by this user are ever attached or unlinked.
+"""
+
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+import numpy as np
+
+from react_agent.tool.private_dir import private_dir, user_temp_dir
+
+SHARED_STORE_DIR: Path = user_temp_dir("react_agent_shared")
+DEFAULT_MEMORY_BUDGET: int = int(
+    os.environ.get("REACT_AGENT_SHARED_MEMORY_BUDGET", 4 * 1024**3)
+)  # bytes
+_ALIGNMENT: int = 64
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    name TEXT PRIMARY KEY,
+    segment TEXT NOT NULL,
+    nbytes INTEGER NOT NULL,
+    layout TEXT NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS holders (
+    name TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (name, pid)
+);
+"""
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _untrack(segment: shared_memory.SharedMemory):
+    # the registry owns segment lifetimes; without this the resource tracker
+    # of whichever process created or attached a segment unlinks it on exit
+    try:
+        resource_tracker.unregister(segment._name, "shared_memory")
+    except Exception:
+        pass
+
+
+def _segment_prefix() -> str:
+    return f"ra_{os.getuid()}_"
+
+
+def _check_segment_name(segment_name: str):
+    if not segment_name.startswith(_segment_prefix()):
+        raise PermissionError(f"Shared segment {segment_name!r} does not belong to this store")
+
+
+def _open_segment(segment_name: str) -> shared_memory.SharedMemory:
+    """Attach an existing segment of this store, checking its name and owner."""
+    _check_segment_name(segment_name)
+    segment = shared_memory.SharedMemory(name=segment_name)
+    fd = getattr(segment, "_fd", -1)
+    if fd >= 0 and os.fstat(fd).st_uid != os.getuid():
+        _untrack(segment)
+        segment.close()
+        raise PermissionError(f"Shared segment {segment_name!r} is owned by another user")
+    return segment
+
+
+def _unlink(segment_name: str):
+    try:
+        segment = _open_segment(segment_name)
+    except (FileNotFoundError, PermissionError):
+        return
+    segment.close()
+    segment.unlink()
+
+
+# segments this process has mapped, shared by all stores in the process: a
+# segment cannot be closed while arrays viewing it are alive, and those views
+# may well outlive the store that handed them out
+_mapped: Dict[str, shared_memory.SharedMemory] = {}
+
+
+def _unmap(segment_name: str):
+    """Close a mapped segment unless views of it are still in use."""
+    segment = _mapped.get(segment_name)
+    if segment is None:
+        return
+    try:
+        segment.close()
+    except BufferError:
+        return
+    del _mapped[segment_name]
+
+
+def _plan(obj) -> Dict:
+    """Describe how `obj` is laid out in a segment."""
+    if isinstance(obj, np.ndarray):
+        return {"kind": "ndarray", "parts": [_part(None, obj)]}
+    try:
+        import pandas as pd
+    except ImportError:
+        pd = None
+    if pd is not None and isinstance(obj, pd.DataFrame):
+        parts = [_part(str(column), obj[column].to_numpy()) for column in obj.columns]
+        if not isinstance(obj.index, pd.RangeIndex):
+            index = _part("index", obj.index.to_numpy())
+        else:
+            index = {"range": [obj.index.start, obj.index.stop, obj.index.step]}
+        return {"kind": "dataframe", "parts": parts, "index": index}
+    return {"kind": "pickle", "parts": [_part(None, obj)]}
+
+
+def _part(name: Optional[str], value) -> Dict:
+    if isinstance(value, np.ndarray) and value.dtype != object and not value.dtype.hasobject:
+        value = np.ascontiguousarray(value)
+        return {
+            "name": name,
+            "dtype": value.dtype.str,
+            "shape": list(value.shape),
+            "nbytes": value.nbytes,
+            "_value": value,
+        }
+    data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    return {"name": name, "pickled": True, "nbytes": len(data), "_value": data}
+
+
+def _parts(layout: Dict) -> List[Dict]:
+    parts = list(layout["parts"])
+    if "nbytes" in layout.get("index", {}):
+        parts.append(layout["index"])
+    return parts
+
+
+class SharedObjectStore:
+    """Publish and attach named objects in shared memory."""
+
+    def __init__(
+        self,
+        directory: Path = SHARED_STORE_DIR,
+        memory_budget: int = DEFAULT_MEMORY_BUDGET,
+    ):
+        self.directory = directory
+        self.memory_budget = memory_budget
+        # name -> (segment name, number of attaches by this process)
+        self._attached: Dict[str, Tuple[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def __reduce__(self):
+        # executed code's namespace may be pickled for snapshots
+        return (get_shared_store, ())
+
+    @contextmanager
+    def _registry(self):
+        """Open the registry in an exclusive transaction."""
+        private_dir(self.directory)
+        db = sqlite3.connect(self.directory / "registry.sqlite", timeout=30)
+        try:
+            db.executescript(_SCHEMA)
+            db.execute("BEGIN IMMEDIATE")
+            yield db
+            db.commit()
+        except BaseException:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _refcount(self, db, name: str) -> int:
+        rows = db.execute(
+            "SELECT pid, count FROM holders WHERE name = ?", (name,)
+        ).fetchall()
+        count = 0
+        for pid, held in rows:
+            if _pid_alive(pid):
+                count += held
+            else:
+                db.execute("DELETE FROM holders WHERE name = ? AND pid = ?", (name, pid))
+        return count
+
+    def _drop(self, db, name: str):
+        row = db.execute("SELECT segment FROM objects WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return
+        db.execute("DELETE FROM objects WHERE name = ?", (name,))
+        db.execute("DELETE FROM holders WHERE name = ?", (name,))
+        # unlinking a segment that is still mapped is safe: the memory is
+        # released once the last mapping goes away
+        _unlink(row[0])
+
+    def _make_room(self, db, nbytes: int):
+        used = db.execute("SELECT COALESCE(SUM(nbytes), 0) FROM objects").fetchone()[0]
+        if used + nbytes <= self.memory_budget:
+            return
+        for name, size in db.execute(
+            "SELECT name, nbytes FROM objects ORDER BY last_used"
+        ).fetchall():
+            if self._refcount(db, name) == 0:
+                self._drop(db, name)
+                used -= size
+                if used + nbytes <= self.memory_budget:
+                    return
+        raise MemoryError(
+            f"Cannot store {nbytes} bytes: the shared store budget of {self.memory_budget} bytes is held by attached objects"
+        )
+
+    def publish(self, name: str, obj: Any) -> int:
+        """Store `obj` under `name`, replacing any previous object; returns its size."""
+        layout = _plan(obj)
+        offset = 0
+        for part in _parts(layout):
+            part["offset"] = offset
+            offset += -(-part["nbytes"] // _ALIGNMENT) * _ALIGNMENT
+        size = max(offset, 1)
+
+        segment = shared_memory.SharedMemory(
+            name=f"{_segment_prefix()}{uuid4().hex[:20]}", create=True, size=size
+        )
+        try:
+            for part in _parts(layout):
+                value = part.pop("_value")
+                target = segment.buf[part["offset"] : part["offset"] + part["nbytes"]]
+                if part.get("pickled"):
+                    target[:] = value
+                else:
+                    np.frombuffer(target, dtype=np.uint8)[:] = value.reshape(-1).view(np.uint8)
+                del target
+            with self._registry() as db:
+                self._drop(db, name)
+                self._make_room(db, size)
+                db.execute(
+                    "INSERT INTO objects VALUES (?, ?, ?, ?, ?)",
+                    (name, segment.name, size, json.dumps(layout), time.time()),
+                )
+        except BaseException:
+            segment.close()
+            segment.unlink()
+            raise
+        _untrack(segment)
+        segment.close()
+        return size
+
+    def attach(self, name: str) -> Any:
+        """Return the object stored under `name`, sharing its memory where possible.
+
+        Arrays are read-only. The object stays pinned until `release`.
+        """
+        with self._registry() as db:
+            row = db.execute(
+                "SELECT segment, layout FROM objects WHERE name = ?", (name,)
+            ).fetchone()
+            if row is None:
+                raise KeyError(f"No shared object named {name!r}")
+            segment_name, layout = row[0], json.loads(row[1])
+            with self._lock:
+                # mapped before it is pinned, so a segment that fails the
+                # checks leaves no holder behind
+                segment = _mapped.get(segment_name)
+                if segment is None:
+                    segment = _open_segment(segment_name)
+                    _untrack(segment)
+                    _mapped[segment_name] = segment
+                _, count = self._attached.get(name, (segment_name, 0))
+                self._attached[name] = (segment_name, count + 1)
+            db.execute("UPDATE objects SET last_used = ? WHERE name = ?", (time.time(), name))
+            db.execute(
+                "INSERT INTO holders VALUES (?, ?, 1) ON CONFLICT (name, pid) DO UPDATE SET count = count + 1",
+                (name, os.getpid()),
+            )
+
+        values = [self._load(segment, part) for part in layout["parts"]]
+        if layout["kind"] != "dataframe":
+            return values[0]
+
+        import pandas as pd
+
+        index = layout["index"]
+        if "range" in index:
+            index = pd.RangeIndex(*index["range"])
+        else:
+            index = self._load(segment, index)
+        return pd.DataFrame(
+            {part["name"]: value for part, value in zip(layout["parts"], values)},
+            index=index,
+            copy=False,
+        )
+
+    def _load(self, segment: shared_memory.SharedMemory, part: Dict):
+        buffer = segment.buf[part["offset"] : part["offset"] + part["nbytes"]]
+        if part.get("pickled"):
+            return pickle.loads(buffer)
+        array = np.frombuffer(buffer, dtype=np.dtype(part["dtype"])).reshape(part["shape"])
+        array.flags.writeable = False
+        return array
+
+    def release(self, name: str):
+        """Unpin one `attach` of `name` made by this process."""
+        with self._lock:
+            if name not in self._attached:
+                return
+            segment_name, count = self._attached.pop(name)
+            if count > 1:
+                self._attached[name] = (segment_name, count - 1)
+            else:
+                _unmap(segment_name)
+        with self._registry() as db:
+            db.execute(
+                "UPDATE holders SET count = count - 1 WHERE name = ? AND pid = ?",
+                (name, os.getpid()),
+            )
+            db.execute("DELETE FROM holders WHERE count <= 0")
+
+    def release_all(self):
+        """Unpin every object this process has attached."""
+        with self._lock:
+            attached = [(name, count) for name, (_, count) in self._attached.items()]
+        for name, count in attached:
+            for _ in range(count):
+                self.release(name)
+        with self._lock:
+            for segment_name in list(_mapped):
+                _unmap(segment_name)
+
+    def delete(self, name: str):
+        """Remove `name` from the store; processes that attached it keep their view."""
+        with self._registry() as db:
+            self._drop(db, name)
+
+    def list(self) -> List[Dict]:
+        """Describe the stored objects, least recently used first."""
+        with self._registry() as db:
+            rows = db.execute(
+                "SELECT name, nbytes, layout, last_used FROM objects ORDER BY last_used"
+            ).fetchall()
+            return [
+                {
+                    "name": name,
+                    "nbytes": nbytes,
+                    "kind": json.loads(layout)["kind"],
+                    "refcount": self._refcount(db, name),
+                    "last_used": last_used,
+                }
+                for name, nbytes, layout, last_used in rows
+            ]
+
+
+_store: Optional[SharedObjectStore] = None
+_store_lock = threading.Lock()
+
+
+def get_shared_store() -> SharedObjectStore:
+    """Return this process's handle on the shared store."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SharedObjectStore()
+        return _store
@@ -1,11 +1,38 @@
-from collections import defaultdict
+import asyncio
+import contextvars
+import functools
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Literal, get_args
+from typing import Callable, Iterator, Literal, NamedTuple, TextIO, Tuple, TypeVar, get_args
+from weakref import WeakValueDictionary
+
+from pydantic import Field
 
 from react_agent.exceptions import ToolError
 from react_agent.tool import BaseTool
+from react_agent.tool.atomic_write import (
+    commit_temp_file,
+    discard_temp_file,
+    open_temp_file,
+)
 from react_agent.tool.base import CLIResult, ToolResult
-from react_agent.tool.run import run
+from react_agent.tool.dir_walker import (
+    DEFAULT_MAX_DEPTH,
+    DEFAULT_MAX_ENTRIES,
+    get_directory_walker,
+)
+from react_agent.tool.edit_history import EditHistory, ReversePatch, get_edit_history
+from react_agent.tool.line_index import (
+    forget_line_index,
+    get_line_index,
+    read_lines_around,
+)
+from react_agent.tool.outline import get_outline
+from react_agent.tool.search_index import get_search_index, workspace_root
 
 
 Command = Literal[
@@ -13,20 +40,34 @@ Command = Literal[
     "create",
     "str_replace",
     "insert",
+    "multi_edit",
+    "search",
+    "outline",
     "undo_edit",
 ]
 SNIPPET_LINES: int = 4
+SEARCH_MAX_RESULTS: int = 200
+SEARCH_MAX_LINE_LEN: int = 300
 
 MAX_RESPONSE_LEN: int = 16000
+# UTF-8 takes at most 4 bytes per character, so this always yields more
+# characters than `maybe_truncate` keeps
+_VIEW_MAX_BYTES: int = 4 * (MAX_RESPONSE_LEN + 1)
+_CHUNK_CHARS: int = 1024**2  # characters read at a time when rewriting a file
+# threads doing the editor's file I/O, shared by all editors in the process
+IO_THREADS: int = int(os.environ.get("REACT_AGENT_EDITOR_IO_THREADS", 8))
 
 TRUNCATED_MESSAGE: str = "<response clipped><NOTE>To save on context only part of this file has been shown to you. You should retry this tool after you have searched inside the file with `grep -n` in order to find the line numbers of what you are looking for.</NOTE>"
 
 _STR_REPLACE_EDITOR_DESCRIPTION = """Custom editing tool for viewing, creating and editing files
 * State is persistent across command calls and discussions with the user
-* If `path` is a file, `view` displays the result of applying `cat -n`. If `path` is a directory, `view` lists non-hidden files and directories up to 2 levels deep
+* If `path` is a file, `view` displays the result of applying `cat -n`. If `path` is a directory, `view` lists non-hidden files and directories up to 2 levels deep, skipping those ignored by `.gitignore`; very large directories are summarized
 * The `create` command cannot be used if the specified `path` already exists as a file
 * If a `command` generates a long output, it will be truncated and marked with `<response clipped>`
 * The `undo_edit` command will revert the last edit made to the file at `path`
+* The `search` command finds the lines matching `query` (a substring, or a regex with `regex` set) in the files below the directory `path`, using an index of the workspace; use it instead of `grep -rn`
+* The `outline` command lists the classes and functions of the file at `path` with their signatures and line ranges; use it before viewing a large source file, then `view` only the ranges you need with `view_range`
+* The `multi_edit` command applies a list of `str_replace` and `insert` edits to one file in order, all or none of them; `undo_edit` reverts the whole batch
 
 Notes for using the `str_replace` command:
 * The `old_str` parameter should match EXACTLY one or more consecutive lines from the original file. Be mindful of whitespaces!
@@ -44,6 +85,192 @@ def maybe_truncate(content: str, truncate_after: int | None = MAX_RESPONSE_LEN):
     )
 
 
+class _NotUnique(Exception):
+    def __init__(self, occurrences: int):
+        self.occurrences = occurrences
+
+
+class _OutOfRange(Exception):
+    def __init__(self, n_lines: int):
+        self.n_lines = n_lines
+
+
+class _Position(NamedTuple):
+    """Where an edit landed in the new file."""
+
+    byte: int
+    line: int  # 0-based
+
+
+_T = TypeVar("_T")
+_io_executor: ThreadPoolExecutor | None = None
+_io_executor_lock = threading.Lock()
+_path_locks: "WeakValueDictionary[str, threading.Lock]" = WeakValueDictionary()
+
+
+def get_io_executor() -> ThreadPoolExecutor:
+    """Return the process-wide pool for editor file I/O, creating it on first use."""
+    global _io_executor
+    with _io_executor_lock:
+        if _io_executor is None:
+            _io_executor = ThreadPoolExecutor(
+                max_workers=IO_THREADS, thread_name_prefix="str_replace_editor"
+            )
+        return _io_executor
+
+
+async def _in_io_thread(func: Callable[..., _T], *args) -> _T:
+    """Run blocking `func(*args)` on the I/O pool instead of the event loop."""
+    call = functools.partial(contextvars.copy_context().run, func, *args)
+    return await asyncio.get_running_loop().run_in_executor(get_io_executor(), call)
+
+
+def _path_lock(path: Path) -> threading.Lock:
+    """The lock serializing edits of `path`; hold a reference while using it."""
+    key = os.path.abspath(path)
+    with _io_executor_lock:
+        lock = _path_locks.get(key)
+        if lock is None:
+            lock = _path_locks[key] = threading.Lock()
+        return lock
+
+
+@contextmanager
+def _rewrite(path: Path, read: bool = True) -> Iterator[Tuple[TextIO | None, TextIO]]:
+    """Yield `path` open for reading and a temp file that atomically replaces it.
+
+    The temp file is created next to the file `path` resolves to, fsynced
+    and renamed over it when the block exits normally, and removed if it
+    raises; a crash midway leaves `path` untouched. See `atomic_write`.
+    """
+    fd, tmp = open_temp_file(str(path))
+    try:
+        with os.fdopen(fd, "w") as dst:
+            if read:
+                with path.open() as src:
+                    yield src, dst
+            else:
+                yield None, dst
+            dst.flush()
+            os.fsync(dst.fileno())
+    except BaseException:
+        discard_temp_file(tmp)
+        raise
+    commit_temp_file(tmp, str(path), fsync=True)
+    forget_line_index(path)
+
+
+def _expanded_chunks(src: TextIO) -> Iterator[str]:
+    """Yield `src` in tab-expanded chunks that end at line boundaries.
+
+    `expandtabs` restarts its column count at every newline, so expanding
+    whole lines at a time gives the same text as expanding the whole file.
+    """
+    while True:
+        chunk = src.read(_CHUNK_CHARS)
+        if not chunk:
+            return
+        if not chunk.endswith("\n"):
+            chunk += src.readline()
+        yield chunk.expandtabs()
+
+
+def _replace_unique(
+    src: TextIO, dst: TextIO, old: str, new: str
+) -> Tuple[int, _Position, int]:
+    """Copy `src` to `dst`, replacing the only occurrence of `old` with `new`.
+
+    Occurrences are counted like `str.count` does, without overlaps. Returns
+    the character offset and the position of the replacement and the length
+    of the new text; raises `_NotUnique` unless there is exactly one
+    occurrence.
+    """
+    match = None
+    buffer, buffered_from, newlines, written = "", 0, 0, 0
+    # a tail this long may be the start of an occurrence across chunks
+    keep = max(len(old) - 1, 0)
+    chunks = _expanded_chunks(src)
+    while True:
+        chunk = next(chunks, None)
+        buffer += chunk or ""
+        search_from = 0
+        while True:
+            found = buffer.find(old, search_from)
+            if found == -1:
+                break
+            if match is not None:
+                raise _NotUnique(2)
+            dst.write(buffer[:found])
+            match = (
+                buffered_from + found,
+                # a write-only text file's position is its byte offset
+                _Position(dst.tell(), newlines + buffer.count("\n", 0, found)),
+            )
+            dst.write(new)
+            written += found + len(new)
+            buffered_from += found + len(old)
+            buffer = buffer[found + len(old) :]
+            # an empty `old` occurs again at every following position
+            search_from = 0 if old else 1
+        if chunk is None:
+            break
+        cut = max(0, len(buffer) - keep)
+        dst.write(buffer[:cut])
+        written += cut
+        newlines += buffer.count("\n", 0, cut)
+        buffered_from += cut
+        buffer = buffer[cut:]
+    if match is None:
+        raise _NotUnique(0)
+    dst.write(buffer)
+    written += len(buffer)
+    return match[0], match[1], written
+
+
+def _insert_at(
+    src: TextIO, dst: TextIO, line: int, text: str
+) -> Tuple[int, _Position, str, int]:
+    """Copy `src` to `dst` with `text` inserted as new lines after line `line`.
+
+    Lines are counted as `str.split("\\n")` counts them. Returns the
+    character offset of the insertion, the position of its first line, the
+    text actually inserted and the length of the new text; raises
+    `_OutOfRange` if the file has fewer than `line` lines.
+    """
+    inserted = None
+    newlines, written = 0, 0
+    if line == 0:
+        inserted, start, position = text + "\n", 0, _Position(0, 0)
+        dst.write(inserted)
+        written += len(inserted)
+    for chunk in _expanded_chunks(src):
+        count = chunk.count("\n")
+        if inserted is None and newlines + count >= line:
+            # offset just after the newline that ends line `line`
+            cut = -1
+            for _ in range(line - newlines):
+                cut = chunk.index("\n", cut + 1)
+            inserted, start = text + "\n", written + cut + 1
+            dst.write(chunk[: cut + 1])
+            position = _Position(dst.tell(), line)
+            dst.write(inserted + chunk[cut + 1 :])
+            written += len(inserted) + len(chunk)
+            newlines += count
+            continue
+        dst.write(chunk)
+        written += len(chunk)
+        newlines += count
+    if inserted is None:
+        if line != newlines + 1:
+            raise _OutOfRange(newlines + 1)
+        inserted, start = "\n" + text, written
+        dst.write("\n")
+        position = _Position(dst.tell(), line)
+        dst.write(text)
+        written += len(inserted)
+    return start, position, inserted, written
+
+
 class StrReplaceEditor(BaseTool):
     """字符串替换工具。"""
     
@@ -53,8 +280,8 @@ class StrReplaceEditor(BaseTool):
         "type": "object",
         "properties": {
             "command": {
-                "description": "The commands to run. Allowed options are: `view`, `create`, `str_replace`, `insert`, `undo_edit`.",
-                "enum": ["view", "create", "str_replace", "insert", "undo_edit"],
+                "description": "The commands to run. Allowed options are: `view`, `create`, `str_replace`, `insert`, `multi_edit`, `search`, `outline`, `undo_edit`.",
+                "enum": ["view", "create", "str_replace", "insert", "multi_edit", "search", "outline", "undo_edit"],
                 "type": "string",
             },
             "path": {
@@ -82,11 +309,35 @@ class StrReplaceEditor(BaseTool):
                 "items": {"type": "integer"},
                 "type": "array",
             },
+            "query": {
+                "description": "Required parameter of `search` command. The text to search for in the files below the directory `path`; matching lines are listed as `path:line:text`.",
+                "type": "string",
+            },
+            "regex": {
+                "description": "Optional parameter of `search` command. Treat `query` as a Python regular expression instead of a plain substring.",
+                "type": "boolean",
+            },
+            "edits": {
+                "description": "Required parameter of `multi_edit` command. The edits to apply in order, each one a `str_replace` (with `old_str` and optionally `new_str`) or an `insert` (with `insert_line` and `new_str`) applied to the result of the edits before it. If any edit fails, none is applied.",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "command": {"enum": ["str_replace", "insert"], "type": "string"},
+                        "old_str": {"type": "string"},
+                        "new_str": {"type": "string"},
+                        "insert_line": {"type": "integer"},
+                    },
+                    "required": ["command"],
+                },
+                "type": "array",
+            },
         },
         "required": ["command", "path"],
     }
 
-    _file_history: list = defaultdict(list)
+    history: EditHistory = Field(default_factory=get_edit_history, exclude=True)
+    directory_depth: int = DEFAULT_MAX_DEPTH
+    directory_entries: int = DEFAULT_MAX_ENTRIES
 
     async def execute(
         self,
@@ -98,24 +349,25 @@ class StrReplaceEditor(BaseTool):
         old_str: str | None = None,
         new_str: str | None = None,
         insert_line: int | None = None,
+        edits: list[dict] | None = None,
+        query: str | None = None,
+        regex: bool = False,
         **kwargs,
     ) -> str:
         _path = Path(path)
-        self.validate_path(command, _path)
+        await _in_io_thread(self.validate_path, command, _path)
         if command == "view":
             result = await self.view(_path, view_range)
         elif command == "create":
             if file_text is None:
                 raise ToolError("Parameter `file_text` is required for command: create")
-            self.write_file(_path, file_text)
-            self._file_history[_path].append(file_text)
-            result = ToolResult(output=f"File created successfully at: {_path}")
+            result = await self._edit(_path, self.create, _path, file_text)
         elif command == "str_replace":
             if old_str is None:
                 raise ToolError(
                     "Parameter `old_str` is required for command: str_replace"
                 )
-            result = self.str_replace(_path, old_str, new_str)
+            result = await self._edit(_path, self.str_replace, _path, old_str, new_str)
         elif command == "insert":
             if insert_line is None:
                 raise ToolError(
@@ -123,15 +375,34 @@ class StrReplaceEditor(BaseTool):
                 )
             if new_str is None:
                 raise ToolError("Parameter `new_str` is required for command: insert")
-            result = self.insert(_path, insert_line, new_str)
+            result = await self._edit(_path, self.insert, _path, insert_line, new_str)
+        elif command == "multi_edit":
+            if not edits:
+                raise ToolError("Parameter `edits` is required for command: multi_edit")
+            result = await self._edit(_path, self.multi_edit, _path, edits)
+        elif command == "search":
+            if not query:
+                raise ToolError("Parameter `query` is required for command: search")
+            result = await self.search(_path, query, regex)
+        elif command == "outline":
+            result = await self.outline(_path)
         elif command == "undo_edit":
-            result = self.undo_edit(_path)
+            result = await self._edit(_path, self.undo_edit, _path)
         else:
             raise ToolError(
                 f'Unrecognized command {command}. The allowed commands for the {self.name} tool are: {", ".join(get_args(Command))}'
             )
         return str(result)
 
+    async def _edit(self, path: Path, func: Callable[..., _T], *args) -> _T:
+        """Run the blocking edit `func(*args)` on the I/O pool, one edit of `path` at a time."""
+
+        def locked() -> _T:
+            with _path_lock(path):
+                return func(*args)
+
+        return await _in_io_thread(locked)
+
     def validate_path(self, command: str, path: Path):
         """
         Check that the path/command combination is valid.
@@ -153,96 +424,158 @@ class StrReplaceEditor(BaseTool):
             )
         # Check if the path points to a directory
         if path.is_dir():
-            if command != "view":
+            if command not in ("view", "search"):
                 raise ToolError(
-                    f"The path {path} is a directory and only the `view` command can be used on directories"
+                    f"The path {path} is a directory and only the `view` and `search` commands can be used on directories"
                 )
 
     async def view(self, path: Path, view_range: list[int] | None = None):
         """Implement the view command"""
-        if path.is_dir():
+        if await _in_io_thread(path.is_dir):
             if view_range:
                 raise ToolError(
                     "The `view_range` parameter is not allowed when `path` points to a directory."
                 )
 
-            _, stdout, stderr = await run(
-                rf"find {path} -maxdepth 2 -not -path '*/\.*'"
+            try:
+                lines = await _in_io_thread(
+                    get_directory_walker().walk,
+                    path,
+                    self.directory_depth,
+                    self.directory_entries,
+                )
+            except OSError as e:
+                return CLIResult(output="", error=f"Ran into {e} while trying to list {path}")
+            stdout = "\n".join(lines)
+            return CLIResult(
+                output=f"Here's the files and directories up to {self.directory_depth} levels deep in {path}, excluding hidden items and those ignored by .gitignore:\n{stdout}\n"
             )
-            if not stderr:
-                stdout = f"Here's the files and directories up to 2 levels deep in {path}, excluding hidden items:\n{stdout}\n"
-            return CLIResult(output=stdout, error=stderr)
+        return await _in_io_thread(self._view_file, path, view_range)
 
-        file_content = self.read_file(path)
-        init_line = 1
+    def _view_file(self, path: Path, view_range: list[int] | None):
+        """View the file at `path`, or the lines of it in `view_range`."""
+        try:
+            index = get_line_index(path)
+        except Exception as e:
+            raise ToolError(f"Ran into {e} while trying to read {path}") from None
+        init_line, final_line = 1, -1
         if view_range:
             if len(view_range) != 2 or not all(isinstance(i, int) for i in view_range):
                 raise ToolError(
                     "Invalid `view_range`. It should be a list of two integers."
                 )
-            file_lines = file_content.split("\n")
-            n_lines_file = len(file_lines)
             init_line, final_line = view_range
-            if init_line < 1 or init_line > n_lines_file:
+            if init_line < 1 or not index.has_line(init_line):
                 raise ToolError(
-                    f"Invalid `view_range`: {view_range}. Its first element `{init_line}` should be within the range of lines of the file: {[1, n_lines_file]}"
+                    f"Invalid `view_range`: {view_range}. Its first element `{init_line}` should be within the range of lines of the file: {[1, index.line_count()]}"
                 )
-            if final_line > n_lines_file:
+            if final_line > 0 and not index.has_line(final_line):
                 raise ToolError(
-                    f"Invalid `view_range`: {view_range}. Its second element `{final_line}` should be smaller than the number of lines in the file: `{n_lines_file}`"
+                    f"Invalid `view_range`: {view_range}. Its second element `{final_line}` should be smaller than the number of lines in the file: `{index.line_count()}`"
                 )
             if final_line != -1 and final_line < init_line:
                 raise ToolError(
                     f"Invalid `view_range`: {view_range}. Its second element `{final_line}` should be larger or equal than its first `{init_line}`"
                 )
 
-            if final_line == -1:
-                file_content = "\n".join(file_lines[init_line - 1 :])
-            else:
-                file_content = "\n".join(file_lines[init_line - 1 : final_line])
+        # only as much of the file as `_make_output` can show is read
+        try:
+            file_content = index.read(init_line, final_line, max_bytes=_VIEW_MAX_BYTES)
+        except Exception as e:
+            raise ToolError(f"Ran into {e} while trying to read {path}") from None
 
         return CLIResult(
             output=self._make_output(file_content, str(path), init_line=init_line)
         )
 
+    async def search(self, path: Path, query: str, regex: bool = False):
+        """Implement the search command, which finds lines matching query below path"""
+        if not await _in_io_thread(path.is_dir):
+            raise ToolError(
+                f"The path {path} is not a directory. The `search` command searches the files below a directory."
+            )
+        if regex:
+            try:
+                re.compile(query)
+            except re.error as e:
+                raise ToolError(f"Invalid regular expression `{query}`: {e}") from None
+        matches, total = await _in_io_thread(
+            lambda: get_search_index(workspace_root(path)).search(
+                query, regex, False, SEARCH_MAX_RESULTS, path
+            )
+        )
+        if not total:
+            return CLIResult(output=f"No lines matching `{query}` were found in {path}.")
+        lines = "\n".join(
+            f"{match.path}:{match.line}:{match.text[:SEARCH_MAX_LINE_LEN]}"
+            for match in matches
+        )
+        output = f"Found {total} lines matching `{query}` in {path}:\n{lines}\n"
+        if total > len(matches):
+            output += f"<{total - len(matches)} more matching lines not shown; narrow the query or search a subdirectory>\n"
+        return CLIResult(output=output)
+
+    async def outline(self, path: Path):
+        """Implement the outline command, which lists the definitions in a file"""
+        try:
+            entries, n_lines = await _in_io_thread(get_outline, path)
+        except Exception as e:
+            raise ToolError(f"Ran into {e} while trying to read {path}") from None
+        if not entries:
+            return CLIResult(
+                output=f"No classes or functions were found in {path} ({n_lines} lines). View it with `view`, using `view_range` for a part of it.\n"
+            )
+        lines = "\n".join(
+            f"{entry.start:6}-{entry.end:<6}\t{'    ' * entry.depth}{entry.signature}"
+            for entry in entries
+        )
+        return CLIResult(
+            output=maybe_truncate(
+                f"Here's the outline of {path} ({n_lines} lines), with the line range of each definition; view a range with `view_range`:\n{lines}\n"
+            )
+        )
+
+    def create(self, path: Path, file_text: str):
+        """Implement the create command"""
+        self.write_file(path, file_text)
+        self.history.record(path, file_text, file_text)
+        return ToolResult(output=f"File created successfully at: {path}")
+
     def str_replace(self, path: Path, old_str: str, new_str: str | None):
         """Implement the str_replace command, which replaces old_str with new_str in the file content"""
-        # Read the file content
-        file_content = self.read_file(path).expandtabs()
         old_str = old_str.expandtabs()
         new_str = new_str.expandtabs() if new_str is not None else ""
 
-        # Check if old_str is unique in the file
-        occurrences = file_content.count(old_str)
-        if occurrences == 0:
-            raise ToolError(
-                f"No replacement was performed, old_str `{old_str}` did not appear verbatim in {path}."
-            )
-        elif occurrences > 1:
-            file_content_lines = file_content.split("\n")
+        # Replace the unique occurrence of old_str while streaming the file
+        # into its replacement, which is only moved into place on success
+        try:
+            with _rewrite(path) as (src, dst):
+                start, position, length = _replace_unique(src, dst, old_str, new_str)
+        except _NotUnique as e:
+            if not e.occurrences:
+                raise ToolError(
+                    f"No replacement was performed, old_str `{old_str}` did not appear verbatim in {path}."
+                ) from None
             lines = [
                 idx + 1
-                for idx, line in enumerate(file_content_lines)
+                for idx, line in enumerate(self._lines(path))
                 if old_str in line
             ]
             raise ToolError(
                 f"No replacement was performed. Multiple occurrences of old_str `{old_str}` in lines {lines}. Please ensure it is unique"
-            )
-
-        # Replace old_str with new_str
-        new_file_content = file_content.replace(old_str, new_str)
-
-        # Write the new content to the file
-        self.write_file(path, new_file_content)
+            ) from None
+        except OSError as e:
+            raise ToolError(f"Ran into {e} while trying to write to {path}") from None
 
-        # Save the content to history
-        self._file_history[path].append(file_content)
+        # Save the reverse patch to history
+        self.history.push(path, ReversePatch.replacement(start, old_str, new_str, length))
 
-        # Create a snippet of the edited section
-        replacement_line = file_content.split(old_str)[0].count("\n")
+        # Create a snippet of the edited section, reading only its lines
+        replacement_line = position.line
         start_line = max(0, replacement_line - SNIPPET_LINES)
-        end_line = replacement_line + SNIPPET_LINES + new_str.count("\n")
-        snippet = "\n".join(new_file_content.split("\n")[start_line : end_line + 1])
+        snippet = self._snippet(
+            path, position.byte, SNIPPET_LINES, SNIPPET_LINES + new_str.count("\n")
+        )
 
         # Prepare the success message
         success_msg = f"The file {path} has been edited. "
@@ -255,33 +588,27 @@ class StrReplaceEditor(BaseTool):
 
     def insert(self, path: Path, insert_line: int, new_str: str):
         """Implement the insert command, which inserts new_str at the specified line in the file content."""
-        file_text = self.read_file(path).expandtabs()
         new_str = new_str.expandtabs()
-        file_text_lines = file_text.split("\n")
-        n_lines_file = len(file_text_lines)
-
-        if insert_line < 0 or insert_line > n_lines_file:
+        if insert_line < 0:
             raise ToolError(
-                f"Invalid `insert_line` parameter: {insert_line}. It should be within the range of lines of the file: {[0, n_lines_file]}"
+                f"Invalid `insert_line` parameter: {insert_line}. It should be within the range of lines of the file: {[0, self._line_count(path)]}"
             )
 
-        new_str_lines = new_str.split("\n")
-        new_file_text_lines = (
-            file_text_lines[:insert_line]
-            + new_str_lines
-            + file_text_lines[insert_line:]
-        )
-        snippet_lines = (
-            file_text_lines[max(0, insert_line - SNIPPET_LINES) : insert_line]
-            + new_str_lines
-            + file_text_lines[insert_line : insert_line + SNIPPET_LINES]
-        )
+        try:
+            with _rewrite(path) as (src, dst):
+                start, position, inserted, length = _insert_at(src, dst, insert_line, new_str)
+        except _OutOfRange as e:
+            raise ToolError(
+                f"Invalid `insert_line` parameter: {insert_line}. It should be within the range of lines of the file: {[0, e.n_lines]}"
+            ) from None
+        except OSError as e:
+            raise ToolError(f"Ran into {e} while trying to write to {path}") from None
 
-        new_file_text = "\n".join(new_file_text_lines)
-        snippet = "\n".join(snippet_lines)
+        self.history.push(path, ReversePatch.replacement(start, "", inserted, length))
 
-        self.write_file(path, new_file_text)
-        self._file_history[path].append(file_text)
+        snippet = self._snippet(
+            path, position.byte, SNIPPET_LINES, new_str.count("\n") + SNIPPET_LINES
+        )
 
         success_msg = f"The file {path} has been edited. "
         success_msg += self._make_output(
@@ -292,12 +619,119 @@ class StrReplaceEditor(BaseTool):
         success_msg += "Review the changes and make sure they are as expected (correct indentation, no duplicate lines, etc). Edit the file again if necessary."
         return CLIResult(output=success_msg)
 
+    def multi_edit(self, path: Path, edits: list[dict]):
+        """Implement the multi_edit command, which applies edits in order with one read and one write."""
+        file_text = self.read_file(path).expandtabs()
+        new_text = file_text
+        # where each edit's text ended up, kept up to date as later edits shift it
+        regions: list[list[int]] = []
+        for number, edit in enumerate(edits, 1):
+            try:
+                new_text, start, removed, added = self._apply_edit(path, new_text, edit)
+            except ToolError as e:
+                raise ToolError(
+                    f"No edits were performed: edit {number} of {len(edits)} failed. {e}"
+                ) from None
+            delta = added - removed
+            for region in regions:
+                if region[0] >= start + removed:
+                    region[0] += delta
+                    region[1] += delta
+                elif region[1] > start:
+                    region[0] = min(region[0], start)
+                    region[1] = max(region[1], start + removed) + delta
+            regions.append([start, start + added])
+
+        self.write_file(path, new_text)
+        self.history.record(path, file_text, new_text)
+
+        # Show each edited region with some context, merging overlapping snippets
+        windows: list[list[int]] = []
+        for start, end in sorted(regions):
+            first = new_text.count("\n", 0, start) - SNIPPET_LINES
+            last = new_text.count("\n", 0, max(start, end - 1)) + SNIPPET_LINES
+            if windows and first <= windows[-1][1] + 1:
+                windows[-1][1] = max(windows[-1][1], last)
+            else:
+                windows.append([max(0, first), last])
+        new_text_lines = new_text.split("\n")
+        success_msg = f"The file {path} has been edited with {len(edits)} edits. "
+        for first, last in windows:
+            success_msg += self._make_output(
+                "\n".join(new_text_lines[first : last + 1]),
+                f"a snippet of {path}",
+                first + 1,
+            )
+        success_msg += "Review the changes and make sure they are as expected. Edit the file again if necessary."
+        return CLIResult(output=success_msg)
+
+    def _apply_edit(self, path: Path, text: str, edit: dict) -> Tuple[str, int, int, int]:
+        """Apply one `multi_edit` edit to `text`.
+
+        Returns the new text, the offset of the edit and the lengths of the
+        text it removed and added.
+        """
+        command = edit.get("command")
+        new_str = edit.get("new_str")
+        if command == "str_replace":
+            old_str = edit.get("old_str")
+            if old_str is None:
+                raise ToolError("Parameter `old_str` is required for command: str_replace")
+            old_str = old_str.expandtabs()
+            new_str = new_str.expandtabs() if new_str is not None else ""
+            occurrences = text.count(old_str)
+            if occurrences == 0:
+                raise ToolError(
+                    f"old_str `{old_str}` did not appear verbatim in {path}."
+                )
+            if occurrences > 1:
+                lines = [
+                    idx + 1
+                    for idx, line in enumerate(text.split("\n"))
+                    if old_str in line
+                ]
+                raise ToolError(
+                    f"Multiple occurrences of old_str `{old_str}` in lines {lines}. Please ensure it is unique"
+                )
+            start = text.index(old_str)
+            return (
+                text[:start] + new_str + text[start + len(old_str) :],
+                start,
+                len(old_str),
+                len(new_str),
+            )
+        if command == "insert":
+            insert_line = edit.get("insert_line")
+            if insert_line is None:
+                raise ToolError("Parameter `insert_line` is required for command: insert")
+            if new_str is None:
+                raise ToolError("Parameter `new_str` is required for command: insert")
+            new_str = new_str.expandtabs()
+            n_lines_file = text.count("\n") + 1
+            if insert_line < 0 or insert_line > n_lines_file:
+                raise ToolError(
+                    f"Invalid `insert_line` parameter: {insert_line}. It should be within the range of lines of the file: {[0, n_lines_file]}"
+                )
+            if insert_line == n_lines_file:
+                start, inserted = len(text), "\n" + new_str
+            else:
+                start = 0
+                for _ in range(insert_line):
+                    start = text.index("\n", start) + 1
+                inserted = new_str + "\n"
+            return text[:start] + inserted + text[start:], start, 0, len(inserted)
+        raise ToolError(
+            f"Unrecognized edit command {command}. Edits should be `str_replace` or `insert`."
+        )
+
     def undo_edit(self, path: Path):
         """Implement the undo_edit command."""
-        if not self._file_history[path]:
+        try:
+            old_text = self.history.undo(path, self.read_file(path))
+        except ValueError as e:
+            raise ToolError(f"Cannot undo the last edit to {path}: {e}.") from None
+        if old_text is None:
             raise ToolError(f"No edit history found for {path}.")
-
-        old_text = self._file_history[path].pop()
         self.write_file(path, old_text)
 
         return CLIResult(
@@ -314,10 +748,38 @@ class StrReplaceEditor(BaseTool):
     def write_file(self, path: Path, file: str):
         """Write the content of a file to a given path; raise a ToolError if an error occurs."""
         try:
-            path.write_text(file)
+            with _rewrite(path, read=False) as (_, dst):
+                dst.write(file)
         except Exception as e:
             raise ToolError(f"Ran into {e} while trying to write to {path}") from None
 
+    def _lines(self, path: Path) -> Iterator[str]:
+        """Yield the tab-expanded lines of `path` as `split("\\n")` would."""
+        try:
+            with path.open() as f:
+                line = ""
+                for chunk in _expanded_chunks(f):
+                    lines = chunk.split("\n")
+                    lines[0] = line + lines[0]
+                    line = lines.pop()
+                    yield from lines
+                yield line
+        except Exception as e:
+            raise ToolError(f"Ran into {e} while trying to read {path}") from None
+
+    def _line_count(self, path: Path) -> int:
+        try:
+            return get_line_index(path).line_count()
+        except Exception as e:
+            raise ToolError(f"Ran into {e} while trying to read {path}") from None
+
+    def _snippet(self, path: Path, offset: int, before: int, after: int) -> str:
+        """Return the lines of `path` around byte `offset`, see `read_lines_around`."""
+        try:
+            return read_lines_around(path, offset, before, after, max_bytes=_VIEW_MAX_BYTES)
+        except Exception as e:
+            raise ToolError(f"Ran into {e} while trying to read {path}") from None
+
     def _make_output(
         self,
         file_content: str,
@@ -0,0 +1,121 @@
+"""Concurrent map-reduce summarization.
+
+Chunks are summarized in parallel, at most `concurrency` LLM calls at a
+time, and the summaries are combined in a tree: groups of `fan_in` are
+merged concurrently, level by level, until one summary is left. Every
+completion is cached by a hash of its prompt, so chunks seen before (for
+example, the same paper returned by a repeated query) are not summarized
+again. `complete` must raise when it fails rather than return an error
+message, which would be cached as a summary.
+"""
+
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Optional
+
+Complete = Callable[[str], Awaitable[str]]
+
+DEFAULT_CONCURRENCY: int = 4
+DEFAULT_FAN_IN: int = 4
+MAX_CACHED_SUMMARIES: int = 1024
+
+MAP_PROMPT = "这是学术文献信息的一部分。请总结这部分内容：\n\n{text}"
+REDUCE_PROMPT = "以下是对学术文献的分部分总结，请将它们整合为一个连贯的总结：\n\n{text}"
+
+
+class SummaryCache:
+    """LRU cache of completions by prompt hash. Thread-safe."""
+
+    def __init__(self, max_entries: int = MAX_CACHED_SUMMARIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(prompt: str) -> bytes:
+        return hashlib.sha256(prompt.encode()).digest()
+
+    def get(self, prompt: str) -> Optional[str]:
+        key = self.key(prompt)
+        with self._lock:
+            summary = self._entries.get(key)
+            if summary is not None:
+                self._entries.move_to_end(key)
+            return summary
+
+    def put(self, prompt: str, summary: str):
+        key = self.key(prompt)
+        with self._lock:
+            self._entries[key] = summary
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+async def map_reduce_summarize(
+    chunks: List[str],
+    complete: Complete,
+    cache: Optional[SummaryCache] = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    fan_in: int = DEFAULT_FAN_IN,
+    map_prompt: str = MAP_PROMPT,
+    reduce_prompt: str = REDUCE_PROMPT,
+    final_prompt: Optional[str] = None,
+) -> str:
+    """Summarize `chunks` into one summary.
+
+    `map_prompt` and `reduce_prompt` are formatted with `text`, a chunk or
+    the summaries to merge, separated by blank lines. `final_prompt`, if
+    given, is used instead of `reduce_prompt` for the last merge. If
+    `complete` raises, so does this, and nothing of the failed call is
+    cached.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(prompt: str) -> str:
+        if cache is not None:
+            summary = cache.get(prompt)
+            if summary is not None:
+                return summary
+        async with semaphore:
+            summary = await complete(prompt)
+        if cache is not None:
+            cache.put(prompt, summary)
+        return summary
+
+    summaries = await asyncio.gather(
+        *(run(map_prompt.format(text=chunk)) for chunk in chunks)
+    )
+    while len(summaries) > 1:
+        groups = [summaries[i : i + fan_in] for i in range(0, len(summaries), fan_in)]
+        last = len(groups) == 1
+        template = final_prompt if last and final_prompt else reduce_prompt
+        summaries = await asyncio.gather(
+            *(
+                run(template.format(text="\n\n".join(group))) if len(group) > 1 else _done(group[0])
+                for group in groups
+            )
+        )
+    return summaries[0]
+
+
+async def _done(summary: str) -> str:
+    return summary
+
+
+_cache: Optional[SummaryCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_summary_cache() -> SummaryCache:
+    """Return the process-wide summary cache, creating it on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SummaryCache()
+        return _cache
@@ -0,0 +1,212 @@
+"""Write-behind buffering for `FileSaver`.
+
+Appends are held in memory and written by a background thread, coalescing
+all appends to a file made within `window` seconds (or until `max_bytes`
+are pending) into a single open/write/close. Overwrites are committed at
+once and atomically, with `atomic_write`: the content is written to a
+temp file next to the target, which is then renamed over it.
+
+When data is fsynced is configurable:
+
+* "never": never; the OS writes it back in its own time.
+* "overwrite": overwrites are fsynced before the rename (and the directory
+  after it), so a crash leaves either the old or the new file; appends
+  are not.
+* "always": appends are fsynced too, each time they are written.
+
+Both kinds of write can be compressed with gzip or zstd; each batch of
+appends then becomes one more gzip member or zstd frame of the file.
+
+An error writing buffered appends is reported by the next append,
+overwrite or flush of the same file.
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Literal, Optional, Tuple
+from weakref import WeakValueDictionary
+
+from react_agent.tool.atomic_write import (
+    commit_temp_file,
+    discard_temp_file,
+    open_temp_file,
+)
+from react_agent.tool.compression import compress
+
+logger = logging.getLogger(__name__)
+
+FsyncPolicy = Literal["never", "overwrite", "always"]
+
+DEFAULT_WINDOW: float = 0.05  # seconds
+DEFAULT_MAX_BYTES: int = 1024**2  # pending bytes per file before it is written
+DEFAULT_FSYNC: FsyncPolicy = os.environ.get("REACT_AGENT_FILE_SAVER_FSYNC", "overwrite")  # type: ignore[assignment]
+
+
+@dataclass
+class _Pending:
+    deadline: float
+    compression: Optional[str]
+    chunks: List[str] = field(default_factory=list)
+    size: int = 0
+
+
+class WriteBehindBuffer:
+    """Buffers appends per file and commits overwrites atomically. Thread-safe."""
+
+    def __init__(
+        self,
+        window: float = DEFAULT_WINDOW,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        fsync: FsyncPolicy = DEFAULT_FSYNC,
+    ):
+        if fsync not in ("never", "overwrite", "always"):
+            raise ValueError(f"Unknown fsync policy {fsync!r}")
+        self.window = window
+        self.max_bytes = max_bytes
+        self.fsync = fsync
+        self._pending: Dict[str, _Pending] = {}
+        self._errors: Dict[str, OSError] = {}
+        self._file_locks: "WeakValueDictionary[str, threading.Lock]" = WeakValueDictionary()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._flusher: Optional[threading.Thread] = None
+
+    def _file_lock(self, path: str) -> threading.Lock:
+        """The lock serializing writes of `path`; taken before `_lock`."""
+        with self._lock:
+            lock = self._file_locks.get(path)
+            if lock is None:
+                lock = self._file_locks[path] = threading.Lock()
+            return lock
+
+    def _raise_error(self, path: str):
+        # called with `_lock` held
+        error = self._errors.pop(path, None)
+        if error is not None:
+            raise OSError(
+                error.errno, f"Earlier appends to {path} were lost: {error.strerror or error}"
+            )
+
+    def append(self, path: str, content: str, compression: Optional[str] = None):
+        """Append `content` to `path` soon, compressed with `compression`
+        ("gzip", "zstd" or None); only touches memory."""
+        path = os.path.abspath(path)
+        with self._lock:
+            self._raise_error(path)
+            pending = self._pending.get(path)
+            if pending is None:
+                pending = self._pending[path] = _Pending(
+                    time.monotonic() + self.window, compression
+                )
+            pending.chunks.append(content)
+            pending.size += len(content)
+            if pending.size >= self.max_bytes:
+                pending.deadline = 0.0
+            if self._flusher is None:
+                self._flusher = threading.Thread(
+                    target=self._run, name="file_saver_write_behind", daemon=True
+                )
+                self._flusher.start()
+            self._wakeup.notify()
+
+    def overwrite(
+        self, path: str, content: str, compression: Optional[str] = None
+    ) -> Tuple[int, int]:
+        """Replace the contents of `path` with `content` atomically; blocks.
+
+        Returns the size of `content` in bytes and the number of bytes
+        written, which differ if it is compressed.
+        """
+        path = os.path.abspath(path)
+        data = content.encode("utf-8")
+        written = compress(compression, data) if compression else data
+        with self._file_lock(path):
+            with self._lock:
+                # appends made before the overwrite would be overwritten anyway
+                self._pending.pop(path, None)
+                self._errors.pop(path, None)
+            fd, tmp = open_temp_file(path)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(written)
+                    f.flush()
+                    if self.fsync != "never":
+                        os.fsync(f.fileno())
+            except BaseException:
+                discard_temp_file(tmp)
+                raise
+            commit_temp_file(tmp, path, self.fsync != "never")
+        return len(data), len(written)
+
+    def _write(self, path: str):
+        """Write the pending appends of `path`, if any."""
+        with self._file_lock(path):
+            with self._lock:
+                pending = self._pending.pop(path, None)
+            if pending is None:
+                return
+            data = "".join(pending.chunks).encode("utf-8")
+            if pending.compression:
+                data = compress(pending.compression, data)
+            try:
+                with open(path, "ab") as f:
+                    f.write(data)
+                    f.flush()
+                    if self.fsync == "always":
+                        os.fsync(f.fileno())
+            except OSError as e:
+                logger.error("Buffered appends to %s could not be written: %s", path, e)
+                with self._lock:
+                    self._errors[path] = e
+
+    def flush(self, path: Optional[str] = None):
+        """Write the pending appends of `path`, or of every file, now; blocks.
+
+        Raises OSError if appends to `path` could not be written.
+        """
+        if path is not None:
+            path = os.path.abspath(path)
+            self._write(path)
+            with self._lock:
+                self._raise_error(path)
+            return
+        with self._lock:
+            paths = list(self._pending)
+        for pending_path in paths:
+            self._write(pending_path)
+
+    @property
+    def pending_bytes(self) -> int:
+        with self._lock:
+            return sum(pending.size for pending in self._pending.values())
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while True:
+                    now = time.monotonic()
+                    due = [p for p, pending in self._pending.items() if pending.deadline <= now]
+                    if due:
+                        break
+                    deadlines = [pending.deadline for pending in self._pending.values()]
+                    self._wakeup.wait(min(deadlines) - now if deadlines else None)
+            for path in due:
+                self._write(path)
+
+
+_buffer: Optional[WriteBehindBuffer] = None
+_buffer_lock = threading.Lock()
+
+
+def get_write_behind_buffer() -> WriteBehindBuffer:
+    """Return the process-wide write-behind buffer, creating it on first use."""
+    global _buffer
+    with _buffer_lock:
+        if _buffer is None:
+            _buffer = WriteBehindBuffer()
+            atexit.register(_buffer.flush)
+        return _buffer
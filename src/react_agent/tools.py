@@ -10,7 +10,6 @@
 
 import json
 import uuid
-import asyncio
 from datetime import datetime
 from typing import Any, Callable, Dict, List, Optional, Union, cast
 
@@ -18,10 +17,10 @@ from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import BaseTool, InjectedToolArg, Tool, tool
 from typing_extensions import Annotated
 import requests
-from googlesearch import search as google_search_lib
 from bs4 import BeautifulSoup
 
 from react_agent.configuration import Configuration
+from react_agent.tool.search_router import get_search_router
 
 
 @tool
@@ -30,7 +29,7 @@ async def search(
 ) -> List[Dict[str, Any]]:
     """搜索一般网络结果。
 
-    此函数使用Google搜索引擎执行搜索，返回结构化的搜索结果。
+    此函数同时查询所有已配置的搜索后端并融合其排名，返回结构化的搜索结果。
     它对于回答有关当前事件的问题特别有用。
     
     参数:
@@ -43,11 +42,9 @@ async def search(
     configuration = Configuration.from_runnable_config(config)
     max_results = configuration.max_search_results
     
-    # 使用googlesearch-python库执行搜索
-    loop = asyncio.get_event_loop()
-    urls = await loop.run_in_executor(
-        None, lambda: list(google_search_lib(query, num=max_results))
-    )
+    # 并发查询所有搜索后端，按倒数排名融合结果
+    federated = await get_search_router().search(query, max_results)
+    urls = [hit.url for hit in federated.hits]
     
     results = []
     for url in urls:
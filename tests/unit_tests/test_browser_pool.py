@@ -0,0 +1,198 @@
+"""测试共享浏览器与上下文池。"""
+
+import asyncio
+
+from react_agent.tool.browser_pool import BrowserPool
+from react_agent.tool.browser_use_tool import BrowserUseTool
+
+
+class _FakePage:
+    def __init__(self, heap):
+        self.heap = heap
+
+    async def evaluate(self, js):
+        return self.heap
+
+
+class _FakeContext:
+    def __init__(self, heap):
+        self.page = _FakePage(heap)
+        self.closed = False
+        self.visited = []
+
+    async def get_current_page(self):
+        return self.page
+
+    async def navigate_to(self, url):
+        self.visited.append(url)
+
+    async def execute_javascript(self, js):
+        return "Local page" if js == "document.title" else ""
+
+    async def close(self):
+        self.closed = True
+
+
+class _FakeBrowser:
+    def __init__(self, heap=0):
+        self.heap = heap
+        self.contexts = []
+
+    async def new_context(self):
+        self.contexts.append(_FakeContext(self.heap))
+        return self.contexts[-1]
+
+
+def _pool(browser, **kwargs):
+    async def launch():
+        return browser
+
+    return BrowserPool(launch, **kwargs)
+
+
+def test_threads_reuse_their_own_context_and_recycle_after_max_uses() -> None:
+    browser = _FakeBrowser()
+    pool = _pool(browser, max_uses=3)
+
+    async def main():
+        seen = []
+        for thread_id in ["a", "b", "a", "a", "a"]:
+            async with pool.lease(thread_id) as context:
+                seen.append(context)
+        return seen
+
+    a1, b1, a2, a3, a4 = asyncio.run(main())
+    assert a1 is a2 is a3 and a1 is not b1
+    assert a1.closed and a4 is not a1  # recycled after three uses
+    assert (pool.launches, pool.contexts_created, pool.contexts_recycled) == (1, 3, 1)
+
+
+def test_full_pool_takes_over_idle_context_and_queues_when_all_leased() -> None:
+    browser = _FakeBrowser()
+    pool = _pool(browser, max_contexts=1)
+    order = []
+
+    async def use(thread_id, hold):
+        async with pool.lease(thread_id):
+            order.append(thread_id)
+            await asyncio.sleep(hold)
+
+    async def main():
+        await asyncio.gather(use("a", 0.05), use("b", 0))
+        await use("c", 0)
+
+    asyncio.run(main())
+    assert order == ["a", "b", "c"]
+    assert all(context.closed for context in browser.contexts[:2])
+    assert len(browser.contexts) == 3
+
+
+def test_context_over_memory_limit_is_recycled() -> None:
+    pool = _pool(_FakeBrowser(heap=600 * 1024**2), memory_limit=512 * 1024**2)
+
+    async def main():
+        async with pool.lease("a") as first:
+            pass
+        async with pool.lease("a") as second:
+            pass
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert first.closed and second is not first
+
+
+def test_tool_keeps_context_warm_between_calls() -> None:
+    browser = _FakeBrowser()
+    tool = BrowserUseTool(pool=_pool(browser))
+
+    async def main():
+        for path in ["one", "two"]:
+            result = await tool.execute(url=f"http://localhost/{path}", task="read")
+            assert "Local page" in result
+        await tool.cleanup()
+        await tool.execute(url="http://localhost/three", task="read")
+
+    asyncio.run(main())
+    first, second = browser.contexts
+    assert first.visited == ["http://localhost/one", "http://localhost/two"]
+    assert first.closed and not second.closed
+
+
+class _FakePlaywrightBrowser:
+    def __init__(self):
+        self.connected = True
+
+    def is_connected(self):
+        return self.connected
+
+
+class _CrashingBrowser(_FakeBrowser):
+    def __init__(self):
+        super().__init__()
+        self.playwright_browser = _FakePlaywrightBrowser()
+        self.closed = False
+
+    async def new_context(self):
+        if not self.playwright_browser.connected:
+            raise RuntimeError("Target closed")
+        return await super().new_context()
+
+    async def close(self):
+        self.closed = True
+
+
+def _relaunching_pool():
+    browsers = []
+
+    async def launch():
+        browsers.append(_CrashingBrowser())
+        return browsers[-1]
+
+    return BrowserPool(launch), browsers
+
+
+def test_disconnected_browser_is_relaunched_and_its_contexts_replaced() -> None:
+    pool, browsers = _relaunching_pool()
+
+    async def main():
+        async with pool.lease("a") as first:
+            pass
+        browsers[0].playwright_browser.connected = False
+        async with pool.lease("a") as second:
+            pass
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert len(browsers) == 2 and browsers[0].closed
+    assert first.closed and second is browsers[1].contexts[0]
+    assert pool.launches == 2
+
+
+def test_context_failure_relaunches_the_browser_once() -> None:
+    pool, browsers = _relaunching_pool()
+
+    async def main():
+        await pool.browser()
+        # crashed, but still reported as connected
+        browsers[0].playwright_browser.is_connected = lambda: True
+        browsers[0].playwright_browser.connected = False
+        async with pool.lease("a") as context:
+            return context
+
+    context = asyncio.run(main())
+    assert len(browsers) == 2 and browsers[0].closed
+    assert context is browsers[1].contexts[0]
+
+
+def test_pool_is_closed_when_its_loop_shuts_down(monkeypatch) -> None:
+    from react_agent.tool import browser_pool
+
+    pool, browsers = _relaunching_pool()
+    monkeypatch.setattr(browser_pool, "BrowserPool", lambda: pool)
+
+    async def main():
+        async with browser_pool.get_browser_pool().lease("a") as context:
+            return context
+
+    context = asyncio.run(main())
+    assert context.closed and browsers[0].closed
@@ -0,0 +1,105 @@
+"""测试短提示的合并与微批处理。"""
+
+import asyncio
+import re
+
+from react_agent.tool.completion_batcher import CompletionBatcher, pack, unpack
+from react_agent.tool.create_chat_completion import CreateChatCompletion
+from react_agent.tool.llm_router import LLMRouter, Provider
+
+
+def _counting_provider(requests, follow_format=True):
+    # 本地替身：记录请求数，按编号回答打包的提示
+    async def complete(prompt, max_tokens=1000):
+        requests.append((prompt, max_tokens))
+        await asyncio.sleep(0.01)
+        parts = re.findall(r"^### 请求 (\d+)\n(.*)$", prompt, re.MULTILINE)
+        if not parts:
+            return f"answer to {prompt}"
+        if not follow_format:
+            return "all answers at once, without numbers"
+        return "\n".join(f"### 回答 {i}\nanswer to {p}" for i, p in parts)
+
+    return Provider("stub", complete)
+
+
+def test_pack_round_trips_through_unpack() -> None:
+    reply = "### 回答 1\nfirst\n\n### 回答 2\nsecond\nline\n"
+    assert unpack(reply, 2) == ["first", "second\nline"]
+    assert unpack(reply, 3) is None
+    assert pack(["a", "b"]).endswith("### 请求 1\na\n\n### 请求 2\nb")
+
+
+def test_concurrent_prompts_share_requests() -> None:
+    requests = []
+    tool = CreateChatCompletion(router=LLMRouter([_counting_provider(requests)]))
+
+    async def main():
+        prompts = [f"summarize part {i}" for i in range(8)] + ["summarize part 0"]
+        return await asyncio.gather(*(tool.execute(prompt=p) for p in prompts))
+
+    answers = asyncio.run(main())
+    assert answers[:8] == [f"answer to summarize part {i}" for i in range(8)]
+    assert answers[8] == answers[0]  # identical prompts are coalesced
+    assert len(requests) == 2  # eight distinct prompts in batches of four
+    assert all(max_tokens == 4000 for _, max_tokens in requests)
+
+
+def test_unsplittable_reply_falls_back_to_single_requests() -> None:
+    requests = []
+    provider = _counting_provider(requests, follow_format=False)
+    batcher = CompletionBatcher(provider.complete, window=0.05)
+
+    async def main():
+        return await asyncio.gather(batcher.complete("a"), batcher.complete("b"))
+
+    assert asyncio.run(main()) == ["answer to a", "answer to b"]
+    assert (batcher.prompts, batcher.requests) == (2, 3)
+
+
+def test_prompts_are_not_packed_for_a_provider_that_cannot_split_them() -> None:
+    requests = []
+    provider = _counting_provider(requests)
+    provider.packable = False
+    tool = CreateChatCompletion(router=LLMRouter([provider]))
+
+    async def main():
+        return await asyncio.gather(*(tool.execute(prompt=p) for p in ["a", "b", "a"]))
+
+    assert asyncio.run(main()) == ["answer to a", "answer to b", "answer to a"]
+    assert sorted(prompt for prompt, _ in requests) == ["a", "b"]
+
+
+def test_prompts_of_different_threads_are_never_packed_together() -> None:
+    requests = []
+    batcher = CompletionBatcher(_counting_provider(requests).complete, window=0.05)
+
+    async def main():
+        return await asyncio.gather(
+            batcher.complete("a", thread_id="alice"),
+            batcher.complete("b", thread_id="bob"),
+            batcher.complete("a", thread_id="bob"),
+        )
+
+    assert asyncio.run(main()) == ["answer to a", "answer to b", "answer to a"]
+    packed = [prompt for prompt, _ in requests if "### 请求" in prompt]
+    assert requests and len(packed) == 1 and "### 请求 1\nb" in packed[0]
+    assert len(requests) == 2  # alice's prompt alone, bob's two packed
+
+
+def test_failed_packed_request_falls_back_to_single_requests() -> None:
+    requests = []
+
+    async def complete(prompt, max_tokens=1000):
+        requests.append(prompt)
+        if "### 请求" in prompt:
+            raise RuntimeError("context length exceeded")
+        return f"answer to {prompt}"
+
+    batcher = CompletionBatcher(complete, window=0.05)
+
+    async def main():
+        return await asyncio.gather(batcher.complete("a"), batcher.complete("b"))
+
+    assert asyncio.run(main()) == ["answer to a", "answer to b"]
+    assert len(requests) == 3
@@ -0,0 +1,73 @@
+"""测试目录遍历器。"""
+
+from react_agent.tool.dir_walker import DirectoryWalker, parse_gitignore
+
+
+def _tree(root, paths):
+    for path in paths:
+        target = root / path
+        if path.endswith("/"):
+            target.mkdir(parents=True, exist_ok=True)
+        else:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_text("")
+
+
+def test_walk_honors_gitignore_and_depth(tmp_path) -> None:
+    (tmp_path / ".git").mkdir()
+    (tmp_path / ".gitignore").write_text("*.pyc\nbuild/\n/data/*.csv\n!data/keep.csv\n")
+    _tree(
+        tmp_path,
+        [
+            "src/app.py",
+            "src/app.pyc",
+            "src/pkg/deep/module.py",
+            "build/out.txt",
+            "data/raw.csv",
+            "data/keep.csv",
+            "data/notes.md",
+            ".env",
+        ],
+    )
+    (tmp_path / "src" / ".gitignore").write_text("pkg/\n")
+
+    lines = DirectoryWalker().walk(tmp_path, max_depth=2)
+
+    relative = [line[len(str(tmp_path)) :] for line in lines]
+    assert relative == [
+        "",
+        "/data",
+        "/data/keep.csv",
+        "/data/notes.md",
+        "/src",
+        "/src/app.py",
+    ]
+
+
+def test_large_directories_are_summarized_and_listings_cached(tmp_path) -> None:
+    _tree(tmp_path, [f"logs/{i:04d}.log" for i in range(250)] + ["logs/archive/", "z.txt"])
+    walker = DirectoryWalker()
+
+    lines = walker.walk(tmp_path, max_dir_entries=100)
+    assert len(lines) == 1 + 1 + 100 + 1 + 1
+    assert lines[-2] == f"{tmp_path}/logs/... (151 more entries: 150 files, 1 directories)"
+
+    # the two top-level entries are listed first, then 8 of logs/
+    lines = walker.walk(tmp_path, max_entries=10)
+    assert len(lines) == 1 + 1 + 8 + 1 + 1
+    assert lines[-2].startswith(f"{tmp_path}/logs/... (243 more entries")
+    assert lines[-1] == f"{tmp_path}/z.txt"
+
+    # an unchanged directory is served from the cache; a new entry is seen
+    (tmp_path / "new.txt").write_text("")
+    assert f"{tmp_path}/new.txt" in walker.walk(tmp_path)
+
+
+def test_parse_gitignore_globs() -> None:
+    rules = parse_gitignore("# comment\n**/cache/**\ndocs/*.md\n\\!bang\n")
+
+    assert [rule.anchored for rule in rules] == [True, True, False]
+    assert rules[0].regex.fullmatch("a/b/cache/x/y")
+    assert rules[1].regex.fullmatch("docs/readme.md")
+    assert not rules[1].regex.fullmatch("docs/sub/readme.md")
+    assert rules[2].regex.fullmatch("!bang")
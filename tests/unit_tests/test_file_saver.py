@@ -0,0 +1,76 @@
+"""测试文件保存工具的延迟写入。"""
+
+import asyncio
+import os
+
+from react_agent.tool.file_saver import FileSaver
+from react_agent.tool.write_behind import WriteBehindBuffer
+
+
+def test_appends_are_coalesced_until_flushed(tmp_path) -> None:
+    path = tmp_path / "logs" / "progress.log"
+    buffer = WriteBehindBuffer(window=60)
+    saver = FileSaver(buffer=buffer)
+
+    async def save():
+        for i in range(100):
+            assert "successfully" in await saver.execute(
+                content=f"step {i}\n", file_path=str(path), mode="a"
+            )
+
+    asyncio.run(save())
+    assert not path.exists()
+    assert buffer.pending_bytes == sum(len(f"step {i}\n") for i in range(100))
+    buffer.flush()
+    assert path.read_text() == "".join(f"step {i}\n" for i in range(100))
+
+    # reaching the size threshold writes without waiting for the window
+    buffer.max_bytes = 10
+    buffer.append(str(path), "x" * 10)
+    for _ in range(100):
+        if buffer.pending_bytes == 0:
+            break
+        asyncio.run(asyncio.sleep(0.01))
+    assert path.read_text().endswith("x" * 10)
+
+
+def test_overwrite_is_atomic_and_supersedes_pending_appends(tmp_path) -> None:
+    path = tmp_path / "report.md"
+    path.write_text("old")
+    os.chmod(path, 0o640)
+    buffer = WriteBehindBuffer(window=60, fsync="always")
+    buffer.append(str(path), " appended")
+    asyncio.run(FileSaver(buffer=buffer).execute(content="new", file_path=str(path)))
+    buffer.flush()
+    assert path.read_text() == "new"
+    assert os.stat(path).st_mode & 0o777 == 0o640
+    assert os.listdir(tmp_path) == ["report.md"]
+
+
+def test_chunked_compressed_save(tmp_path) -> None:
+    import gzip
+    import re
+
+    path = tmp_path / "dump.csv.gz"
+    path.write_bytes(gzip.compress(b"old"))
+    saver = FileSaver(buffer=WriteBehindBuffer(window=60))
+
+    async def save():
+        opened = await saver.execute(file_path=str(path), mode="open", content="id,value\n")
+        handle = re.search(r"handle (\w+)", opened).group(1)
+        for i in range(1000):
+            await saver.execute(file_path=str(path), mode="chunk", handle=handle, content=f"{i},{i % 7}\n")
+        # nothing is replaced before the commit
+        assert gzip.decompress(path.read_bytes()) == b"old"
+        return await saver.execute(file_path=str(path), mode="commit", handle=handle)
+
+    result = asyncio.run(save())
+    expected = "id,value\n" + "".join(f"{i},{i % 7}\n" for i in range(1000))
+    assert gzip.decompress(path.read_bytes()).decode() == expected
+    assert f"{len(expected)} bytes, compressed with gzip to {path.stat().st_size} bytes" in result
+    assert os.listdir(tmp_path) == ["dump.csv.gz"]
+
+    # compressed appends add gzip members that decompress as one stream
+    saver.buffer.append(str(path), "tail\n", "gzip")
+    saver.buffer.flush()
+    assert gzip.decompress(path.read_bytes()).decode() == expected + "tail\n"
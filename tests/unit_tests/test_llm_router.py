@@ -0,0 +1,72 @@
+"""测试 LLM 提供方路由。"""
+
+import asyncio
+import time
+
+import pytest
+
+from react_agent.tool.create_chat_completion import CreateChatCompletion
+from react_agent.tool.llm_router import LLMRouter, NoProviderAvailable, Provider
+
+
+def _provider(name, calls, delay=0.0, fail=False):
+    async def complete(prompt):
+        calls.append(name)
+        await asyncio.sleep(delay)
+        if fail:
+            raise RuntimeError(f"{name} is down")
+        return f"{name}: {prompt}"
+
+    return Provider(name, complete, deadline=1.0)
+
+
+def test_falls_back_in_order_and_records_the_provider() -> None:
+    calls = []
+    router = LLMRouter(
+        [_provider("a", calls, fail=True), _provider("b", calls), _provider("c", calls)]
+    )
+    record = asyncio.run(router.complete("hi"))
+    assert (record.text, record.provider, record.attempts) == ("b: hi", "b", ["a", "b"])
+    assert calls == ["a", "b"]
+    assert router.history[-1] is record
+    assert router.report()["a"]["failures"] == 1
+
+
+def test_open_circuit_skips_provider_until_reset() -> None:
+    calls = []
+    router = LLMRouter(
+        [_provider("down", calls, fail=True), _provider("up", calls)],
+        failure_threshold=2,
+        reset_timeout=0.2,
+    )
+    for _ in range(4):
+        assert asyncio.run(router.complete("x")).provider == "up"
+    assert calls.count("down") == 2
+    assert router.report()["down"]["state"] == "open"
+    assert router.report()["down"]["skipped"] == 2
+
+    time.sleep(0.25)
+    asyncio.run(router.complete("x"))  # half-open: one trial, which fails again
+    assert calls.count("down") == 3
+    assert router.report()["down"]["state"] == "open"
+
+
+def test_hedging_takes_the_first_answer() -> None:
+    calls = []
+    router = LLMRouter(
+        [_provider("slow", calls, delay=0.5), _provider("fast", calls, delay=0.01)],
+        hedge_delay=0.05,
+    )
+    start = time.monotonic()
+    record = asyncio.run(router.complete("x"))
+    assert record.provider == "fast" and record.attempts == ["slow", "fast"]
+    assert time.monotonic() - start < 0.3
+    assert router.report()["slow"]["state"] == "closed"
+
+
+def test_tool_reports_when_no_provider_answers() -> None:
+    router = LLMRouter([_provider("a", [], fail=True)])
+    with pytest.raises(NoProviderAvailable):
+        asyncio.run(router.complete("x"))
+    reply = asyncio.run(CreateChatCompletion(router=router).execute("你好"))
+    assert "无法连接到任何外部或本地模型" in reply
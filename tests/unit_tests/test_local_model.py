@@ -0,0 +1,58 @@
+"""测试常驻的本地模型推理进程。"""
+
+import asyncio
+import os
+import time
+
+import pytest
+
+from react_agent.tool.local_model import LocalModelWorker
+
+LOADS = "loads.txt"
+
+
+def _echo_model():
+    # 在工作进程中加载；记录加载次数，回复中带上批大小
+    with open(os.environ["LOCAL_MODEL_TEST_DIR"] + "/" + LOADS, "a") as f:
+        f.write("load\n")
+
+    def generate(prompts, max_new_tokens):
+        time.sleep(0.2)
+        return [f"{prompt}|{len(prompts)}|{max_new_tokens}" for prompt in prompts]
+
+    return generate
+
+
+def _broken_model():
+    raise ImportError("No module named 'transformers'")
+
+
+def test_worker_loads_once_and_batches_concurrent_prompts(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("LOCAL_MODEL_TEST_DIR", str(tmp_path))
+    worker = LocalModelWorker(f"{__name__}:_echo_model", max_batch=4, max_wait=0.3)
+
+    async def main():
+        first = await asyncio.gather(
+            *(worker.generate(f"p{i}", timeout=30, max_new_tokens=100 + i) for i in range(4))
+        )
+        second = await worker.generate("again", timeout=30)
+        with pytest.raises(asyncio.TimeoutError):
+            await worker.generate("late", timeout=0.01)
+        return first, second
+
+    try:
+        first, second = asyncio.run(main())
+    finally:
+        worker.close()
+    assert first == [f"p{i}|4|103" for i in range(4)]  # the largest bound of the batch
+    assert second == "again|1|500"
+    assert (tmp_path / LOADS).read_text().count("load") == 1
+
+
+def test_load_failure_is_reported_to_callers() -> None:
+    worker = LocalModelWorker(f"{__name__}:_broken_model")
+    try:
+        with pytest.raises(RuntimeError, match="transformers"):
+            asyncio.run(worker.generate("x", timeout=30))
+    finally:
+        worker.close()
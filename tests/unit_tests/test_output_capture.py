@@ -0,0 +1,60 @@
+"""测试命令输出的有界捕获与溢出文件。"""
+
+import asyncio
+
+from react_agent.tool.bash import Bash
+from react_agent.tool.output_capture import OutputCapture
+from react_agent.tool.run import run
+
+
+def test_small_output_is_kept_in_memory(tmp_path) -> None:
+    capture = OutputCapture(16, 16, spill_dir=tmp_path)
+    capture.write(b"hello ")
+    capture.write(b"world")
+    capture.close()
+
+    assert capture.getvalue() == "hello world"
+    assert not capture.truncated
+    assert capture.path is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_large_output_keeps_head_and_tail_and_spills(tmp_path) -> None:
+    data = b"".join(f"line {i}\n".encode() for i in range(1000))
+    capture = OutputCapture(32, 32, spill_dir=tmp_path)
+    for i in range(0, len(data), 100):
+        capture.write(data[i : i + 100])
+    capture.close()
+
+    text = capture.getvalue()
+    assert capture.truncated
+    assert text.startswith(data[:32].decode())
+    assert text.endswith(data[-32:].decode())
+    assert str(capture.path) in text
+    assert capture.path.read_bytes() == data
+
+
+def test_run_streams_large_output() -> None:
+    returncode, stdout, stderr = asyncio.run(
+        run("seq 1 200000", truncate_after=1000)
+    )
+
+    assert returncode == 0
+    assert stdout.startswith("1\n2\n3\n")
+    assert stdout.rstrip().endswith("199999\n200000")
+    assert "response clipped" in stdout
+    assert stderr == ""
+
+
+def test_bash_separates_stdout_and_stderr() -> None:
+    async def _run():
+        bash = Bash()
+        first = await bash.execute(command="echo out; echo err >&2")
+        second = await bash.execute(command="printf 'no newline'")
+        return first, second
+
+    first, second = asyncio.run(_run())
+
+    assert first.output == "out"
+    assert first.error == "err"
+    assert second.output == "no newline"
@@ -0,0 +1,164 @@
+"""测试PythonExecute工具及其工作进程池。"""
+
+import asyncio
+import os
+import pickle
+import stat
+import time
+
+from react_agent.tool.python_execute import PythonExecute
+from react_agent.tool.python_pool import PythonWorkerPool
+from react_agent.tool.python_session import PythonSessionManager
+
+
+def test_execute_returns_printed_output() -> None:
+    result = asyncio.run(PythonExecute().execute(code="print(6 * 7)"))
+
+    assert result == {"observation": "42\n"}
+
+
+def test_execute_reports_exceptions() -> None:
+    result = asyncio.run(PythonExecute().execute(code="raise ValueError('boom')"))
+
+    assert result == {"observation": "boom", "success": False}
+
+
+def test_timeout_kills_and_replaces_worker() -> None:
+    pool = PythonWorkerPool(size=1)
+    try:
+        result = pool.execute("while True: pass", timeout=0.5)
+        assert result["success"] is False
+        assert "timeout" in result["observation"]
+
+        assert pool.execute("print('still serving')", timeout=30) == {
+            "observation": "still serving\n"
+        }
+    finally:
+        pool.shutdown()
+
+
+def test_worker_over_memory_limit_is_killed() -> None:
+    pool = PythonWorkerPool(size=1, memory_limit=200 * 1024 * 1024)
+    try:
+        result = pool.execute(
+            "import time\nx = bytearray(400 * 1024 * 1024)\ntime.sleep(10)",
+            timeout=30,
+        )
+        assert result["success"] is False
+        assert "memory limit" in result["observation"]
+    finally:
+        pool.shutdown()
+
+
+def test_concurrent_executions_capture_their_own_output() -> None:
+    code = (
+        "import sys, time\n"
+        "for i in range(20):\n"
+        "    print('task {n} line', i)\n"
+        "    print('task {n} error', i, file=sys.stderr)\n"
+        "    time.sleep(0.001)\n"
+    )
+    tool = PythonExecute(backend="thread")
+
+    async def _run():
+        return await asyncio.gather(
+            *[tool.execute(code=code.format(n=n), timeout=30) for n in range(100)]
+        )
+
+    results = asyncio.run(_run())
+
+    for n, result in enumerate(results):
+        assert result["observation"] == "".join(
+            f"task {n} line {i}\n" for i in range(20)
+        )
+        assert result["stderr"] == "".join(f"task {n} error {i}\n" for i in range(20))
+
+
+def test_output_is_streamed_and_bounded() -> None:
+    chunks = []
+
+    async def _run(backend):
+        chunks.clear()
+        return await PythonExecute(backend=backend).execute(
+            code="for i in range(10000): print(i)",
+            timeout=30,
+            on_output=lambda stream, text: chunks.append((stream, text)),
+        )
+
+    for backend in ("thread", "process"):
+        result = asyncio.run(_run(backend))
+        assert "output truncated" in result["observation"]
+        assert len(chunks) > 1
+        assert "".join(text for _, text in chunks) == result["observation"].split(
+            "\n<output truncated"
+        )[0]
+
+
+def test_session_keeps_variables_and_survives_eviction(tmp_path) -> None:
+    manager = PythonSessionManager(max_sessions=1, snapshot_dir=tmp_path)
+    try:
+        manager.execute(
+            "a",
+            "import math\ndef area(r): return math.pi * r * r\nradius = 2",
+            timeout=30,
+        )
+        assert manager.execute("a", "print(radius)", timeout=30) == {
+            "observation": "2\n"
+        }
+
+        # starting a second session evicts the first one to a snapshot
+        manager.execute("b", "radius = 10", timeout=30)
+        assert manager._sessions["a"].worker is None
+
+        result = manager.execute("a", "print(round(area(radius), 2))", timeout=30)
+        assert result == {"observation": "12.57\n"}
+    finally:
+        manager.shutdown()
+
+
+def test_sessions_are_snapshotted_after_execution_and_evicted_when_idle(tmp_path) -> None:
+    manager = PythonSessionManager(idle_timeout=0.2, snapshot_dir=tmp_path)
+    try:
+        manager.execute("a", "radius = 2", timeout=30)
+        assert manager._snapshot_path("a").exists()
+        assert not manager._sessions["a"].dirty
+
+        # a crash loses nothing that was already executed
+        manager._sessions["a"].worker.kill()
+        manager.execute("a", "print(1)", timeout=30)
+        assert manager.execute("a", "print(radius)", timeout=30) == {"observation": "2\n"}
+
+        # the timer evicts the session without another call
+        time.sleep(0.6)
+        assert manager._sessions["a"].worker is None
+    finally:
+        manager.shutdown()
+
+
+def test_session_snapshots_stay_private_and_are_unpickled_in_the_worker(tmp_path) -> None:
+    snapshot_dir = tmp_path / "sessions"
+    manager = PythonSessionManager(max_sessions=1, snapshot_dir=snapshot_dir)
+    try:
+        manager.execute("a", "radius = 2", timeout=30)
+        assert manager.snapshot("a") == []
+        assert stat.S_IMODE(snapshot_dir.stat().st_mode) == 0o700
+
+        # a snapshot that runs code when unpickled must not run it here
+        marker = tmp_path / "unpickled"
+        payload = pickle.dumps(_Exploit(str(marker)))
+        manager._snapshot_path("b").write_bytes(payload)
+        pid = os.getpid()
+        result = manager.execute("b", "print(1)", timeout=30)
+        assert marker.exists() and int(marker.read_text()) != pid
+        assert "Failed to restore" in result["observation"]
+    finally:
+        manager.shutdown()
+
+
+class _Exploit:
+    def __init__(self, path):
+        self.path = path
+
+    def __reduce__(self):
+        code = f"open({self.path!r}, 'w').write(str(__import__('os').getpid()))"
+        return (exec, (code,))
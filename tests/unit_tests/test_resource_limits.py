@@ -0,0 +1,63 @@
+"""测试命令的资源限制与资源统计。"""
+
+import asyncio
+
+from react_agent.tool.bash import Bash
+from react_agent.tool.resource_limits import (
+    ResourceAccounting,
+    ResourceLimits,
+    ResourceUsage,
+)
+from react_agent.tool.run import run_with_usage
+
+
+def test_run_reports_rusage() -> None:
+    returncode, _, _, usage = asyncio.run(
+        run_with_usage("python -c 'x = bytearray(50 * 1024 * 1024)'")
+    )
+
+    assert returncode == 0
+    assert usage.cpu_time is not None and usage.cpu_time > 0
+    assert usage.peak_rss >= 50 * 1024 * 1024
+    assert usage.wall_time > 0
+
+
+def test_file_size_limit_is_enforced(tmp_path) -> None:
+    target = tmp_path / "big.bin"
+    limits = ResourceLimits(file_size=1024 * 1024)
+    returncode, _, _, _ = asyncio.run(
+        run_with_usage(
+            f"head -c 4194304 /dev/zero > {target}", limits=limits
+        )
+    )
+
+    assert returncode != 0
+    assert target.stat().st_size <= 1024 * 1024
+
+
+def test_bash_result_includes_usage() -> None:
+    result = asyncio.run(Bash().execute(command="sleep 0.1"))
+
+    assert result.wall_time >= 0.1
+    assert result.cpu_time is not None
+
+
+def test_bash_result_includes_peak_rss_of_the_command() -> None:
+    command = "python3 -c \"x = b'x' * (60 * 1024 * 1024); import time; time.sleep(0.3)\""
+    result = asyncio.run(Bash().execute(command=command))
+
+    assert result.peak_rss >= 50 * 1024 * 1024
+
+
+def test_accounting_is_per_thread() -> None:
+    accounting = ResourceAccounting()
+    accounting.record(ResourceUsage(cpu_time=1.0, peak_rss=10, wall_time=2.0), "a")
+    accounting.record(ResourceUsage(cpu_time=0.5, peak_rss=30, wall_time=1.0), "a")
+    accounting.record(ResourceUsage(cpu_time=4.0, peak_rss=5, wall_time=4.0), "b")
+
+    usage = accounting.get("a")
+    assert usage.commands == 2
+    assert usage.cpu_time == 1.5
+    assert usage.wall_time == 3.0
+    assert usage.peak_rss == 30
+    assert accounting.get("b").commands == 1
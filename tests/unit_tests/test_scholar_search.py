@@ -0,0 +1,243 @@
+"""测试学术搜索工具的对冲执行。"""
+
+import asyncio
+import time
+
+import pytest
+
+from react_agent.tool import scholar_search
+from react_agent.tool.scholar_search import ScholarSearch
+
+
+def _with_backends(monkeypatch, serpapi, scholarly):
+    monkeypatch.setenv("SERPAPI_API_KEY", "test")
+    monkeypatch.setattr(scholar_search, "_backend_stats", {})
+    monkeypatch.setattr(ScholarSearch, "_search_with_serpapi", lambda self, *args: serpapi())
+    monkeypatch.setattr(ScholarSearch, "_search_with_scholarly", lambda self, *args: scholarly())
+
+
+def test_slow_primary_is_hedged(monkeypatch) -> None:
+    cancelled = []
+
+    async def serpapi():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append("serpapi")
+            raise
+        return [{"title": "late"}]
+
+    async def scholarly():
+        return [{"title": "hedged"}]
+
+    _with_backends(monkeypatch, serpapi, scholarly)
+    start = time.monotonic()
+    results = asyncio.run(ScholarSearch(hedge_delay=0.05)._hedged_search("query"))
+    assert results == [{"title": "hedged"}]
+    assert time.monotonic() - start < 1
+    assert cancelled == ["serpapi"]
+
+
+def test_failures_start_the_fallback_and_demote_the_backend(monkeypatch) -> None:
+    async def serpapi():
+        raise RuntimeError("quota exceeded")
+
+    async def scholarly():
+        await asyncio.sleep(0.01)
+        return [{"title": "fallback"}]
+
+    _with_backends(monkeypatch, serpapi, scholarly)
+    tool = ScholarSearch(hedge_delay=10)
+    start = time.monotonic()
+    assert asyncio.run(tool._hedged_search("query")) == [{"title": "fallback"}]
+    assert time.monotonic() - start < 1
+
+    for _ in range(3):
+        asyncio.run(tool._hedged_search("query"))
+    # scholarly keeps succeeding and is now tried first
+    assert [name for name, _ in tool._backends("query", 5, None, None)] == ["scholarly", "serpapi"]
+    assert scholar_search._backend_stats["serpapi"].errors >= 1
+
+
+class _FakeScholarly:
+    def __init__(self, years, delay=0.0):
+        self.years = years
+        self.delay = delay
+        self.fetched = 0
+
+    def search_pubs(self, query):
+        for year in self.years:
+            time.sleep(self.delay)
+            self.fetched += 1
+            yield {"bib": {"title": f"paper {self.fetched}", "pub_year": year}}
+
+
+def test_scholarly_hits_are_filtered_by_year(monkeypatch) -> None:
+    fake = _FakeScholarly(["2015", "NA", "2021", "2019", "2023", "2020"])
+    monkeypatch.setattr(scholar_search, "scholarly", fake)
+
+    results = asyncio.run(
+        ScholarSearch()._search_with_scholarly("query", 2, year_from=2019, year_to=2021)
+    )
+    assert [result["year"] for result in results] == ["2021", "2019"]
+    assert fake.fetched == 4
+
+
+def test_cancelled_scholarly_search_stops_fetching(monkeypatch) -> None:
+    fake = _FakeScholarly(["2020"] * 10, delay=0.05)
+    monkeypatch.setattr(scholar_search, "scholarly", fake)
+
+    async def main():
+        task = asyncio.create_task(ScholarSearch()._search_with_scholarly("query", 10))
+        await asyncio.sleep(0.12)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0.2)
+
+    asyncio.run(main())
+    assert fake.fetched <= 4
+
+
+class _FakeCompletion:
+    def __init__(self, latency=0.01):
+        self.latency = latency
+        self.calls = 0
+        self.running = self.max_running = 0
+
+    async def execute(self, prompt: str) -> str:
+        self.calls += 1
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(self.latency)
+        self.running -= 1
+        return f"summary of {len(prompt)} characters"
+
+
+def _papers(n):
+    return [
+        {
+            "title": f"Paper {i}",
+            "authors": "A. Author",
+            "year": 2020,
+            "abstract": f"Finding {i}. " * 150,
+            "citations": i,
+            "url": f"https://example.org/{i}",
+        }
+        for i in range(n)
+    ]
+
+
+def test_summaries_are_parallel_tree_reduced_and_cached() -> None:
+    from react_agent.tool.summarize import SummaryCache
+
+    completion = _FakeCompletion()
+    tool = ScholarSearch(summarizer=completion, summary_cache=SummaryCache(), summary_concurrency=3)
+    summary = asyncio.run(tool._summarize_results(_papers(20)))
+    assert summary.startswith("summary of")
+    assert completion.max_running == 3
+    first_calls = completion.calls
+    # more chunks than one merge takes, so the summaries are merged in two levels
+    assert first_calls > 4 + 2
+
+    asyncio.run(tool._summarize_results(_papers(20)))
+    assert completion.calls == first_calls
+
+
+def test_publication_index_dedupes_filters_and_expires(tmp_path) -> None:
+    from react_agent.tool.publication_index import PublicationIndex
+
+    index = PublicationIndex(tmp_path / "publications.sqlite", max_age=100)
+    index.add(
+        [
+            {"title": "Attention Is All You Need", "authors": "A. Vaswani", "year": "2017", "abstract": "", "citations": 5, "url": ""},
+            {"title": "Deep Residual Learning", "authors": [{"name": "K. He"}], "year": 2016, "abstract": "residual attention nets", "citations": 9, "url": "https://doi.org/10.1109/CVPR.2016.90"},
+        ],
+        query="Attention",
+        now=1000,
+    )
+    # the same paper from the other backend fills in the missing abstract
+    index.add(
+        [{"title": "Attention is all you need!", "authors": [], "year": "", "abstract": "transformers use attention", "citations": 3, "url": "https://arxiv.org/abs/1706.03762"}],
+        now=1000,
+    )
+    assert index.count() == 2
+
+    # the query was run: its results are served in their order
+    results = index.search("attention!", num_results=2, now=1050)
+    assert [r["title"] for r in results] == ["Attention is all you need!", "Deep Residual Learning"]
+    assert results[0]["abstract"] == "transformers use attention"
+    assert results[0]["authors"] == "A. Vaswani" and results[0]["citations"] == 5
+    # other queries are only served by papers with all their words in the title
+    assert index.search("attention", num_results=1, year_from=2017, now=1050)[0]["year"] == 2017
+    assert index.search("attention", num_results=2, year_to=2016, now=1050) is None
+    assert index.search("attention", num_results=3, now=1050) is None
+    assert index.search("residual", num_results=1, now=1050)[0]["year"] == 2016
+    assert index.search("nets", num_results=1, now=1050) is None  # only in an abstract
+    assert index.search("attention", num_results=1, now=2000) is None
+
+
+
+def test_publication_index_merges_on_doi_or_title(tmp_path) -> None:
+    import sqlite3
+
+    from react_agent.tool.publication_index import PublicationIndex
+
+    path = tmp_path / "publications.sqlite"
+    # an index written with an older schema is replaced
+    with sqlite3.connect(path) as db:
+        db.execute("CREATE TABLE publications (id INTEGER PRIMARY KEY, key TEXT UNIQUE)")
+    index = PublicationIndex(path)
+    paper = {"title": "Deep Residual Learning", "authors": "K. He", "year": 2016, "abstract": "", "citations": 1, "url": "https://example.org/resnet"}
+    index.add([paper])
+    # only this source links to the DOI; the title matches
+    index.add([{**paper, "abstract": "residual nets", "url": "https://doi.org/10.1109/CVPR.2016.90"}])
+    # the same DOI under a differently written title
+    index.add([{**paper, "title": "Deep residual learning for image recognition", "citations": 9, "url": "https://doi.org/10.1109/cvpr.2016.90"}])
+    assert index.count() == 1
+    result = index.search("residual", num_results=1)[0]
+    assert result["abstract"] == "residual nets" and result["citations"] == 9
+
+    # the same title with another DOI is another paper
+    index.add([{**paper, "url": "https://doi.org/10.1000/other"}])
+    assert index.count() == 2
+
+    # a paper stored once by title and once by DOI is merged into one entry
+    index.add([{**paper, "title": "ResNets"}, {**paper, "title": "Residual networks", "url": "https://doi.org/10.1000/resnets"}])
+    assert index.count() == 4
+    index.add([{**paper, "title": "ResNets", "url": "https://doi.org/10.1000/resnets"}])
+    assert index.count() == 3
+
+
+def test_execute_answers_repeated_queries_from_the_index(tmp_path, monkeypatch) -> None:
+    from react_agent.tool.publication_index import PublicationIndex
+
+    calls = []
+
+    async def scholarly():
+        calls.append(1)
+        return [{"title": f"Graph networks {i}", "authors": "B", "year": 2020, "abstract": "graph", "citations": i, "url": ""} for i in range(3)]
+
+    monkeypatch.delenv("SERPAPI_API_KEY", raising=False)
+    monkeypatch.setattr(ScholarSearch, "_search_with_scholarly", lambda self, *args: scholarly())
+    tool = ScholarSearch(publications=PublicationIndex(tmp_path / "publications.sqlite"))
+    for _ in range(2):
+        output = asyncio.run(tool.execute(query="graph networks", num_results=3, summarize=False))
+        assert "Graph networks 2" in output
+    assert len(calls) == 1
+
+    # the same words under another year filter are a different query
+    asyncio.run(tool.execute(query="graph networks", num_results=3, year_from=2021, summarize=False))
+    assert len(calls) == 2
+
+
+def test_failed_summaries_are_not_cached() -> None:
+    from react_agent.tool.llm_router import LLMRouter, NoProviderAvailable
+    from react_agent.tool.summarize import SummaryCache
+
+    cache = SummaryCache()
+    tool = ScholarSearch(summary_cache=cache)
+    tool.summarizer.router = LLMRouter([])
+    with pytest.raises(NoProviderAvailable):
+        asyncio.run(tool._summarize_results(_papers(2)))
+    assert len(cache) == 0
@@ -0,0 +1,57 @@
+"""测试工作区三元组搜索索引。"""
+
+import os
+import stat
+
+from react_agent.tool.search_index import TrigramIndex, required_literals
+
+
+def test_required_literals() -> None:
+    assert required_literals(r"def (\w+)_handler\(") == ["def ", "_handler("]
+    assert required_literals("foo|bar") == []
+
+
+def test_search_follows_changes(tmp_path) -> None:
+    root = tmp_path / "repo"
+    (root / ".git").mkdir(parents=True)
+    (root / ".gitignore").write_text("*.log\n")
+    (root / "app.py").write_text("def main_handler(x):\n    return x\n")
+    (root / "notes.txt").write_text("hello world\nHello World\n")
+    (root / "run.log").write_text("hello world\n")
+    index = TrigramIndex(root, index_dir=tmp_path / "index")
+
+    matches, total = index.search("hello world")
+    assert total == 1
+    assert (matches[0].path, matches[0].line) == (str(root / "notes.txt"), 1)
+    assert index.search("hello world", ignore_case=True)[1] == 2
+    matches, _ = index.search(r"def \w+_handler", regex=True)
+    assert matches[0].text == "def main_handler(x):"
+
+    # a changed candidate is matched as it is on disk
+    (root / "app.py").write_text("def other_handler(y):\n")
+    stat = os.stat(root / "app.py")
+    os.utime(root / "app.py", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    matches, _ = index.search("_handler")
+    assert [m.text for m in matches] == ["def other_handler(y):"]
+
+    # new files show up after a refresh, deleted ones disappear; the
+    # changed file is reindexed then too
+    (root / "more.py").write_text("print('hello world')\n")
+    (root / "notes.txt").unlink()
+    assert index.refresh(force=True) == (2, 1)
+    matches, total = index.search("hello world")
+    assert [m.path for m in matches] == [str(root / "more.py")]
+
+
+def test_due_refresh_runs_in_the_background(tmp_path) -> None:
+    root = tmp_path / "repo"
+    root.mkdir()
+    (root / "a.py").write_text("alpha = 1\n")
+    index = TrigramIndex(root, index_dir=tmp_path / "index", refresh_interval=0)
+
+    assert index.search("alpha")[1] == 1  # the first query indexes synchronously
+    assert stat.S_IMODE((tmp_path / "index").stat().st_mode) == 0o700
+    (root / "b.py").write_text("alpha = 2\n")
+    index.search("alpha")  # starts a background refresh
+    index._refresher.join(10)
+    assert index.search("alpha")[1] == 2
@@ -0,0 +1,73 @@
+"""测试联合搜索路由。"""
+
+import asyncio
+import time
+
+from react_agent.tool.search_router import Backend, SearchHit, SearchRouter
+
+
+def _backend(name, urls, delay=0.0, fail=False, deadline=1.0):
+    async def search(query, num_results):
+        await asyncio.sleep(delay)
+        if fail:
+            raise RuntimeError("throttled")
+        return [SearchHit(url, title=f"{name} {url}") for url in urls[:num_results]]
+
+    return Backend(name, search, deadline=deadline)
+
+
+def test_results_are_fused_by_reciprocal_rank() -> None:
+    router = SearchRouter(
+        [
+            _backend("a", ["x", "y", "z"]),
+            _backend("b", ["y", "w"]),
+            _backend("broken", ["v"], fail=True),
+            _backend("slow", ["v"], delay=5, deadline=0.1),
+        ],
+        quorum=4,
+    )
+    result = asyncio.run(router.search("query", 3))
+    assert [hit.url for hit in result.hits] == ["y", "x", "w"]
+    assert result.hits[0].sources == ["a", "b"]
+    assert {name: r.status for name, r in result.backends.items()} == {
+        "a": "ok",
+        "b": "ok",
+        "broken": "error",
+        "slow": "timeout",
+    }
+    assert result.backends["a"].contributed == 2
+    assert router.stats["broken"].errors == 1
+    assert router.stats["slow"].timeouts == 1
+
+
+def test_returns_at_quorum_without_waiting_for_stragglers() -> None:
+    router = SearchRouter(
+        [_backend("fast", ["x"]), _backend("faster", ["y"]), _backend("slow", ["z"], delay=5, deadline=10)],
+        quorum=2,
+        deadline=3,
+    )
+    start = time.monotonic()
+    result = asyncio.run(router.search("query"))
+    assert time.monotonic() - start < 1
+    assert {hit.url for hit in result.hits} == {"x", "y"}
+    assert result.backends["slow"].status == "cancelled"
+    assert router.stats["fast"].successes == 1 and router.stats["fast"].contributed == 1
+
+
+def test_quorum_does_not_wait_on_specialized_backends(monkeypatch) -> None:
+    from react_agent.tool import search_router
+
+    scholar = _backend("scholar", ["s"], delay=5, deadline=10)
+    scholar.general = False
+    router = SearchRouter([_backend("google", ["x"]), scholar], quorum=2, deadline=3)
+    start = time.monotonic()
+    result = asyncio.run(router.search("query"))
+    assert time.monotonic() - start < 1
+    assert [hit.url for hit in result.hits] == ["x"]
+
+    monkeypatch.delenv("SERPAPI_API_KEY", raising=False)
+    monkeypatch.delenv("REACT_AGENT_SEARCH_LOCAL_ROOT", raising=False)
+    monkeypatch.delenv("REACT_AGENT_SEARCH_SCHOLAR", raising=False)
+    assert [b.name for b in search_router.default_backends()] == ["google"]
+    monkeypatch.setenv("REACT_AGENT_SEARCH_SCHOLAR", "1")
+    assert [b.name for b in search_router.default_backends()] == ["google", "scholar"]
@@ -0,0 +1,86 @@
+"""测试基于嵌入相似度的语义缓存。"""
+
+import asyncio
+
+from react_agent.tool.create_chat_completion import CreateChatCompletion
+from react_agent.tool.llm_router import LLMRouter, Provider
+from react_agent.tool.semantic_cache import SemanticCache
+
+PROMPT = (
+    "Summarize the main findings of the attached papers on graph neural networks. "
+    "Focus on the methods they use and the benchmarks they report."
+)
+
+
+def test_near_duplicates_hit_and_others_miss() -> None:
+    cache = SemanticCache()
+    cache.put(PROMPT, "summary")
+    assert cache.get("  " + PROMPT.upper().replace(". ", ".\n")) == "summary"
+    assert cache.get(PROMPT.replace("papers", "paper")) == "summary"
+    reordered = (
+        "Focus on the methods they use and the benchmarks they report. "
+        "Summarize the main findings of the attached papers on graph neural networks."
+    )
+    assert cache.get(reordered) is None  # the last sentence is compared on its own
+    assert cache.get("Translate the attached papers into French.") is None
+    assert cache.get(PROMPT + " Use at most 200 words.") is None  # numbers must match
+    assert cache.get(PROMPT, namespace="other") is None
+    assert (cache.hits, cache.misses) == (2, 4)
+
+
+def test_questions_about_the_same_context_do_not_collide() -> None:
+    cache = SemanticCache()
+    context = "Here are the abstracts of the papers we found. " + " ".join(
+        f"Paper {i} studies optimization of deep networks with adaptive methods." for i in range(40)
+    )
+    cache.put(context + " Which paper introduced the Adam optimizer?", "ANSWER-A")
+    assert cache.get(context + " Which paper introduced the LAMB optimizer?") is None
+    assert cache.get(context + "  which paper introduced the adam optimizer?") == "ANSWER-A"
+
+
+def test_least_recently_used_entry_is_evicted() -> None:
+    cache = SemanticCache(max_entries=2)
+    cache.put("first prompt about proteins", "a")
+    cache.put("second prompt about galaxies", "b")
+    assert cache.get("first prompt about proteins") == "a"
+    cache.put("third prompt about volcanoes", "c")
+    assert cache.get("second prompt about galaxies") is None
+    assert cache.get("first prompt about proteins") == "a"
+    assert len(cache) == 2
+
+
+def test_tool_answers_near_duplicates_from_the_cache() -> None:
+    requests = []
+
+    async def complete(prompt, max_tokens=1000):
+        requests.append(prompt)
+        return "summary"
+
+    tool = CreateChatCompletion(
+        router=LLMRouter([Provider("stub", complete)]), cache=SemanticCache()
+    )
+    assert asyncio.run(tool.execute(prompt=PROMPT)) == "summary"
+    assert asyncio.run(tool.execute(prompt="  " + PROMPT.upper())) == "summary"
+    assert len(requests) == 1
+
+
+def test_tool_does_not_share_entries_across_threads() -> None:
+    from langchain_core.runnables.config import var_child_runnable_config
+
+    requests = []
+
+    async def complete(prompt, max_tokens=1000):
+        requests.append(prompt)
+        return "summary"
+
+    tool = CreateChatCompletion(
+        router=LLMRouter([Provider("stub", complete)]), cache=SemanticCache()
+    )
+
+    async def ask(thread_id):
+        var_child_runnable_config.set({"configurable": {"thread_id": thread_id}})
+        return await tool.execute(prompt=PROMPT)
+
+    for thread_id in ["alice", "bob", "alice"]:
+        assert asyncio.run(ask(thread_id)) == "summary"
+    assert len(requests) == 2
@@ -0,0 +1,86 @@
+"""测试共享内存对象存储。"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from react_agent.tool.python_pool import PythonWorkerPool
+from react_agent.tool.shared_store import SharedObjectStore
+
+
+def test_dataframe_round_trip_shares_memory(tmp_path) -> None:
+    store = SharedObjectStore(directory=tmp_path)
+    frame = pd.DataFrame(
+        {"load": np.arange(1000, dtype=np.float64), "site": ["a", "b"] * 500},
+        index=pd.Index(np.arange(1000) * 2, name="t"),
+    )
+    store.publish("plant", frame)
+
+    attached = store.attach("plant")
+    try:
+        pd.testing.assert_frame_equal(attached, frame, check_names=False)
+        load = attached["load"].to_numpy()
+        assert not load.flags.writeable
+        assert not load.flags.owndata
+        assert store.list()[0]["refcount"] == 1
+    finally:
+        store.release_all()
+        store.delete("plant")
+    assert store.list() == []
+
+
+def test_lru_eviction_skips_attached_objects(tmp_path) -> None:
+    store = SharedObjectStore(directory=tmp_path, memory_budget=5 * 4096)
+    try:
+        store.publish("a", np.zeros(1024))
+        store.publish("b", np.zeros(1024))
+        store.attach("a")
+        store.publish("c", np.zeros(1024))
+        # "b" is the least recently used object that nobody holds
+        assert [entry["name"] for entry in store.list()] == ["a", "c"]
+
+        store.attach("c")
+        with pytest.raises(MemoryError):
+            store.publish("d", np.zeros(2048))
+    finally:
+        store.release_all()
+        for entry in store.list():
+            store.delete(entry["name"])
+
+
+def test_workers_exchange_objects_by_name() -> None:
+    pool = PythonWorkerPool(size=2)
+    try:
+        result = pool.execute(
+            "import numpy as np\nshared.publish('test_exchange', np.arange(10))",
+            timeout=30,
+        )
+        assert result.get("success") is not False, result
+        result = pool.execute(
+            "print(int(shared.attach('test_exchange').sum()))", timeout=30
+        )
+        assert result == {"observation": "45\n"}
+        result = pool.execute("shared.delete('test_exchange')", timeout=30)
+        assert result.get("success") is not False, result
+    finally:
+        pool.shutdown()
+
+
+def test_registry_rows_naming_foreign_segments_are_refused(tmp_path) -> None:
+    import sqlite3
+    import stat
+
+    store = SharedObjectStore(directory=tmp_path / "shared")
+    store.publish("mine", np.arange(4))
+    assert stat.S_IMODE((tmp_path / "shared").stat().st_mode) == 0o700
+    with sqlite3.connect(tmp_path / "shared" / "registry.sqlite") as db:
+        db.execute(
+            "INSERT INTO objects SELECT 'planted', 'evil_segment', nbytes, layout, last_used FROM objects"
+        )
+    try:
+        with pytest.raises(PermissionError):
+            store.attach("planted")
+        assert {e["name"]: e["refcount"] for e in store.list()} == {"mine": 0, "planted": 0}
+    finally:
+        store.delete("planted")
+        store.delete("mine")
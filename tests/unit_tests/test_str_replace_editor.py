@@ -0,0 +1,280 @@
+"""测试StrReplaceEditor工具及其撤销历史。"""
+
+import asyncio
+import stat
+
+import pytest
+
+from react_agent.exceptions import ToolError
+from react_agent.tool.edit_history import EditHistory
+from react_agent.tool.str_replace_editor import StrReplaceEditor
+
+
+def _editor() -> StrReplaceEditor:
+    return StrReplaceEditor(history=EditHistory())
+
+
+def test_undo_reverts_edits_in_order(tmp_path) -> None:
+    path = tmp_path / "plant.py"
+    path.write_text("a = 1\nb = 2\nc = 3\n")
+    editor = _editor()
+
+    async def _run():
+        await editor.execute(command="str_replace", path=str(path), old_str="b = 2", new_str="b = 20")
+        await editor.execute(command="insert", path=str(path), insert_line=0, new_str="# header")
+        await editor.execute(command="undo_edit", path=str(path))
+        assert path.read_text() == "a = 1\nb = 20\nc = 3\n"
+        await editor.execute(command="undo_edit", path=str(path))
+        assert path.read_text() == "a = 1\nb = 2\nc = 3\n"
+        with pytest.raises(ToolError):
+            await editor.execute(command="undo_edit", path=str(path))
+
+    asyncio.run(_run())
+
+
+def test_undo_refuses_to_patch_a_changed_file(tmp_path) -> None:
+    path = tmp_path / "plant.py"
+    path.write_text("value = 1\n")
+    editor = _editor()
+
+    async def _run():
+        await editor.execute(command="str_replace", path=str(path), old_str="1", new_str="2")
+        path.write_text("value = 3\n")
+        with pytest.raises(ToolError, match="changed"):
+            await editor.execute(command="undo_edit", path=str(path))
+
+    asyncio.run(_run())
+
+
+def test_history_budget_evicts_least_recently_edited_files(tmp_path) -> None:
+    history = EditHistory(budget=2000)
+    a, b = tmp_path / "a.txt", tmp_path / "b.txt"
+    history.record(a, "x" * 1000, "y")
+    history.record(b, "x" * 500, "y")
+    history.record(b, "x" * 500, "z")
+
+    assert history.size <= 2000
+    assert a not in history
+    assert history.depth(b) == 2
+    assert history.undo(b, "z") == "x" * 500
+
+
+def test_history_spills_to_disk(tmp_path) -> None:
+    history = EditHistory(budget=1000, spill_dir=tmp_path / "spill")
+    path = tmp_path / "a.txt"
+    texts = ["0" * 400 + "\n", "1" * 400 + "\n", "2" * 400 + "\n", "3"]
+    for old, new in zip(texts, texts[1:]):
+        history.record(path, old, new)
+
+    assert history.size <= 1000
+    assert any((tmp_path / "spill").iterdir())
+    current = texts[-1]
+    while path in history:
+        current = history.undo(path, current)
+    assert current == texts[0]
+    assert not any((tmp_path / "spill").iterdir())
+
+
+def test_line_index_matches_split(tmp_path, monkeypatch) -> None:
+    from react_agent.tool import line_index
+
+    monkeypatch.setattr(line_index, "STRIDE", 4)
+    monkeypatch.setattr(line_index, "_SCAN_CHUNK", 64)
+    path = tmp_path / "log.txt"
+    text = "".join(f"{i}: {'x' * (i % 13)}\n" for i in range(200)) + "tail"
+    path.write_text(text)
+    lines = text.split("\n")
+
+    index = line_index.LineIndex(path)
+    try:
+        assert index.read(10, 12) == "\n".join(lines[9:12])
+        assert index.line_count() == len(lines)
+        for first, last in [(1, 1), (1, 200), (57, 130), (199, -1), (201, -1)]:
+            expected = lines[first - 1 :] if last == -1 else lines[first - 1 : last]
+            assert index.read(first, last) == "\n".join(expected)
+    finally:
+        index.close()
+
+
+def test_view_range_follows_appends(tmp_path) -> None:
+    path = tmp_path / "app.log"
+    path.write_text("".join(f"event {i}\n" for i in range(1000)))
+    editor = _editor()
+
+    async def _view(view_range):
+        return await editor.execute(command="view", path=str(path), view_range=view_range)
+
+    assert "  1000\tevent 999\n" in asyncio.run(_view([999, 1000]))
+    with path.open("a") as f:
+        f.write("event 1000\nevent 1001")
+    output = asyncio.run(_view([1001, -1]))
+    assert output.endswith("  1001\tevent 1000\n  1002\tevent 1001\n")
+    with pytest.raises(ToolError, match="1002"):
+        asyncio.run(_view([1003, -1]))
+
+
+def test_streaming_edits_match_in_memory_semantics(tmp_path, monkeypatch) -> None:
+    from react_agent.tool import str_replace_editor
+
+    # tiny chunks make occurrences straddle chunk boundaries
+    monkeypatch.setattr(str_replace_editor, "_CHUNK_CHARS", 7)
+    path = tmp_path / "config.ini"
+    text = "".join(f"[section{i}]\n\tkey = value{i}\n" for i in range(50))
+    path.write_text(text)
+    editor = _editor()
+
+    async def _run():
+        output = await editor.execute(
+            command="str_replace", path=str(path), old_str="key = value37\n[section38]", new_str="key = 37\n[renamed]"
+        )
+        expected = text.expandtabs().replace("key = value37\n[section38]", "key = 37\n[renamed]")
+        assert path.read_text() == expected
+        assert "    77\t[renamed]\n" in output
+
+        with pytest.raises(ToolError, match=r"lines \[10, 82, 84,"):
+            await editor.execute(command="str_replace", path=str(path), old_str="value4", new_str="x")
+        assert path.read_text() == expected
+
+        output = await editor.execute(command="insert", path=str(path), insert_line=100, new_str="[last]")
+        assert path.read_text() == expected + "[last]\n"
+        assert output.count("\n    9") == 3 and "   101\t[last]\n   102\t\n" in output
+        await editor.execute(command="insert", path=str(path), insert_line=102, new_str="end")
+        assert path.read_text() == expected + "[last]\n\nend"
+        with pytest.raises(ToolError, match=r"\[0, 103\]"):
+            await editor.execute(command="insert", path=str(path), insert_line=104, new_str="x")
+
+        for _ in range(3):
+            await editor.execute(command="undo_edit", path=str(path))
+        assert path.read_text() == text.expandtabs()
+
+    asyncio.run(_run())
+    assert [p.name for p in tmp_path.iterdir()] == ["config.ini"]
+
+
+def test_multi_edit_applies_all_edits_or_none(tmp_path) -> None:
+    path = tmp_path / "model.py"
+    text = "".join(f"def f{i}():\n    return {i}\n" for i in range(40))
+    path.write_text(text)
+    editor = _editor()
+
+    async def _run():
+        await editor.execute(
+            command="multi_edit",
+            path=str(path),
+            edits=[
+                {"command": "str_replace", "old_str": "return 3\n", "new_str": "return 30\n"},
+                {"command": "insert", "insert_line": 0, "new_str": "import math"},
+                {"command": "str_replace", "old_str": "def f4():\n    return 30", "new_str": "x"},
+                {"command": "str_replace", "old_str": "def f35", "new_str": "def g35"},
+            ],
+        )
+
+    with pytest.raises(ToolError, match="edit 3 of 4 failed"):
+        asyncio.run(_run())
+    assert path.read_text() == text
+
+    output = asyncio.run(
+        editor.execute(
+            command="multi_edit",
+            path=str(path),
+            edits=[
+                {"command": "str_replace", "old_str": "return 3\n", "new_str": "return 30\n"},
+                {"command": "insert", "insert_line": 0, "new_str": "import math"},
+                {"command": "str_replace", "old_str": "def f35", "new_str": "def g35"},
+            ],
+        )
+    )
+    expected = "import math\n" + text.replace("return 3\n", "return 30\n").replace("def f35", "def g35")
+    assert path.read_text() == expected
+    # the two edits near the top share one snippet, the last one has its own
+    assert output.count("Here's the result of running `cat -n`") == 2
+    assert "     1\timport math\n" in output and "    72\tdef g35():\n" in output
+
+    asyncio.run(editor.execute(command="undo_edit", path=str(path)))
+    assert path.read_text() == text
+
+
+def test_outline_lists_definitions_with_line_ranges(tmp_path) -> None:
+    path = tmp_path / "module.py"
+    path.write_text(
+        "import os\n"
+        "\n"
+        "class Store(dict):\n"
+        "    @property\n"
+        "    def size(self) -> int:\n"
+        "        return len(self)\n"
+        "\n"
+        "async def load(path: str, *, retries=3):\n"
+        "    def helper():\n"
+        "        pass\n"
+        "    return path\n"
+    )
+    output = asyncio.run(_editor().execute(command="outline", path=str(path)))
+    assert output.splitlines()[1:] == [
+        "     3-6     \tclass Store(dict)",
+        "     4-6     \t    def size(self) -> int",
+        "     8-11    \tasync def load(path: str, *, retries=3)",
+    ]
+
+    # files that are not Python, or do not parse, fall back to keywords
+    path = tmp_path / "main.go"
+    path.write_text("package main\n\nfunc main() {\n\trun()\n}\n\nfunc run() {\n}\n")
+    output = asyncio.run(_editor().execute(command="outline", path=str(path)))
+    assert output.splitlines()[1:] == ["     3-5     \tfunc main()", "     7-8     \tfunc run()"]
+
+
+def test_concurrent_edits_of_one_file_are_serialized(tmp_path) -> None:
+    path = tmp_path / "log.txt"
+    path.write_text("start")
+    editor = _editor()
+
+    async def edit_concurrently():
+        await asyncio.gather(
+            *(
+                editor.execute(command="insert", path=str(path), insert_line=1, new_str=f"line {i}")
+                for i in range(20)
+            )
+        )
+
+    asyncio.run(edit_concurrently())
+    lines = path.read_text().split("\n")
+    assert lines[0] == "start"
+    assert sorted(lines[1:]) == sorted(f"line {i}" for i in range(20))
+
+
+def test_edits_through_a_symlink_keep_the_link_and_the_mode(tmp_path) -> None:
+    target = tmp_path / "real.py"
+    target.write_text("value = 1\n")
+    target.chmod(0o640)
+    link = tmp_path / "link.py"
+    link.symlink_to(target)
+
+    asyncio.run(
+        _editor().execute(command="str_replace", path=str(link), old_str="1", new_str="2")
+    )
+
+    assert link.is_symlink() and target.read_text() == "value = 2\n"
+    assert stat.S_IMODE(target.stat().st_mode) == 0o640
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["link.py", "real.py"]
+
+
+def test_line_index_rebuilds_after_edits_in_place(tmp_path, monkeypatch) -> None:
+    from react_agent.tool import line_index
+
+    monkeypatch.setattr(line_index, "STRIDE", 4)
+    path = tmp_path / "data.txt"
+    lines = [f"line {i:04d} {'y' * 20}" for i in range(2000)]
+    path.write_text("\n".join(lines) + "\n")
+    index = line_index.get_line_index(path)
+    assert index.read(1000, 1001) == "\n".join(lines[999:1001])
+
+    # one middle line replaced by four of the same total size
+    lines[500:501] = ["a" * 5, "b" * 5, "c" * 5, "d" * (len(lines[500]) - 18)]
+    path.write_text("\n".join(lines) + "\n")
+    assert line_index.get_line_index(path).read(1000, 1001) == "\n".join(lines[999:1001])
+
+    # a middle edit that also grows the file
+    lines[700:701] = ["e" * 7, "f" * 11]
+    path.write_text("\n".join(lines) + "\n")
+    assert line_index.get_line_index(path).read(1000, 1001) == "\n".join(lines[999:1001])
+    line_index.forget_line_index(path)